@@ -0,0 +1,92 @@
+"""
+Latência por pedido dos caminhos menu e process_task com e sem reutilização
+de conexões à base de dados.
+
+Só faz sentido contra PostgreSQL (em SQLite abrir uma conexão é quase
+gratuito). Cria um usuário temporário com um nível ativo e apaga-os no fim;
+não corra contra a base de dados de produção.
+
+    DATABASE_URL=postgres://... python benchmarks/db_connections.py --requests 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'saudi_aramco.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import close_old_connections, connections  # noqa: E402
+from django.test import Client, override_settings  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from core.models import CustomUser, Level, Task, UserLevel  # noqa: E402
+
+MODES = (
+    ('nova conexão por pedido (CONN_MAX_AGE=0)', 0),
+    ('conexão persistente (CONN_MAX_AGE=600)', 600),
+)
+
+
+def measure(client, method, path, requests, before=None):
+    timings = []
+    for _ in range(requests):
+        if before:
+            before()
+        started = time.perf_counter()
+        response = getattr(client, method)(path)
+        # O Client de teste não fecha conexões no fim do pedido; o servidor real fecha.
+        close_old_connections()
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code < 400, (path, response.status_code)
+    return timings
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f'  {label:<15} média {statistics.mean(timings):7.2f} ms   p50 {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    user = CustomUser.objects.create_user('bench-conn-0001', 'benchmark')
+    # Sem nível ativo o process_task devolve logo o erro, sem consultas nem escritas.
+    level = Level.objects.create(name='bench-conn', deposit_value=30, daily_gain=2, monthly_gain=60, cycle_days=90)
+    UserLevel.objects.create(user=user, level=level)
+    client = Client()
+    client.force_login(user)
+
+    database = connections['default']
+    original_max_age = database.settings_dict['CONN_MAX_AGE']
+    print(f"Base de dados: {database.vendor} ({database.settings_dict.get('HOST') or database.settings_dict['NAME']})")
+    try:
+        with override_settings(RATE_LIMIT_ENABLED=False):
+            for label, max_age in MODES:
+                database.close()
+                database.settings_dict['CONN_MAX_AGE'] = max_age
+                print(label)
+                report('menu', measure(client, 'get', '/menu/', args.requests))
+                # Só uma tarefa por dia: apaga a anterior, fora da medição, para cada pedido a gravar.
+                report('process_task', measure(
+                    client, 'post', '/process_task/', args.requests,
+                    before=lambda: Task.objects.for_user(user).delete(),
+                ))
+    finally:
+        database.settings_dict['CONN_MAX_AGE'] = original_max_age
+        user.delete()
+        level.delete()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Compara configurações do gunicorn (gunicorn.conf.py) sob carga concorrente.
+
+Para cada combinação arranca o gunicorn num porto local, dispara pedidos com
+N clientes em paralelo e mede o débito e a latência. Usa a base de dados de
+DATABASE_URL; o caminho padrão (/login/) não precisa de usuário autenticado.
+
+    python benchmarks/gunicorn_workers.py --requests 2000 --concurrency 32
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CONFIGURATIONS = (
+    ('sync', {'GUNICORN_WORKER_CLASS': 'sync'}),
+    ('sync + preload', {'GUNICORN_WORKER_CLASS': 'sync', 'GUNICORN_PRELOAD': '1'}),
+    ('gthread x4', {'GUNICORN_WORKER_CLASS': 'gthread', 'GUNICORN_THREADS': '4'}),
+    ('gthread x8', {'GUNICORN_WORKER_CLASS': 'gthread', 'GUNICORN_THREADS': '8'}),
+    ('uvicorn (ASGI)', {'GUNICORN_WORKER_CLASS': 'uvicorn'}),
+)
+
+
+def wait_until_ready(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return True
+        except urllib.error.HTTPError:
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def fetch(url):
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            response.read()
+            ok = response.status < 400
+    except (urllib.error.HTTPError, OSError):
+        ok = False
+    return (time.perf_counter() - started) * 1000, ok
+
+
+def run(label, overrides, args):
+    env = {
+        **os.environ,
+        'GUNICORN_PRELOAD': '0',
+        'GUNICORN_ACCESS_LOG': '/dev/null',
+        'GUNICORN_LOG_LEVEL': 'warning',
+        'WEB_CONCURRENCY': str(args.workers),
+        'PORT': str(args.port),
+        'RATE_LIMIT_ENABLED': '0',
+        **overrides,
+    }
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'], cwd=ROOT, env=env,
+    )
+    url = f'http://127.0.0.1:{args.port}{args.path}'
+    try:
+        if not wait_until_ready(url, process):
+            print(f'{label:<16} não arrancou (worker indisponível?)')
+            return
+        boot_ms = (time.perf_counter() - started) * 1000
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            started = time.perf_counter()
+            results = list(pool.map(fetch, [url] * args.requests))
+            elapsed = time.perf_counter() - started
+
+        timings = sorted(t for t, _ in results)
+        errors = sum(1 for _, ok in results if not ok)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(
+            f'{label:<16} arranque {boot_ms:6.0f} ms   {args.requests / elapsed:7.1f} req/s   '
+            f'p50 {statistics.median(timings):7.1f} ms   p95 {p95:7.1f} ms   erros {errors}'
+        )
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--path', default='/login/')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    for label, overrides in CONFIGURATIONS:
+        run(label, overrides, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Latência e número de consultas das comissões de convite por profundidade da
+rede: core/referrals.py (uma consulta para a cadeia, uma para os níveis ativos
+e um UPDATE) contra o antigo caminho de ler-alterar-gravar por convidante.
+
+Cria usuários temporários dentro de uma transação que é sempre revertida.
+
+    python benchmarks/referral_commissions.py --depths 1 2 3 5 8 --repeat 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'saudi_aramco.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from core.models import CustomUser, Level, UserLevel  # noqa: E402
+from core.referrals import ancestor_chain, commission_amount, commission_tiers, pay_referral_commissions  # noqa: E402
+
+
+class Rollback(Exception):
+    pass
+
+
+def per_ancestor(user, level):
+    """O caminho anterior, generalizado: exists() e save() para cada convidante."""
+    for ancestor_id, (tier, rate, flat) in zip(ancestor_chain(user.pk, len(commission_tiers())), commission_tiers()):
+        ancestor = CustomUser.objects.select_for_update().get(pk=ancestor_id)
+        if UserLevel.objects.filter(user=ancestor, is_active=True).exists():
+            amount = commission_amount(rate, flat, level.deposit_value)
+            ancestor.subsidy_balance += amount
+            ancestor.available_balance += amount
+            ancestor.save()
+
+
+def measure(pay, user, level, repeat):
+    timings = []
+    with CaptureQueriesContext(connection) as queries:
+        pay(user, level)
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with transaction.atomic():
+            pay(user, level)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 2, 3, 5, 8])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f'Base de dados: {connection.vendor}')
+    try:
+        with transaction.atomic():
+            level = Level.objects.create(
+                name='bench-referral', deposit_value=100, daily_gain=1, monthly_gain=30, cycle_days=30,
+            )
+            chain = []
+            for index in range(max(args.depths) + 1):
+                inviter = chain[-1] if chain else None
+                user = CustomUser.objects.create_user(f'bench-ref-{index:04d}', None, invited_by=inviter)
+                UserLevel.objects.create(user=user, level=level)
+                chain.append(user)
+            buyer = chain[-1]
+
+            for depth in args.depths:
+                rates = [Decimal('1')] * depth
+                with override_settings(REFERRAL_COMMISSION_RATES=rates):
+                    for label, pay in (('set-based', pay_referral_commissions), ('por convidante', per_ancestor)):
+                        timings, queries = measure(pay, buyer, level, args.repeat)
+                        print(
+                            f'  profundidade {depth:<2} {label:<15} {queries:3d} consultas   '
+                            f'média {statistics.mean(timings):6.2f} ms   p50 {statistics.median(timings):6.2f} ms'
+                        )
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Mede o arranque a frio da aplicação e falha se ultrapassar o orçamento.
+
+Executa várias vezes, num processo novo, `django.setup()` seguido da
+inicialização do motor de templates (o que um worker do gunicorn faz antes
+do primeiro pedido), e regista a saída de `python -X importtime`. Termina
+com código 1 se a mediana passar de setup_ms ou se algum módulo proibido
+for importado (ver benchmarks/startup_budget.json).
+
+    python benchmarks/startup.py --runs 5 --importtime-output importtime.txt
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_FILE = Path(__file__).resolve().parent / 'startup_budget.json'
+
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+from django.template import engines
+engines['django']
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({'setup_ms': elapsed, 'modules': sorted(sys.modules)}))
+"""
+
+
+def run_once(importtime=False):
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', STARTUP_SCRIPT]
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'saudi_aramco.settings'}
+    result = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_imports(importtime_output, limit):
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, module = (part.strip() for part in line.split(':', 1)[1].split('|'))
+        rows.append((int(cumulative_us), int(self_us), module))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help='Número de imports mais lentos a mostrar.')
+    parser.add_argument('--importtime-output', help='Ficheiro onde guardar a saída completa de -X importtime.')
+    args = parser.parse_args()
+
+    budget = json.loads(BUDGET_FILE.read_text())
+
+    # A primeira execução aquece a cache de bytecode e não conta.
+    run_once()
+    timings = []
+    modules = set()
+    for _ in range(args.runs):
+        result, _ = run_once()
+        timings.append(result['setup_ms'])
+        modules.update(result['modules'])
+
+    _, importtime_output = run_once(importtime=True)
+    if args.importtime_output:
+        Path(args.importtime_output).write_text(importtime_output)
+
+    print('Imports mais lentos (cumulativo):')
+    for cumulative_us, self_us, module in slowest_imports(importtime_output, args.top):
+        print(f'  {cumulative_us / 1000:8.1f} ms  {module}')
+
+    median = statistics.median(timings)
+    print(f"\ndjango.setup() + templates: mediana {median:.0f} ms em {args.runs} execuções "
+          f"(orçamento {budget['setup_ms']} ms)")
+
+    failures = []
+    if median > budget['setup_ms']:
+        failures.append(f"arranque de {median:.0f} ms acima do orçamento de {budget['setup_ms']} ms")
+    for module in budget['forbidden_modules']:
+        if module in modules:
+            failures.append(f'módulo proibido importado no arranque: {module}')
+
+    for failure in failures:
+        print(f'FALHA: {failure}')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
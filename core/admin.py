@@ -1,17 +1,126 @@
-from django.contrib import admin
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.db.models import Q
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.http import QueryDict, StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
 from django.utils.safestring import mark_safe # Importação necessária para renderizar HTML no Admin
 from .models import (
     CustomUser, PlatformSettings, Level, BankDetails, Deposit, 
-    Withdrawal, Task, Roulette, RouletteSettings, UserLevel, PlatformBankDetails
+    Withdrawal, Task, Roulette, RouletteSettings, UserLevel, PlatformBankDetails, Job,
+    DailyPlatformStats, ArchivedUserTotals
 )
+from .exports import EXPORT_NAMES, EXPORTS, astream_csv, stream_csv
+from .forecast import payout_forecast
+from .search import user_search_q
+from .sharding import is_sharded
+
+# ---
+
+@admin.action(description='Exportar selecionados para CSV', permissions=['view'])
+def export_csv(modeladmin, request, queryset):
+    # O CSV é escrito à medida que é lido (core/exports.py): memória constante.
+    # Sob ASGI o StreamingHttpResponse precisa de um iterador assíncrono.
+    name = EXPORT_NAMES[queryset.model]
+    stream = astream_csv if isinstance(request, ASGIRequest) else stream_csv
+    response = StreamingHttpResponse(stream(queryset, EXPORTS[name][1]), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{name}-{timezone.localdate():%Y%m%d}.csv"'
+    return response
+
+# ---
+
+class UserSearchMixin:
+    """
+    Pesquisa por telefone/código de convite com índices em vez de icontains
+    (core/search.py): "=termo" exato, prefixo por omissão e substring em
+    PostgreSQL (pg_trgm). `user_lookup` é o caminho até ao usuário (None no
+    próprio CustomUserAdmin); os outros search_fields usam icontains.
+    """
+    user_lookup = 'user'
+    user_search_fields = ('phone_number', 'invite_code')
+
+    def user_search_filter(self, search_term):
+        if self.user_lookup is None:
+            return user_search_q(search_term)
+        # Semi-join: os usuários são encontrados pelo índice e só depois a tabela grande.
+        users = CustomUser.objects.filter(user_search_q(search_term)).values('pk')
+        return Q(**{f'{self.user_lookup}__in': users})
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        prefix = f'{self.user_lookup}__' if self.user_lookup else ''
+        user_fields = {prefix + field for field in self.user_search_fields}
+        condition = self.user_search_filter(search_term)
+        for field in self.get_search_fields(request):
+            if field not in user_fields:
+                condition |= Q(**{f'{field}__icontains': search_term.strip()})
+        return queryset.filter(condition), False
+
+# ---
+
+class ShardListFilter(admin.SimpleListFilter):
+    # Só consome o parâmetro ?shard=: a base é escolhida em ShardedModelAdmin.get_queryset.
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in settings.DATABASE_SHARDS]
+
+    def queryset(self, request, queryset):
+        return queryset
+
+
+class ShardedModelAdmin(UserSearchMixin, admin.ModelAdmin):
+    """
+    Admin de Task/Roulette com sharding (core/sharding.py): mostra um shard de
+    cada vez (filtro "shard", por omissão o primeiro). O usuário vive na base
+    principal, por isso não há JOIN: os usuários são carregados à parte e a
+    pesquisa por telefone passa primeiro pelos ids.
+    """
+
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        if is_sharded(self.model):
+            list_filter = (ShardListFilter, *list_filter)
+        return list_filter
+
+    def selected_shard(self, request):
+        # Nas páginas de edição o filtro chega em ?_changelist_filters=shard%3D...
+        changelist_filters = QueryDict(request.GET.get('_changelist_filters', ''))
+        shard = request.GET.get('shard') or changelist_filters.get('shard')
+        return shard if shard in settings.DATABASE_SHARDS else settings.DATABASE_SHARDS[0]
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if is_sharded(self.model):
+            queryset = queryset.using(self.selected_shard(request)).prefetch_related('user')
+        return queryset
+
+    def get_list_select_related(self, request):
+        return () if is_sharded(self.model) else super().get_list_select_related(request)
+
+    def user_search_filter(self, search_term):
+        if not is_sharded(self.model):
+            return super().user_search_filter(search_term)
+        # Os usuários vivem noutra base: os ids viajam como lista.
+        user_ids = CustomUser.objects.filter(user_search_q(search_term)).values_list('pk', flat=True)
+        return Q(user_id__in=list(user_ids))
 
 # ---
 
 # Registrando os modelos com classes ModelAdmin personalizadas
 
 @admin.register(CustomUser)
-class CustomUserAdmin(admin.ModelAdmin):
+class CustomUserAdmin(UserSearchMixin, admin.ModelAdmin):
+    user_lookup = None
     list_display = ('phone_number', 'available_balance', 'subsidy_balance', 'is_staff', 'is_active', 'date_joined', 'roulette_spins')
+    actions = [export_csv]
     search_fields = ('phone_number', 'invite_code')
     list_filter = ('is_staff', 'is_active', 'level_active')
 
@@ -24,9 +133,46 @@ class PlatformSettingsAdmin(admin.ModelAdmin):
 class LevelAdmin(admin.ModelAdmin):
     list_display = ('name', 'deposit_value', 'daily_gain', 'monthly_gain', 'cycle_days')
     search_fields = ('name',)
+    change_list_template = 'admin/core/level/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('forecast/', self.admin_site.admin_view(self.forecast_view), name='core_level_forecast'),
+        ] + super().get_urls()
+
+    def forecast_view(self, request):
+        # Previsão de pagamentos de daily_gain (core/forecast.py). Os campos
+        # gain_<id> simulam outro daily_gain sem alterar o nível.
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        daily_gains = {}
+        for level in Level.objects.all():
+            value = request.GET.get(f'gain_{level.id}', '').strip()
+            if value:
+                try:
+                    daily_gains[level.id] = Decimal(value)
+                except InvalidOperation:
+                    messages.error(request, f'Valor inválido para {level.name}: {value}')
+        forecast = payout_forecast(daily_gains=daily_gains)
+        forecast_by_level = {row['level'].id: row for row in forecast['by_level']}
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Previsão de pagamentos',
+            'forecast': forecast,
+            'levels': [
+                {'level': level, 'simulated': daily_gains.get(level.id, ''), 'forecast': forecast_by_level.get(level.id)}
+                for level in Level.objects.order_by('deposit_value')
+            ],
+            'chart_data': {
+                'labels': [day.isoformat() for day, amount in forecast['schedule']],
+                'payouts': [float(amount) for day, amount in forecast['schedule']],
+            },
+        }
+        return TemplateResponse(request, 'admin/core/level/forecast.html', context)
 
 @admin.register(BankDetails)
-class BankDetailsAdmin(admin.ModelAdmin):
+class BankDetailsAdmin(UserSearchMixin, admin.ModelAdmin):
     list_display = ('user', 'bank_name', 'account_holder_name')
     search_fields = ('user__phone_number', 'bank_name', 'account_holder_name')
 
@@ -36,9 +182,10 @@ class PlatformBankDetailsAdmin(admin.ModelAdmin):
     search_fields = ('bank_name', 'account_holder_name')
 
 @admin.register(Deposit)
-class DepositAdmin(admin.ModelAdmin):
+class DepositAdmin(UserSearchMixin, admin.ModelAdmin):
     # Adicionamos 'proof_link' para mostrar o link na lista de depósitos
     list_display = ('user', 'amount', 'is_approved', 'created_at', 'proof_link') 
+    actions = [export_csv]
     search_fields = ('user__phone_number',)
     list_filter = ('is_approved',)
     
@@ -47,6 +194,8 @@ class DepositAdmin(admin.ModelAdmin):
 
     # Método para criar o link do comprovativo na LISTA de depósitos
     def proof_link(self, obj):
+        if obj.proof_staged:
+            return "Em transferência"
         if obj.proof_of_payment:
             # obj.proof_of_payment.url usa o Cloudinary Storage para obter o URL completo.
             return mark_safe(f'<a href="{obj.proof_of_payment.url}" target="_blank">Ver Comprovativo</a>')
@@ -56,6 +205,8 @@ class DepositAdmin(admin.ModelAdmin):
 
     # Método para exibir a imagem/link na PÁGINA DE EDIÇÃO/MODIFICAÇÃO
     def current_proof_display(self, obj):
+        if obj.proof_staged:
+            return "Comprovativo ainda em transferência para o armazenamento."
         if obj.proof_of_payment:
             # Exibe a imagem diretamente e fornece um link para visualização
             return mark_safe(f'''
@@ -67,18 +218,20 @@ class DepositAdmin(admin.ModelAdmin):
     current_proof_display.short_description = 'Comprovativo Atual'
 
 @admin.register(Withdrawal)
-class WithdrawalAdmin(admin.ModelAdmin):
+class WithdrawalAdmin(UserSearchMixin, admin.ModelAdmin):
     list_display = ('user', 'amount', 'status', 'created_at')
+    actions = [export_csv]
     search_fields = ('user__phone_number',)
     list_filter = ('status',)
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(ShardedModelAdmin):
     list_display = ('user', 'earnings', 'completed_at')
+    actions = [export_csv]
     search_fields = ('user__phone_number',)
 
 @admin.register(Roulette)
-class RouletteAdmin(admin.ModelAdmin):
+class RouletteAdmin(ShardedModelAdmin):
     list_display = ('user', 'prize', 'is_approved', 'spin_date')
     search_fields = ('user__phone_number',)
     list_filter = ('is_approved',)
@@ -88,9 +241,67 @@ class RouletteSettingsAdmin(admin.ModelAdmin):
     list_display = ('id', 'prizes')
 
 @admin.register(UserLevel)
-class UserLevelAdmin(admin.ModelAdmin):
+class UserLevelAdmin(UserSearchMixin, admin.ModelAdmin):
     list_display = ('user', 'level', 'purchase_date', 'is_active')
     search_fields = ('user__phone_number', 'level__name')
     list_filter = ('is_active',)
+    readonly_fields = ('deactivated_at',)
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_at', 'created_at', 'finished_at')
+    search_fields = ('name',)
+    list_filter = ('status', 'name')
+    readonly_fields = ('last_error',)
+
+@admin.register(DailyPlatformStats)
+class DailyPlatformStatsAdmin(admin.ModelAdmin):
+    # Painel de análise: lê apenas a tabela de agregados (uma linha por dia),
+    # atualizada por `manage.py refresh_platform_stats`.
+    change_list_template = 'admin/core/dailyplatformstats/change_list.html'
+    list_display = (
+        'date', 'deposits_total', 'withdrawals_total', 'new_users', 'levels_purchased',
+        'active_levels', 'tasks_payout', 'roulette_payout',
+    )
+    date_hierarchy = 'date'
+    chart_days = 90
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        rows = list(
+            DailyPlatformStats.objects.order_by('-date').values(
+                'date', 'deposits_total', 'withdrawals_total', 'new_users',
+                'active_levels', 'roulette_payout', 'tasks_payout',
+            )[:self.chart_days]
+        )
+        rows.reverse()
+        chart_data = {
+            'labels': [row['date'].isoformat() for row in rows],
+            'deposits': [float(row['deposits_total']) for row in rows],
+            'withdrawals': [float(row['withdrawals_total']) for row in rows],
+            'roulette': [float(row['roulette_payout']) for row in rows],
+            'tasks': [float(row['tasks_payout']) for row in rows],
+            'new_users': [row['new_users'] for row in rows],
+            'active_levels': [row['active_levels'] for row in rows],
+        }
+        extra_context = {**(extra_context or {}), 'chart_data': chart_data}
+        return super().changelist_view(request, extra_context=extra_context)
+
+@admin.register(ArchivedUserTotals)
+class ArchivedUserTotalsAdmin(UserSearchMixin, admin.ModelAdmin):
+    # Totais de Task/Roulette já movidos para o arquivo (manage.py archive_history).
+    list_display = ('user', 'tasks_count', 'tasks_earnings', 'roulette_count', 'roulette_prizes', 'updated_at')
+    search_fields = ('user__phone_number',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 # ---
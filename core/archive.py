@@ -0,0 +1,161 @@
+import gzip
+import json
+import os
+from collections import defaultdict
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchivedBatch, ArchivedUserTotals, Roulette, Task
+from .sharding import is_sharded
+
+# Modelos arquivados e como cada linha entra nos totais por usuário.
+ARCHIVED_MODELS = {
+    'task': {
+        'model': Task,
+        'date_field': 'completed_at',
+        'fields': ('id', 'user_id', 'earnings', 'completed_at'),
+        'value_field': 'earnings',
+        'count_total': 'tasks_count',
+        'sum_total': 'tasks_earnings',
+    },
+    'roulette': {
+        'model': Roulette,
+        'date_field': 'spin_date',
+        'fields': ('id', 'user_id', 'prize', 'spin_date', 'is_approved'),
+        'value_field': 'prize',
+        'count_total': 'roulette_count',
+        'sum_total': 'roulette_prizes',
+    },
+}
+
+
+def partition_path(name, day, first_id, last_id, shard=None):
+    """
+    <ARCHIVE_ROOT>/<modelo>/<AAAA>/<MM>/<AAAA-MM-DD>.<id inicial>-<id final>.jsonl.gz
+    Com sharding os ids repetem-se entre shards e o alias entra no nome
+    (<AAAA-MM-DD>.<shard>.<id inicial>-<id final>.jsonl.gz).
+    """
+    ids = f'{first_id}-{last_id}' if shard is None else f'{shard}.{first_id}-{last_id}'
+    return (
+        Path(settings.ARCHIVE_ROOT) / name / f'{day:%Y}' / f'{day:%m}'
+        / f'{day.isoformat()}.{ids}.jsonl.gz'
+    )
+
+
+def _write_partition(path, rows):
+    # Escreve num ficheiro temporário e renomeia: um ficheiro de partição
+    # nunca fica meio escrito. Repetir o mesmo lote reescreve o mesmo ficheiro.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as archive_file:
+        for row in rows:
+            archive_file.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+    os.replace(tmp_path, path)
+
+
+def archive_model(name, cutoff, batch_size=5000):
+    """
+    Move as linhas de `name` anteriores a `cutoff` para ficheiros gzip JSONL
+    particionados por dia e soma-as em ArchivedUserTotals, lote a lote e
+    shard a shard. Devolve o número de linhas arquivadas.
+    """
+    spec = ARCHIVED_MODELS[name]
+    # Lotes de uma execução anterior com os totais somados mas sem o DELETE confirmado.
+    for batch in ArchivedBatch.objects.filter(name=name).order_by('id'):
+        _delete_batch(spec, batch)
+
+    queryset = spec['model'].objects.filter(**{f"{spec['date_field']}__lt": cutoff}).order_by('id')
+    if not is_sharded(spec['model']):
+        return _archive_rows(name, spec, queryset, cutoff, batch_size)
+    return sum(
+        _archive_rows(name, spec, shard_queryset, cutoff, batch_size, shard=shard_queryset.db)
+        for shard_queryset in queryset.on_shards()
+    )
+
+
+def _delete_batch(spec, batch):
+    # DELETE direto: as linhas já estão no arquivo e nos totais, e não queremos
+    # carregar cada objeto só para enviar sinais. Repeti-lo não apaga mais nada.
+    model, date_field = spec['model'], spec['date_field']
+    using = batch.shard or DEFAULT_DB_ALIAS
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {model._meta.db_table} WHERE id >= %s AND id <= %s AND {date_field} < %s',
+            [batch.first_id, batch.last_id, batch.cutoff],
+        )
+    batch.delete()
+
+
+def _archive_rows(name, spec, queryset, cutoff, batch_size, shard=None):
+    date_field = spec['date_field']
+    archived = 0
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).values(*spec['fields'])[:batch_size])
+        if not rows:
+            return archived
+        last_id = rows[-1]['id']
+
+        by_day = defaultdict(list)
+        for row in rows:
+            by_day[timezone.localdate(row[date_field])].append(row)
+        for day, day_rows in by_day.items():
+            _write_partition(partition_path(name, day, day_rows[0]['id'], day_rows[-1]['id'], shard), day_rows)
+
+        totals = defaultdict(lambda: [0, Decimal('0')])
+        for row in rows:
+            totals[row['user_id']][0] += 1
+            totals[row['user_id']][1] += row[spec['value_field']]
+
+        # Com sharding os totais e as linhas vivem em bases diferentes: os totais
+        # confirmam primeiro, com a marca do lote, e só depois o shard apaga as
+        # linhas. Se o DELETE falhar, a próxima execução repete-o pela marca.
+        with transaction.atomic():
+            ArchivedUserTotals.objects.bulk_create(
+                [ArchivedUserTotals(user_id=user_id) for user_id in totals], ignore_conflicts=True,
+            )
+            for user_id, (count, total) in totals.items():
+                ArchivedUserTotals.objects.filter(user_id=user_id).update(**{
+                    spec['count_total']: F(spec['count_total']) + count,
+                    spec['sum_total']: F(spec['sum_total']) + total,
+                })
+            batch = ArchivedBatch.objects.create(
+                name=name, shard=shard or '', first_id=rows[0]['id'], last_id=last_id, cutoff=cutoff,
+            )
+        _delete_batch(spec, batch)
+        archived += len(rows)
+
+
+def iter_archive(name, start=None, end=None, user_id=None):
+    """Lê as linhas arquivadas de `name` entre as datas `start` e `end` (inclusive)."""
+    root = Path(settings.ARCHIVE_ROOT) / name
+    for path in sorted(root.glob('*/*/*.jsonl.gz')):
+        day = path.name[:10]
+        if (start and day < start.isoformat()) or (end and day > end.isoformat()):
+            continue
+        with gzip.open(path, 'rt', encoding='utf-8') as archive_file:
+            for line in archive_file:
+                row = json.loads(line)
+                if user_id is None or row['user_id'] == user_id:
+                    yield row
+
+
+def archived_daily_totals(name, start, end):
+    """
+    {dia local: {'total': soma}} das linhas arquivadas de `name` entre `start`
+    e `end`, para os agregados diários (core/rollups.py) não perderem os dias
+    já arquivados.
+    """
+    spec = ARCHIVED_MODELS[name]
+    totals = defaultdict(lambda: {'total': Decimal('0')})
+    for row in iter_archive(name, start, end):
+        day = timezone.localdate(parse_datetime(row[spec['date_field']]))
+        totals[day]['total'] += Decimal(row[spec['value_field']])
+    return dict(totals)
@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+
+UserModel = get_user_model()
+
+
+class UserWithLevelBackend(ModelBackend):
+    """ModelBackend que traz o nível ativo na mesma consulta de request.user."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username=username, password=password, **kwargs)
+        if user is None and password is not None:
+            # O ModelBackend listado a seguir (só para sessões antigas) repetiria
+            # a mesma verificação e o mesmo hash; PermissionDenied encerra aqui.
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related('active_level').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
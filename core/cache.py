@@ -0,0 +1,39 @@
+import uuid
+
+from django.core.cache import cache
+
+# Versões de conteúdo guardadas na cache. Cada escrita nos modelos
+# correspondentes (ver core/signals.py) troca a versão, invalidando
+# ETags e entradas de cache que dependem dela.
+SETTINGS_VERSION_KEY = 'version:settings'
+LEVELS_VERSION_KEY = 'version:levels'
+USER_VERSION_KEY = 'version:user:{}'
+TEAM_VERSION_KEY = 'version:team:{}'
+
+VERSION_TIMEOUT = None  # Nunca expira; só muda por bump_version().
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def get_versions(*keys):
+    """Devolve as versões pedidas numa única ida à cache, criando as que faltam."""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), VERSION_TIMEOUT)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(key):
+    cache.set(key, _new_version(), VERSION_TIMEOUT)
+
+
+def user_version_key(user_id):
+    return USER_VERSION_KEY.format(user_id)
+
+
+def team_version_key(user_id):
+    return TEAM_VERSION_KEY.format(user_id)
@@ -0,0 +1,97 @@
+import hashlib
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.messages import get_messages
+from django.contrib.messages.storage.cookie import CookieStorage
+
+from .cache import (
+    LEVELS_VERSION_KEY, SETTINGS_VERSION_KEY, get_versions, team_version_key, user_version_key,
+)
+
+# Páginas anónimas servidas a partir da cache partilhada (ver views._render_anonymous_shell).
+SHELL_URL_NAMES = ('cadastro', 'login')
+
+
+def _digest(*parts):
+    return hashlib.md5('|'.join(map(str, parts)).encode(), usedforsecurity=False).hexdigest()
+
+
+def is_anonymous_shell_request(request):
+    """
+    Pedido GET sem cookie de sessão nem de mensagens: a página de login/cadastro
+    é igual para todos estes visitantes e pode vir da cache partilhada. Não
+    acede à sessão, para não acrescentar "Vary: Cookie" à resposta.
+    """
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and CookieStorage.cookie_name not in request.COOKIES
+    )
+
+
+def page_etag(request, *args, **kwargs):
+    """
+    ETag barato para páginas quase estáticas (sobre, menu, nivel, login, cadastro).
+
+    Combina a versão do deploy, as versões de configurações/níveis em cache,
+    o estado do usuário e o cookie CSRF, sem tocar nos templates. Devolve None
+    (sem ETag) para pedidos não seguros ou quando há mensagens por mostrar.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    if request.resolver_match.url_name in SHELL_URL_NAMES and is_anonymous_shell_request(request):
+        return _digest(settings.RELEASE_VERSION, request.path, *get_versions(SETTINGS_VERSION_KEY))
+    if len(get_messages(request)):
+        return None
+
+    keys = [SETTINGS_VERSION_KEY, LEVELS_VERSION_KEY]
+    user = request.user
+    if user.is_authenticated:
+        keys.append(user_version_key(user.pk))
+        user_state = [
+            user.pk, user.available_balance, user.subsidy_balance,
+            user.roulette_spins, user.level_active,
+        ]
+    else:
+        user_state = ['anon']
+
+    return _digest(
+        settings.RELEASE_VERSION,
+        request.get_full_path(),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        *get_versions(*keys),
+        *user_state,
+    )
+
+
+# --- ETags da API JSON ---
+# Calculados apenas com o id do usuário na sessão e uma leitura da cache, para
+# que um poll sem alterações devolva 304 sem carregar o usuário nem consultar
+# a base de dados.
+
+def _user_api_etag(request, name, *keys):
+    user_id = request.session.get(SESSION_KEY)
+    if user_id is None:
+        return None
+    return _digest(settings.RELEASE_VERSION, name, user_id, date.today(), *get_versions(*keys))
+
+
+def balance_etag(request):
+    user_id = request.session.get(SESSION_KEY)
+    return _user_api_etag(request, 'balance', user_version_key(user_id))
+
+
+def active_level_etag(request):
+    user_id = request.session.get(SESSION_KEY)
+    return _user_api_etag(request, 'active_level', user_version_key(user_id), LEVELS_VERSION_KEY)
+
+
+def team_etag(request):
+    user_id = request.session.get(SESSION_KEY)
+    return _user_api_etag(request, 'team', team_version_key(user_id), LEVELS_VERSION_KEY)
+
+
+def levels_etag(request):
+    return _digest(settings.RELEASE_VERSION, 'levels', *get_versions(LEVELS_VERSION_KEY))
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# Canal do LISTEN/NOTIFY quando EVENT_BUS = 'postgres'.
+CHANNEL = 'core_events'
+# Eventos por ligação ainda não enviados; um cliente lento perde os mais novos
+# e recebe o estado completo ao voltar a ligar.
+QUEUE_SIZE = 100
+# Campos enviados no evento "balance".
+BALANCE_FIELDS = ('available_balance', 'subsidy_balance', 'roulette_spins')
+
+# {user_id: {(loop, fila), ...}} das ligações SSE abertas neste processo.
+_subscribers = {}
+_lock = threading.Lock()
+_listener = None
+
+
+def publish(user_id, event, data):
+    """
+    Envia `event` aos clientes ligados de `user_id`, depois do commit da
+    transação atual (um rollback não publica nada).
+    """
+    payload = json.dumps({'user_id': user_id, 'event': event, 'data': data}, cls=DjangoJSONEncoder)
+    transaction.on_commit(lambda: _send(payload))
+
+
+def balance_state(user):
+    # Normaliza valores ainda não relidos da base (ex.: saldo += 5) para o formato gravado.
+    state = {}
+    for name in BALANCE_FIELDS:
+        field = user._meta.get_field(name)
+        value = field.to_python(getattr(user, name))
+        if isinstance(value, Decimal):
+            value = value.quantize(Decimal(1).scaleb(-field.decimal_places))
+        state[name] = value
+    return state
+
+
+def _send(payload):
+    if settings.EVENT_BUS == 'postgres':
+        # Chega a todos os processos (incluindo este) pelo listener de cada um.
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, payload])
+    else:
+        dispatch(payload)
+
+
+def dispatch(payload):
+    """Entrega um evento às ligações deste processo. Pode ser chamada de qualquer thread."""
+    message = json.loads(payload)
+    with _lock:
+        targets = list(_subscribers.get(message['user_id'], ()))
+    for loop, queue in targets:
+        loop.call_soon_threadsafe(_offer, queue, message)
+
+
+def _offer(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        pass
+
+
+def subscribe(user_id):
+    """Regista uma ligação SSE no loop atual e devolve a fila dos seus eventos."""
+    queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+    with _lock:
+        _subscribers.setdefault(user_id, set()).add((asyncio.get_running_loop(), queue))
+    if settings.EVENT_BUS == 'postgres':
+        _start_listener()
+    return queue
+
+
+def unsubscribe(user_id, queue):
+    with _lock:
+        queues = _subscribers.get(user_id, set())
+        queues.discard((asyncio.get_running_loop(), queue))
+        if not queues:
+            _subscribers.pop(user_id, None)
+
+
+def _start_listener():
+    global _listener
+    with _lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=_listen, name='core-events-listener', daemon=True)
+            _listener.start()
+
+
+def _listen():
+    """
+    Uma ligação dedicada por processo, em LISTEN, que reencaminha cada NOTIFY
+    para as ligações SSE locais. Volta a ligar se a base de dados cair.
+    """
+    while True:
+        connection = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            connection.ensure_connection()
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            raw = connection.connection
+            while True:
+                if hasattr(raw, 'notifies') and callable(raw.notifies):
+                    # psycopg 3
+                    for notify in raw.notifies(timeout=settings.EVENTS_KEEPALIVE_SECONDS):
+                        dispatch(notify.payload)
+                    continue
+                # psycopg2
+                if select.select([raw], [], [], settings.EVENTS_KEEPALIVE_SECONDS) == ([], [], []):
+                    continue
+                raw.poll()
+                while raw.notifies:
+                    dispatch(raw.notifies.pop(0).payload)
+        except Exception:
+            logger.exception('Listener de eventos perdeu a ligação; a voltar a ligar')
+            time.sleep(1)
+        finally:
+            connection.close()
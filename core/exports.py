@@ -0,0 +1,170 @@
+import csv
+from datetime import datetime, timezone as dt_timezone
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db import connections, models
+from django.db.models import Case, CharField, F, Func, Value, When
+from django.db.models.functions import NullIf
+
+from .models import CustomUser, Deposit, Task, Withdrawal
+from .sharding import is_sharded
+
+# Colunas exportadas por modelo (nunca a senha dos usuários).
+EXPORTS = {
+    'user': (CustomUser, (
+        'id', 'phone_number', 'full_name', 'invite_code', 'invited_by__phone_number', 'available_balance',
+        'subsidy_balance', 'level_active', 'roulette_spins', 'is_active', 'is_staff', 'date_joined',
+    )),
+    'deposit': (Deposit, ('id', 'user__phone_number', 'amount', 'is_approved', 'proof_of_payment', 'created_at')),
+    'withdrawal': (Withdrawal, ('id', 'user__phone_number', 'amount', 'status', 'created_at')),
+    'task': (Task, ('id', 'user__phone_number', 'earnings', 'completed_at')),
+}
+
+EXPORT_NAMES = {model: name for name, (model, fields) in EXPORTS.items()}
+
+ROWS_PER_CHUNK = 2000
+
+# Formato comum do COPY (PostgreSQL) e da leitura em Python: booleanos
+# "true"/"false", datas-hora ISO 8601 em UTC, com microssegundos, e texto
+# vazio igual a NULL (campo vazio, sem aspas).
+DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+PG_DATETIME_FORMAT = 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"'
+
+
+class _Echo:
+    """Ficheiro falso para o csv.writer: devolve a linha em vez de a guardar."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_writer():
+    # O COPY termina as linhas com \n: o csv.writer faz o mesmo.
+    return csv.writer(_Echo(), lineterminator='\n')
+
+
+def _copy_supported(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    # COPY com parâmetros e leitura por blocos só existe no psycopg 3.
+    with connection.cursor() as cursor:
+        return hasattr(cursor.cursor, 'copy')
+
+
+def format_value(value):
+    """Valor como o COPY o escreve (ver DATETIME_FORMAT); None fica vazio."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, datetime):
+        return value.astimezone(dt_timezone.utc).strftime(DATETIME_FORMAT)
+    return value
+
+
+def _model_field(model, path):
+    *relations, name = path.split('__')
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def _copy_column(model, path):
+    """Expressão SQL de `path` já no formato de format_value()."""
+    field = _model_field(model, path)
+    if isinstance(field, models.BooleanField):
+        return Case(
+            When(**{path: True}, then=Value('true')), When(**{path: False}, then=Value('false')),
+            output_field=CharField(),
+        )
+    if isinstance(field, models.DateTimeField):
+        return Func(
+            F(path), template=f"to_char(%(expressions)s AT TIME ZONE 'UTC', '{PG_DATETIME_FORMAT}')",
+            output_field=CharField(),
+        )
+    if isinstance(field, (models.CharField, models.TextField, models.FileField)):
+        # O COPY escreve '' como "" e NULL vazio; o csv.writer escreve ambos vazios.
+        return NullIf(path, Value(''))
+    return path
+
+
+def stream_csv(queryset, fields):
+    """
+    Gera o CSV de `queryset` em blocos de texto, com memória constante.
+    Em PostgreSQL (psycopg 3) o próprio servidor escreve o CSV via COPY ... TO STDOUT;
+    nas outras bases lê-se por .values_list().iterator(). Task com sharding
+    é exportada shard a shard (por id dentro de cada shard). Os dois caminhos
+    escrevem os valores no mesmo formato (format_value()).
+    """
+    writer = _csv_writer()
+    yield writer.writerow(fields)
+
+    if not is_sharded(queryset.model):
+        queryset = queryset.order_by('pk')
+        if _copy_supported(connections[queryset.db]):
+            yield from _copy_rows(queryset, fields)
+        else:
+            yield from _iterate_rows(queryset.values_list(*fields), writer)
+        return
+    for shard_queryset in queryset.on_shards():
+        yield from _stream_shard_rows(shard_queryset.order_by('pk'), fields, writer)
+
+
+async def astream_csv(queryset, fields):
+    """
+    stream_csv() para respostas ASGI: cada bloco é lido na thread das views
+    síncronas, sem bloquear o loop e sem juntar o CSV inteiro em memória
+    (o StreamingHttpResponse faria list() de um iterador síncrono).
+    """
+    chunks = stream_csv(queryset, fields)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
+
+
+def _stream_shard_rows(queryset, fields, writer):
+    # O usuário vive na base principal: sem JOIN, as colunas user__* são
+    # preenchidas com uma consulta por bloco de linhas.
+    user_fields = [field for field in fields if field.startswith('user__')]
+    columns = ['user_id' if field in user_fields else field for field in fields]
+    rows = queryset.values_list(*columns).iterator(chunk_size=ROWS_PER_CHUNK)
+    user_index = columns.index('user_id') if user_fields else None
+    while chunk := list(islice(rows, ROWS_PER_CHUNK)):
+        users = {}
+        if user_fields:
+            user_ids = {row[user_index] for row in chunk}
+            lookups = [field[len('user__'):] for field in user_fields]
+            users = {
+                row[0]: dict(zip(user_fields, row[1:]))
+                for row in CustomUser.objects.filter(pk__in=user_ids).values_list('pk', *lookups)
+            }
+        yield ''.join(
+            writer.writerow([
+                format_value(users.get(row[user_index], {}).get(field) if field in user_fields else value)
+                for field, value in zip(fields, row)
+            ])
+            for row in chunk
+        )
+
+
+def _copy_rows(queryset, fields):
+    rows = queryset.values_list(*[_copy_column(queryset.model, field) for field in fields])
+    connection = connections[rows.db]
+    sql, params = rows.query.get_compiler(using=rows.db).as_sql()
+    with connection.cursor() as cursor:
+        with cursor.cursor.copy(f'COPY ({sql}) TO STDOUT WITH (FORMAT csv)', params) as copy:
+            for block in copy:
+                yield bytes(block).decode('utf-8')
+
+
+def _iterate_rows(rows, writer):
+    lines = []
+    for row in rows.iterator(chunk_size=ROWS_PER_CHUNK):
+        lines.append(writer.writerow([format_value(value) for value in row]))
+        if len(lines) >= ROWS_PER_CHUNK:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Level, UserLevel
+
+HORIZONS = (30, 60, 90)
+
+
+def active_cohorts():
+    """
+    Níveis ativos agrupados na base de dados por (nível, dia da compra):
+    milhões de UserLevel viram no máximo níveis x dias de ciclo linhas.
+    """
+    return (
+        UserLevel.objects.filter(is_active=True)
+        .annotate(day=TruncDate('purchase_date'))
+        .values_list('level_id', 'day')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+
+
+def payout_forecast(horizon=max(HORIZONS), daily_gains=None, today=None):
+    """
+    Pagamentos diários previstos de daily_gain para os próximos `horizon` dias.
+
+    Cada nível paga daily_gain por dia, do dia da compra até ao fim de
+    cycle_days. `daily_gains` ({level_id: valor}) substitui o daily_gain
+    atual para simulações. Cada coorte marca o seu início e fim numa
+    tabela de diferenças; a soma acumulada dá o calendário dia a dia.
+    """
+    today = today or timezone.localdate()
+    levels = {level.id: level for level in Level.objects.all()}
+    gains = {level_id: level.daily_gain for level_id, level in levels.items()}
+    gains.update(daily_gains or {})
+
+    deltas = [Decimal('0')] * (horizon + 1)
+    by_level = {
+        level_id: {'level': level, 'daily_gain': gains[level_id], 'active': 0, 'horizon_total': Decimal('0'), 'remaining_total': Decimal('0')}
+        for level_id, level in levels.items()
+    }
+    for level_id, day, count in active_cohorts():
+        remaining_days = levels[level_id].cycle_days - (today - day).days
+        if remaining_days <= 0:
+            continue
+        daily = gains[level_id] * count
+        paid_days = min(remaining_days, horizon)
+        deltas[0] += daily
+        deltas[paid_days] -= daily
+
+        row = by_level[level_id]
+        row['active'] += count
+        row['horizon_total'] += daily * paid_days
+        row['remaining_total'] += daily * remaining_days
+
+    schedule = []
+    running = Decimal('0')
+    for offset in range(horizon):
+        running += deltas[offset]
+        schedule.append((today + timedelta(days=offset), running))
+
+    totals = {}
+    cumulative = Decimal('0')
+    for offset, (day, amount) in enumerate(schedule, start=1):
+        cumulative += amount
+        if offset in HORIZONS:
+            totals[offset] = cumulative
+
+    return {
+        'schedule': schedule,
+        'totals': totals,
+        'remaining_total': sum(row['remaining_total'] for row in by_level.values()),
+        'by_level': [row for row in by_level.values() if row['active']],
+    }
@@ -0,0 +1,125 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Funções registadas com @job_handler('nome'), chamadas com o payload do Job.
+HANDLERS = {}
+
+
+def job_handler(name):
+    def decorator(func):
+        HANDLERS[name] = func
+        return func
+    return decorator
+
+
+def queue_enabled():
+    """
+    A fila só é usada quando a base de dados suporta SELECT ... FOR UPDATE
+    SKIP LOCKED (PostgreSQL). Em SQLite os jobs correm de forma síncrona.
+    """
+    if settings.JOBS_ALWAYS_SYNC:
+        return False
+    return connections[DEFAULT_DB_ALIAS].features.has_select_for_update_skip_locked
+
+
+def enqueue(name, payload=None, run_at=None, max_attempts=None):
+    """
+    Cria um Job para ser executado por `manage.py run_workers`. Sem suporte a
+    SKIP LOCKED, o job é executado logo após o commit da transação atual.
+    """
+    if name not in HANDLERS:
+        raise ValueError(f'Tarefa desconhecida: {name}')
+
+    job = Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+    if not queue_enabled():
+        transaction.on_commit(lambda: run_job(job))
+    return job
+
+
+def claim_jobs(batch_size):
+    """
+    Reserva até `batch_size` jobs prontos a correr. O SKIP LOCKED deixa vários
+    workers (em processos diferentes) reservar lotes distintos em paralelo.
+    Jobs "em execução" há mais de JOBS_LOCK_TIMEOUT segundos (worker que
+    morreu a meio) voltam a poder ser reservados.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Job.STATUS_PENDING, run_at__lte=now)
+                | Q(status=Job.STATUS_RUNNING, locked_at__lt=stale)
+            )
+            .order_by('run_at', 'id')[:batch_size]
+        )
+        if jobs:
+            Job.objects.filter(pk__in=[j.pk for j in jobs]).update(status=Job.STATUS_RUNNING, locked_at=now)
+    return jobs
+
+
+def retry_delay(attempts):
+    # Backoff exponencial: 30s, 60s, 120s, ... limitado a JOBS_RETRY_MAX_DELAY.
+    return min(settings.JOBS_RETRY_BASE_DELAY * 2 ** (attempts - 1), settings.JOBS_RETRY_MAX_DELAY)
+
+
+def run_job(job):
+    job.attempts += 1
+    try:
+        HANDLERS[job.name](**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = Job.STATUS_FAILED
+            job.finished_at = timezone.now()
+            logger.exception('Job %s falhou definitivamente após %s tentativas', job, job.attempts)
+        else:
+            job.status = Job.STATUS_PENDING
+            job.run_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+            logger.warning('Job %s falhou (tentativa %s); nova tentativa em %s', job, job.attempts, job.run_at)
+    else:
+        job.status = Job.STATUS_DONE
+        job.finished_at = timezone.now()
+    job.locked_at = None
+    job.save(update_fields=['attempts', 'status', 'run_at', 'locked_at', 'last_error', 'finished_at'])
+    return job.status == Job.STATUS_DONE
+
+
+def run_pending(batch_size=10):
+    """Reserva e executa um lote de jobs. Devolve quantos foram executados."""
+    jobs = claim_jobs(batch_size)
+    for job in jobs:
+        run_job(job)
+    return len(jobs)
+
+
+# --- Tarefas ---
+
+@job_handler('transfer_deposit_proof')
+def transfer_deposit_proof(deposit_id):
+    from .uploads import transfer_deposit_proof as transfer
+
+    transfer(deposit_id)
+
+
+@job_handler('refresh_platform_stats')
+def refresh_platform_stats(lookback_days=2):
+    from .rollups import refresh_daily_stats
+
+    refresh_daily_stats(lookback_days=lookback_days)
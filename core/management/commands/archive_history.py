@@ -0,0 +1,31 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.archive import ARCHIVED_MODELS, archive_model
+
+
+class Command(BaseCommand):
+    help = (
+        "Arquiva as linhas de Task e Roulette mais antigas que a retenção em ficheiros "
+        "gzip JSONL particionados por dia (ARCHIVE_ROOT) e mantém os totais por usuário."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days', type=int, default=settings.ARCHIVE_RETENTION_DAYS,
+            help='Linhas mais recentes que isto ficam na base de dados.',
+        )
+        parser.add_argument('--models', nargs='+', choices=sorted(ARCHIVED_MODELS), default=sorted(ARCHIVED_MODELS))
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        # Corta no início do dia local, para que cada partição diária fique completa.
+        cutoff_day = timezone.localdate() - timedelta(days=options['retention_days'])
+        cutoff = timezone.make_aware(datetime.combine(cutoff_day, time.min))
+
+        for name in options['models']:
+            archived = archive_model(name, cutoff, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{name}: {archived} linhas arquivadas (antes de {cutoff_day}).'))
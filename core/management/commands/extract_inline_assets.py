@@ -0,0 +1,77 @@
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Blocos <style>/<script> inline que podem ser movidos para ficheiros estáticos.
+# Blocos com sintaxe de template ({{ }} ou {% %}) ou scripts com atributos
+# (ex.: src=...) permanecem no HTML, pois dependem do contexto da página.
+INLINE_BLOCK_RE = re.compile(r'(?P<indent>[ \t]*)<(?P<tag>style|script)>(?P<body>.*?)</(?P=tag)>', re.S)
+TEMPLATE_SYNTAX_RE = re.compile(r'\{\{|\{%')
+
+
+class Command(BaseCommand):
+    help = (
+        "Move os blocos <style>/<script> inline dos templates para "
+        "static/css/pages/ e static/js/pages/, para serem servidos com hash "
+        "e compressão pelo WhiteNoise."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Apenas lista os blocos que seriam extraídos.',
+        )
+
+    def handle(self, *args, **options):
+        templates_dir = Path(settings.BASE_DIR) / 'templates'
+        static_dir = Path(settings.BASE_DIR) / 'static'
+        dry_run = options['dry_run']
+
+        for template_path in sorted(templates_dir.glob('*.html')):
+            source = template_path.read_text(encoding='utf-8')
+            page = template_path.stem
+            counters = {'style': 0, 'script': 0}
+
+            def replace(match):
+                tag = match.group('tag')
+                body = match.group('body')
+                if TEMPLATE_SYNTAX_RE.search(body):
+                    return match.group(0)
+
+                counters[tag] += 1
+                suffix = '' if counters[tag] == 1 else f'-{counters[tag]}'
+                if tag == 'style':
+                    relative = f'css/pages/{page}{suffix}.css'
+                    markup = f'<link rel="stylesheet" href="{{% static \'{relative}\' %}}">'
+                else:
+                    relative = f'js/pages/{page}{suffix}.js'
+                    markup = f'<script src="{{% static \'{relative}\' %}}"></script>'
+
+                self.stdout.write(f'{template_path.name}: <{tag}> -> static/{relative}')
+                if not dry_run:
+                    target = static_dir / relative
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    target.write_text(self._dedent(body), encoding='utf-8')
+                return match.group('indent') + markup
+
+            updated = INLINE_BLOCK_RE.sub(replace, source)
+            if updated == source:
+                continue
+            if '{% load static %}' not in updated:
+                updated = '{% load static %}\n' + updated
+            if not dry_run:
+                template_path.write_text(updated, encoding='utf-8')
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('Dry run: nenhum ficheiro foi alterado.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Extração concluída. Execute collectstatic para gerar os bundles com hash.'))
+
+    @staticmethod
+    def _dedent(body):
+        lines = body.strip('\n').splitlines()
+        indents = [len(line) - len(line.lstrip()) for line in lines if line.strip()]
+        margin = min(indents) if indents else 0
+        return '\n'.join(line[margin:] for line in lines).rstrip() + '\n'
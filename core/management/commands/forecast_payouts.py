@@ -0,0 +1,50 @@
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.forecast import payout_forecast
+from core.models import Level
+
+
+class Command(BaseCommand):
+    help = (
+        "Prevê quanto daily_gain será pago nos próximos dias pelos níveis ativos "
+        "(totais a 30/60/90 dias e por nível), com simulação de outros daily_gain."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon', type=int, default=90, help='Dias previstos.')
+        parser.add_argument(
+            '--daily-gain', action='append', default=[], metavar='NÍVEL=VALOR',
+            help='Simula outro daily_gain para um nível (pelo nome). Pode repetir-se.',
+        )
+        parser.add_argument('--schedule', action='store_true', help='Escreve o calendário dia a dia em CSV no stdout.')
+
+    def handle(self, *args, **options):
+        daily_gains = {}
+        for override in options['daily_gain']:
+            name, _, value = override.partition('=')
+            try:
+                daily_gains[Level.objects.get(name=name).id] = Decimal(value)
+            except Level.DoesNotExist:
+                raise CommandError(f'Nível "{name}" não encontrado.')
+            except InvalidOperation:
+                raise CommandError(f'Valor inválido em "{override}".')
+
+        forecast = payout_forecast(horizon=options['horizon'], daily_gains=daily_gains)
+
+        if options['schedule']:
+            writer = csv.writer(self.stdout)
+            writer.writerow(('date', 'payout'))
+            writer.writerows((day.isoformat(), amount) for day, amount in forecast['schedule'])
+            return
+
+        for row in forecast['by_level']:
+            self.stdout.write(
+                f"{row['level'].name:<20} {row['active']:>9} ativos  daily_gain {row['daily_gain']:>10}  "
+                f"{options['horizon']} dias: {row['horizon_total']:>14}  até ao fim: {row['remaining_total']:>14}"
+            )
+        for days, total in forecast['totals'].items():
+            self.stdout.write(f'Próximos {days} dias: {total}')
+        self.stdout.write(self.style.SUCCESS(f"Até ao fim dos ciclos ativos: {forecast['remaining_total']}"))
@@ -0,0 +1,119 @@
+import hashlib
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image, features
+
+SOURCE_DIRS = ('images', 'icons')
+SOURCE_EXTENSIONS = {'.jpg', '.jpeg', '.png'}
+VARIANTS_DIR = 'variants'
+MANIFEST_NAME = 'manifest.json'
+
+# Formatos modernos suportados e a qualidade usada em cada um.
+FORMAT_OPTIONS = {
+    'avif': {'quality': 50},
+    'webp': {'quality': 80, 'method': 6},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera variantes WebP/AVIF redimensionadas das imagens em static/images "
+        "e static/icons, deteta ficheiros duplicados pelo hash do conteúdo e "
+        "escreve o manifesto usado pela tag {% picture %}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--widths', default='320,640,960,1280',
+            help='Larguras (px) das variantes, separadas por vírgula.',
+        )
+        parser.add_argument(
+            '--formats', default='avif,webp',
+            help='Formatos a gerar, por ordem de preferência (avif, webp).',
+        )
+
+    def handle(self, *args, **options):
+        static_dir = Path(settings.BASE_DIR) / 'static'
+        output_dir = static_dir / VARIANTS_DIR
+
+        try:
+            widths = sorted({int(w) for w in options['widths'].split(',') if w.strip()})
+        except ValueError:
+            raise CommandError('--widths deve ser uma lista de inteiros separados por vírgula.')
+
+        formats = []
+        for fmt in (f.strip().lower() for f in options['formats'].split(',') if f.strip()):
+            if fmt not in FORMAT_OPTIONS:
+                raise CommandError(f'Formato não suportado: {fmt}')
+            if not features.check(fmt):
+                self.stdout.write(self.style.WARNING(f'O Pillow instalado não suporta {fmt}; ignorado.'))
+                continue
+            formats.append(fmt)
+
+        # 1. Agrupa os ficheiros de origem pelo hash do conteúdo.
+        sources_by_hash = {}
+        for directory in SOURCE_DIRS:
+            for path in sorted((static_dir / directory).glob('*')):
+                if path.suffix.lower() not in SOURCE_EXTENSIONS:
+                    continue
+                digest = hashlib.sha256(path.read_bytes()).hexdigest()
+                sources_by_hash.setdefault(digest, []).append(path.relative_to(static_dir).as_posix())
+
+        manifest = {}
+        duplicates = 0
+        for digest, names in sources_by_hash.items():
+            canonical = names[0]
+            if len(names) > 1:
+                duplicates += len(names) - 1
+                self.stdout.write(self.style.WARNING(
+                    f'Duplicados ({digest[:12]}): {", ".join(names)} -> usar {canonical}'
+                ))
+
+            # 2. Gera as variantes uma única vez por conteúdo.
+            entry = self._build_variants(static_dir, output_dir, canonical, widths, formats)
+            for name in names:
+                manifest[name] = entry
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        (output_dir / MANIFEST_NAME).write_text(
+            json.dumps(manifest, indent=2, sort_keys=True) + '\n', encoding='utf-8'
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(manifest)} imagens processadas, {duplicates} duplicadas. '
+            f'Manifesto em static/{VARIANTS_DIR}/{MANIFEST_NAME}.'
+        ))
+
+    def _build_variants(self, static_dir, output_dir, name, widths, formats):
+        source = static_dir / name
+        with Image.open(source) as image:
+            image.load()
+            original_width, original_height = image.size
+            has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+
+            # Nunca amplia: larguras maiores que o original são substituídas pelo original.
+            target_widths = [w for w in widths if w < original_width] + [original_width]
+
+            variants = {fmt: [] for fmt in formats}
+            stem = Path(name).with_suffix('')
+            for width in target_widths:
+                height = round(original_height * width / original_width)
+                resized = image if width == original_width else image.resize((width, height), Image.LANCZOS)
+                for fmt in formats:
+                    relative = f'{VARIANTS_DIR}/{stem}-{width}w.{fmt}'
+                    target = static_dir / relative
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    resized.save(target, fmt.upper(), **FORMAT_OPTIONS[fmt])
+                    variants[fmt].append([relative, width])
+
+        self.stdout.write(f'{name}: {len(target_widths)} larguras x {len(formats)} formatos')
+        return {
+            'src': name,
+            'width': original_width,
+            'height': original_height,
+            'variants': variants,
+        }
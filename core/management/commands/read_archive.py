@@ -0,0 +1,37 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archive import ARCHIVED_MODELS, iter_archive
+from core.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Lê o arquivo de Task/Roulette para auditoria (JSONL no stdout ou apenas o resumo)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=sorted(ARCHIVED_MODELS))
+        parser.add_argument('--phone', help='Filtra pelo número de telefone do usuário.')
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, help='Data inicial (AAAA-MM-DD).')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, help='Data final (AAAA-MM-DD).')
+        parser.add_argument('--summary', action='store_true', help='Mostra apenas contagem e soma.')
+
+    def handle(self, *args, **options):
+        user_id = None
+        if options['phone']:
+            try:
+                user_id = CustomUser.objects.get(phone_number=options['phone']).pk
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"Usuário {options['phone']} não encontrado.")
+
+        value_field = ARCHIVED_MODELS[options['model']]['value_field']
+        count, total = 0, Decimal('0')
+        for row in iter_archive(options['model'], options['start'], options['end'], user_id):
+            count += 1
+            total += Decimal(row[value_field])
+            if not options['summary']:
+                self.stdout.write(json.dumps(row))
+
+        self.stderr.write(f'{count} linhas, {value_field} total: {total}')
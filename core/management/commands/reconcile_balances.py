@@ -0,0 +1,136 @@
+import csv
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Min, OuterRef, Subquery, Sum
+
+from core.models import ArchivedUserTotals, CustomUser, Deposit, Roulette, Task, UserLevel, Withdrawal
+from core.referrals import commission_amount, commission_tiers
+from core.sharding import merge_totals
+
+ZERO = Decimal('0.00')
+
+CSV_COLUMNS = (
+    'user_id', 'phone_number',
+    'available_balance', 'expected_available_balance', 'available_drift',
+    'subsidy_balance', 'expected_subsidy_balance', 'subsidy_drift',
+)
+
+
+def grouped_sums(queryset, user_field, value):
+    """{user_id: soma} para um intervalo de usuários, agregado na base de dados."""
+    return dict(queryset.values_list(user_field).annotate(total=value).order_by())
+
+
+def sharded_sums(queryset, user_field, value):
+    """grouped_sums() de Task/Roulette em todos os shards (cada usuário vive num só)."""
+    return merge_totals(grouped_sums(shard, user_field, value) for shard in queryset.on_shards())
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula o saldo esperado de cada usuário a partir de depósitos aprovados, "
+        "saques, tarefas, roleta, compras de nível e subsídios de convite, e reporta "
+        "as diferenças (drift) em CSV. Processa os usuários em blocos de ids, com "
+        "memória limitada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=20000, help='Usuários por bloco.')
+        parser.add_argument('--tolerance', type=Decimal, default=Decimal('0.01'), help='Diferença mínima a reportar.')
+        parser.add_argument('--output', help='Ficheiro CSV de saída (por omissão, stdout).')
+
+    def handle(self, *args, **options):
+        output = open(options['output'], 'w', newline='') if options['output'] else self.stdout
+        writer = csv.writer(output)
+        writer.writerow(CSV_COLUMNS)
+
+        users_checked = users_with_drift = 0
+        total_drift = ZERO
+        try:
+            for first_id, last_id in self.id_chunks(options['chunk_size']):
+                for row in self.reconcile_chunk(first_id, last_id):
+                    users_checked += 1
+                    if abs(row[4]) < options['tolerance'] and abs(row[7]) < options['tolerance']:
+                        continue
+                    users_with_drift += 1
+                    total_drift += row[4]
+                    writer.writerow(row)
+        finally:
+            if output is not self.stdout:
+                output.close()
+
+        self.stderr.write(self.style.SUCCESS(
+            f'{users_checked} usuários verificados, {users_with_drift} com diferenças '
+            f'(drift total do saldo disponível: {total_drift}).'
+        ))
+
+    def id_chunks(self, chunk_size):
+        """Intervalos [primeiro, último] de ids, percorridos por keyset sem OFFSET."""
+        last_id = 0
+        while True:
+            ids = list(
+                CustomUser.objects.filter(pk__gt=last_id).order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not ids:
+                return
+            yield ids[0], ids[-1]
+            last_id = ids[-1]
+
+    def reconcile_chunk(self, first_id, last_id):
+        in_chunk = {'user_id__gte': first_id, 'user_id__lte': last_id}
+
+        deposits = grouped_sums(Deposit.objects.filter(is_approved=True, **in_chunk), 'user_id', Sum('amount'))
+        # O saldo é debitado no pedido de saque, qualquer que seja o estado final.
+        withdrawals = grouped_sums(Withdrawal.objects.filter(**in_chunk), 'user_id', Sum('amount'))
+        tasks = sharded_sums(Task.objects.filter(**in_chunk), 'user_id', Sum('earnings'))
+        prizes = sharded_sums(Roulette.objects.filter(**in_chunk), 'user_id', Sum('prize'))
+        # Tarefas e giros arquivados (archive_history) contam pelos totais guardados.
+        archived = {
+            row[0]: row[1:] for row in ArchivedUserTotals.objects.filter(**in_chunk)
+            .values_list('user_id', 'tasks_earnings', 'roulette_prizes')
+        }
+        for user_id, (archived_tasks, archived_prizes) in archived.items():
+            tasks[user_id] = tasks.get(user_id, ZERO) + archived_tasks
+            prizes[user_id] = prizes.get(user_id, ZERO) + archived_prizes
+        level_costs = grouped_sums(UserLevel.objects.filter(**in_chunk), 'user_id', Sum('level__deposit_value'))
+
+        # Comissões de convite (core/referrals.py): compras de nível da rede feitas
+        # depois de o beneficiário ter comprado o seu primeiro nível.
+        commissions = {}
+        for tier, rate, flat in commission_tiers():
+            ancestor = 'user__' + '__'.join(['invited_by'] * tier)
+            first_purchase = (
+                UserLevel.objects.filter(user_id=OuterRef(ancestor))
+                .values('user_id').annotate(first=Min('purchase_date')).values('first')
+            )
+            purchases = (
+                UserLevel.objects.filter(**{
+                    f'{ancestor}__gte': first_id, f'{ancestor}__lte': last_id,
+                    'purchase_date__gte': Subquery(first_purchase),
+                })
+                .values_list(ancestor, 'level__deposit_value').annotate(count=Count('id')).order_by()
+            )
+            # Arredondada por compra, como em core/referrals.py, e não por soma.
+            for ancestor_id, deposit_value, count in purchases:
+                commissions[ancestor_id] = commissions.get(ancestor_id, ZERO) + commission_amount(rate, flat, deposit_value) * count
+
+        users = (
+            CustomUser.objects.filter(pk__gte=first_id, pk__lte=last_id).order_by('pk')
+            .values_list('pk', 'phone_number', 'available_balance', 'subsidy_balance')
+        )
+        for user_id, phone_number, available_balance, subsidy_balance in users.iterator():
+            expected_subsidy = (prizes.get(user_id, ZERO) + commissions.get(user_id, ZERO)).quantize(ZERO)
+            expected_available = (
+                deposits.get(user_id, ZERO)
+                - withdrawals.get(user_id, ZERO)
+                + tasks.get(user_id, ZERO)
+                + expected_subsidy
+                - level_costs.get(user_id, ZERO)
+            ).quantize(ZERO)
+            yield (
+                user_id, phone_number,
+                available_balance, expected_available, available_balance - expected_available,
+                subsidy_balance, expected_subsidy, subsidy_balance - expected_subsidy,
+            )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.rollups import refresh_daily_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Atualiza a tabela de estatísticas diárias (DailyPlatformStats) a partir da "
+        "última data agregada. Pensado para correr periodicamente (ex.: a cada hora)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lookback-days', type=int, default=2,
+            help='Dias antes da marca d\'água a recalcular (aprovações tardias).',
+        )
+        parser.add_argument('--full', action='store_true', help='Recalcula todo o histórico.')
+
+    def handle(self, *args, **options):
+        days = refresh_daily_stats(lookback_days=options['lookback_days'], full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'{days} dias atualizados.'))
@@ -0,0 +1,71 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import queue_enabled, run_pending
+
+
+def worker_loop(batch_size, poll_interval, once):
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while not stopping:
+        executed = run_pending(batch_size)
+        if executed:
+            continue
+        if once:
+            break
+        time.sleep(poll_interval)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Executa os jobs da fila (core.Job). Cada processo reserva lotes com "
+        "SELECT ... FOR UPDATE SKIP LOCKED, por isso podem correr vários em paralelo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Número de processos worker.')
+        parser.add_argument('--batch-size', type=int, default=10, help='Jobs reservados de cada vez.')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Segundos de espera com a fila vazia.')
+        parser.add_argument('--once', action='store_true', help='Esvazia a fila e termina.')
+
+    def handle(self, *args, **options):
+        if not queue_enabled():
+            self.stdout.write(self.style.WARNING(
+                'A base de dados não suporta SKIP LOCKED: os jobs são executados de forma '
+                'síncrona no enqueue. A processar apenas jobs pendentes existentes.'
+            ))
+
+        worker_args = (options['batch_size'], options['poll_interval'], options['once'])
+        if options['processes'] <= 1:
+            worker_loop(*worker_args)
+            return
+
+        # As conexões não podem ser partilhadas entre processos.
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=worker_loop, args=worker_args, daemon=False)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"{len(processes)} workers iniciados.")
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
@@ -0,0 +1,206 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import CustomUser, Deposit, Level, Roulette, Task, UserLevel, Withdrawal
+from core.search import normalize_phone
+from core.sharding import is_sharded, shard_for
+
+BASE36 = '0123456789abcdefghijklmnopqrstuvwxyz'
+PROOF_PLACEHOLDER = 'deposit_proofs/synthetic.png'
+ROULETTE_PRIZES = (Decimal('1'), Decimal('2'), Decimal('5'), Decimal('10'))
+WITHDRAWAL_STATUSES = ('Aprovado', 'Aprovado', 'Pending', 'Rejeitado')
+
+
+def synthetic_invite_code(user_id):
+    # Os códigos reais são hexadecimais; o prefixo "s" nunca colide com eles.
+    digits = ''
+    while user_id:
+        user_id, remainder = divmod(user_id, 36)
+        digits = BASE36[remainder] + digits
+    return 's' + digits.rjust(7, '0')
+
+
+@contextmanager
+def historical_dates(*models):
+    """Desliga auto_now_add para que o bulk_create grave as datas geradas."""
+    fields = [field for model in models for field in model._meta.concrete_fields if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera dados sintéticos para benchmarks: usuários com árvores de convite em lei de "
+        "potência, depósitos, compras de nível, tarefas diárias, giros da roleta e saques. "
+        "Apenas para bases de dados de teste."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--days', type=int, default=30, help='Dias de histórico gerados.')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Usuários por transação.')
+        parser.add_argument(
+            '--root-ratio', type=float, default=0.05,
+            help='Fração de usuários sem convidante; os restantes ligam-se por ligação preferencial.',
+        )
+        parser.add_argument('--password', default='synthetic', help='Senha comum a todos os usuários gerados.')
+        parser.add_argument('--phone-prefix', default='syn')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--no-copy', action='store_true', help='Usa bulk_create mesmo em PostgreSQL.')
+
+    def handle(self, *args, **options):
+        self.levels = list(Level.objects.order_by('deposit_value'))
+        if not self.levels:
+            raise CommandError('Crie pelo menos um nível (Level) antes de gerar dados sintéticos.')
+
+        self.rng = random.Random(options['seed'])
+        self.now = timezone.now()
+        self.span = timedelta(days=options['days'])
+        self.root_ratio = options['root_ratio']
+        self.phone_prefix = options['phone_prefix']
+        # O hash é caro (PBKDF2); calcula-se uma única vez para todos.
+        self.password = make_password(options['password'])
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy'] and self.copy_supported()
+        self.stdout.write(f"Escrita via {'COPY' if self.use_copy else 'bulk_create'}.")
+
+        # Ids explícitos: os convites apontam para usuários ainda por inserir.
+        first_id = (CustomUser.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+        total = options['users']
+        # Ligação preferencial: cada usuário entra uma vez, mais uma por convidado,
+        # o que dá uma distribuição de convidados em lei de potência.
+        self.referral_pool = []
+
+        started = time.monotonic()
+        rows = 0
+        for chunk_start in range(0, total, options['chunk_size']):
+            chunk_ids = range(first_id + chunk_start, first_id + min(chunk_start + options['chunk_size'], total))
+            with transaction.atomic():
+                rows += self.write_chunk(chunk_ids, first_id, total)
+            done = chunk_ids[-1] - first_id + 1
+            self.stdout.write(f'{done}/{total} usuários, {rows} linhas, {time.monotonic() - started:.1f}s')
+
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [CustomUser]):
+                    cursor.execute(sql)
+        self.stdout.write(self.style.SUCCESS(f'{total} usuários e {rows} linhas gerados em {time.monotonic() - started:.1f}s.'))
+
+    def copy_supported(self):
+        with connection.cursor() as cursor:
+            # psycopg 3; com psycopg2 fica o bulk_create.
+            return hasattr(cursor.cursor, 'copy')
+
+    def write_chunk(self, chunk_ids, first_id, total):
+        batches = {model: [] for model in (CustomUser, Deposit, UserLevel, Task, Roulette, Withdrawal)}
+        for user_id in chunk_ids:
+            # Datas de entrada crescentes com o id: quem convida entrou antes.
+            joined = self.now - self.span + self.span * ((user_id - first_id) / total)
+            inviter_id = None
+            if self.referral_pool and self.rng.random() > self.root_ratio:
+                inviter_id = self.rng.choice(self.referral_pool)
+                self.referral_pool.append(inviter_id)
+            self.referral_pool.append(user_id)
+
+            phone_number = f'{self.phone_prefix}{user_id:09d}'
+            user = CustomUser(
+                id=user_id, phone_number=phone_number, phone_digits=normalize_phone(phone_number), password=self.password,
+                invite_code=synthetic_invite_code(user_id), invited_by_id=inviter_id, date_joined=joined,
+            )
+            batches[CustomUser].append(user)
+            self.add_history(user, batches)
+
+        with historical_dates(*batches):
+            for model, objs in batches.items():
+                self.write(model, objs)
+        return sum(len(objs) for objs in batches.values())
+
+    def add_history(self, user, batches):
+        """Histórico de um usuário, com saldos coerentes (exceto comissões de convite)."""
+        rng, now = self.rng, self.now
+        balance = Decimal('0')
+        prizes = Decimal('0')
+
+        def moment_after(start):
+            return start + (now - start) * rng.random()
+
+        for _ in range(rng.choice((0, 1, 1, 1, 2, 3))):
+            deposit = Deposit(
+                user_id=user.id, amount=rng.choice(self.levels).deposit_value, proof_of_payment=PROOF_PLACEHOLDER,
+                is_approved=rng.random() < 0.85, created_at=moment_after(user.date_joined),
+            )
+            batches[Deposit].append(deposit)
+            if deposit.is_approved:
+                balance += deposit.amount
+
+        affordable = [level for level in self.levels if level.deposit_value <= balance]
+        if affordable and rng.random() < 0.8:
+            level = rng.choice(affordable)
+            purchase_date = moment_after(user.date_joined)
+            batches[UserLevel].append(UserLevel(user_id=user.id, level_id=level.id, purchase_date=purchase_date))
+            balance -= level.deposit_value
+            user.level_active = True
+            user.active_level_id = level.id
+
+            # Uma tarefa por dia desde a compra.
+            completed_at = purchase_date + timedelta(hours=rng.uniform(1, 24))
+            while completed_at < now:
+                batches[Task].append(Task(user_id=user.id, earnings=level.daily_gain, completed_at=completed_at))
+                balance += level.daily_gain
+                completed_at += timedelta(days=1, minutes=rng.uniform(-120, 120))
+
+        for _ in range(rng.choice((0, 0, 1, 2))):
+            prize = rng.choice(ROULETTE_PRIZES)
+            batches[Roulette].append(Roulette(user_id=user.id, prize=prize, is_approved=True, spin_date=moment_after(user.date_joined)))
+            prizes += prize
+        balance += prizes
+
+        if balance >= 14 and rng.random() < 0.5:
+            amount = Decimal(rng.randint(14, int(balance)))
+            batches[Withdrawal].append(Withdrawal(
+                user_id=user.id, amount=amount, status=rng.choice(WITHDRAWAL_STATUSES), created_at=moment_after(user.date_joined),
+            ))
+            balance -= amount
+
+        user.available_balance = balance
+        user.subsidy_balance = prizes
+
+    def write(self, model, objs):
+        if not objs:
+            return
+        if not is_sharded(model):
+            self.write_to(DEFAULT_DB_ALIAS, model, objs)
+            return
+        # Task e Roulette com sharding: cada linha vai para o shard do seu usuário.
+        by_shard = {}
+        for obj in objs:
+            by_shard.setdefault(shard_for(obj.user_id), []).append(obj)
+        for alias, shard_objs in by_shard.items():
+            self.write_to(alias, model, shard_objs)
+
+    def write_to(self, alias, model, objs):
+        db = connections[alias]
+        if not self.use_copy or db.vendor != 'postgresql':
+            model.objects.using(alias).bulk_create(objs, batch_size=1000)
+            return
+
+        fields = [field for field in model._meta.concrete_fields if model is CustomUser or not field.primary_key]
+        columns = ', '.join(db.ops.quote_name(field.column) for field in fields)
+        with db.cursor() as cursor:
+            with cursor.cursor.copy(f'COPY {db.ops.quote_name(model._meta.db_table)} ({columns}) FROM STDIN') as copy:
+                for obj in objs:
+                    copy.write_row([field.get_db_prep_save(getattr(obj, field.attname), db) for field in fields])
@@ -0,0 +1,124 @@
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from . import routers
+from .ratelimit import check_request
+
+try:
+    import brotli
+except ImportError:  # O Brotli é opcional; sem ele usamos apenas gzip.
+    brotli = None
+
+re_accepts_brotli = _lazy_re_compile(r'\bbr\b')
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class HTMLCompressionMiddleware(GZipMiddleware):
+    """
+    Comprime respostas HTML acima de HTML_COMPRESSION_MIN_SIZE bytes, com
+    Brotli quando o pacote está instalado, o navegador o aceita e a página
+    não tem token CSRF, e gzip caso contrário. Os ficheiros estáticos já são
+    comprimidos pelo WhiteNoise.
+    """
+
+    def process_response(self, request, response):
+        if not response.get('Content-Type', '').startswith('text/html'):
+            return response
+        if not response.streaming and len(response.content) < settings.HTML_COMPRESSION_MIN_SIZE:
+            return response
+        if response.has_header('Content-Encoding'):
+            return response
+
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        # Páginas com token CSRF ficam com o gzip do Django, que acrescenta bytes
+        # aleatórios contra o BREACH; o Brotli não tem esse enchimento.
+        uses_csrf = request.META.get('CSRF_COOKIE_USED')
+        if brotli is None or uses_csrf or response.streaming or not re_accepts_brotli.search(accept_encoding):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed_content = brotli.compress(response.content, mode=brotli.MODE_TEXT, quality=5)
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+class RateLimitMiddleware:
+    """
+    Rejeita com 429 os pedidos POST que excedem settings.RATE_LIMITS, antes de
+    a view correr (e portanto antes de qualquer hash de senha ou carregar o usuário).
+    """
+
+    message = 'Muitas tentativas. Aguarde um momento e tente novamente.'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.RATE_LIMIT_ENABLED or request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return None
+        url_name = request.resolver_match.url_name
+        limits = settings.RATE_LIMITS.get(url_name)
+        if not limits:
+            return None
+
+        rejected = check_request(request, url_name, limits)
+        if rejected is None:
+            return None
+
+        scope, retry_after = rejected
+        if limits.get('json'):
+            response = JsonResponse({'success': False, 'message': self.message}, status=429)
+        else:
+            response = HttpResponse(self.message, status=429, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = str(retry_after)
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """
+    Mantém as leituras de um navegador no primário durante
+    REPLICA_STICKY_SECONDS depois de uma escrita, para que o usuário veja
+    sempre o que acabou de gravar mesmo com atraso de replicação.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        cookie_name = settings.REPLICA_PIN_COOKIE_NAME
+        # Pedidos que alteram dados leem tudo do primário desde o início, incluindo
+        # o request.user carregado pelo AuthenticationMiddleware: um saldo lido de
+        # uma réplica atrasada e gravado de volta perderia alterações recentes.
+        unsafe = request.method not in SAFE_METHODS
+        tokens = routers.start_request(pinned=unsafe or cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            if routers.wrote_to_primary() or unsafe:
+                response.set_cookie(
+                    cookie_name, '1',
+                    max_age=settings.REPLICA_STICKY_SECONDS,
+                    secure=settings.SESSION_COOKIE_SECURE,
+                    httponly=True,
+                    samesite='Lax',
+                )
+        finally:
+            routers.end_request(tokens)
+        return response
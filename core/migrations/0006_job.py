@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_remove_platformsettings_app_download_link'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Tarefa')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Dados')),
+                ('status', models.CharField(choices=[('pending', 'Pendente'), ('running', 'Em execução'), ('done', 'Concluído'), ('failed', 'Falhou')], default='pending', max_length=20, verbose_name='Estado')),
+                ('attempts', models.IntegerField(default=0, verbose_name='Tentativas')),
+                ('max_attempts', models.IntegerField(default=5, verbose_name='Máximo de Tentativas')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Executar em')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Bloqueado em')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último Erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+            ],
+            options={
+                'verbose_name': 'Tarefa em Segundo Plano',
+                'verbose_name_plural': 'Tarefas em Segundo Plano',
+                'indexes': [models.Index(fields=['status', 'run_at'], name='core_job_status_run_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyPlatformStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Data')),
+                ('deposits_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Depósitos Aprovados')),
+                ('deposits_count', models.IntegerField(default=0, verbose_name='Nº de Depósitos Aprovados')),
+                ('withdrawals_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Saques')),
+                ('withdrawals_count', models.IntegerField(default=0, verbose_name='Nº de Saques')),
+                ('new_users', models.IntegerField(default=0, verbose_name='Novos Usuários')),
+                ('levels_purchased', models.IntegerField(default=0, verbose_name='Níveis Comprados')),
+                ('levels_purchased_total', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Valor dos Níveis Comprados')),
+                ('active_levels', models.IntegerField(default=0, verbose_name='Níveis Ativos')),
+                ('tasks_payout', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ganhos de Tarefas')),
+                ('roulette_payout', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Prêmios da Roleta')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Estatística Diária',
+                'verbose_name_plural': 'Estatísticas Diárias',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='customuser',
+            name='date_joined',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='deposit',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Data de Criação'),
+        ),
+        migrations.AlterField(
+            model_name='roulette',
+            name='spin_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Data da Rodada'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='completed_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Data de Conclusão'),
+        ),
+        migrations.AlterField(
+            model_name='userlevel',
+            name='purchase_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Data da Compra'),
+        ),
+        migrations.AlterField(
+            model_name='withdrawal',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Data de Criação'),
+        ),
+    ]
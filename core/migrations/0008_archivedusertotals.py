@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_dailyplatformstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedUserTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tasks_count', models.IntegerField(default=0, verbose_name='Tarefas Arquivadas')),
+                ('tasks_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Ganhos de Tarefas Arquivados')),
+                ('roulette_count', models.IntegerField(default=0, verbose_name='Rodadas Arquivadas')),
+                ('roulette_prizes', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Prêmios da Roleta Arquivados')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archived_totals', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Totais Arquivados do Usuário',
+                'verbose_name_plural': 'Totais Arquivados dos Usuários',
+            },
+        ),
+    ]
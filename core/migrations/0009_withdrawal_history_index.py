@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-19 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_archivedusertotals'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='withdrawal',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='core_withdrawal_history_idx'),
+        ),
+    ]
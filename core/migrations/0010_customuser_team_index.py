@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0009_withdrawal_history_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['invited_by', '-date_joined', '-id'], name='core_user_team_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_customuser_team_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deposit',
+            name='proof_staged',
+            field=models.BooleanField(default=False, verbose_name='Comprovativo em Transferência'),
+        ),
+    ]
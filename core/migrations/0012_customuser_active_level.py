@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Subquery
+
+
+def fill_active_level(apps, schema_editor):
+    # Mesmo cálculo de CustomUserManager.sync_active_levels, com os modelos históricos.
+    CustomUser = apps.get_model('core', 'CustomUser')
+    UserLevel = apps.get_model('core', 'UserLevel')
+    active = UserLevel.objects.filter(user=OuterRef('pk'), is_active=True).order_by('pk')
+    CustomUser.objects.update(
+        active_level=Subquery(active.values('level_id')[:1]),
+        level_active=Exists(active),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_deposit_proof_staged'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='active_level',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.level', verbose_name='Nível Atual'),
+        ),
+        migrations.RunPython(fill_active_level, migrations.RunPython.noop, hints={'model_name': 'customuser'}),
+    ]
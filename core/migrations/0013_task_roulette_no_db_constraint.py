@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_customuser_active_level'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='roulette',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuário'),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuário'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:18
+
+import re
+
+from django.db import migrations, models
+
+
+def fill_phone_digits(apps, schema_editor):
+    # Mesma normalização de core.search.normalize_phone.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("UPDATE core_customuser SET phone_digits = regexp_replace(phone_number, '\\D', '', 'g')")
+        return
+    CustomUser = apps.get_model('core', 'CustomUser')
+    last_id = 0
+    while True:
+        users = list(CustomUser.objects.filter(pk__gt=last_id).order_by('pk').only('phone_number')[:5000])
+        if not users:
+            return
+        for user in users:
+            user.phone_digits = re.sub(r'\D', '', user.phone_number)
+        CustomUser.objects.bulk_update(users, ['phone_digits'])
+        last_id = users[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_task_roulette_no_db_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='phone_digits',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=20, verbose_name='Telefone (dígitos)'),
+        ),
+        migrations.RunPython(fill_phone_digits, migrations.RunPython.noop, hints={'model_name': 'customuser'}),
+    ]
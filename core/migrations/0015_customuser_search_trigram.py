@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# Índices GIN pg_trgm para a pesquisa por substring no admin (core/search.py).
+# Só em PostgreSQL; nas outras bases a pesquisa fica por prefixo (btree).
+TRIGRAM_INDEXES = {
+    'core_user_phone_trgm': 'phone_digits',
+    'core_user_invite_trgm': 'invite_code',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES.items():
+        # CONCURRENTLY: não bloqueia as escritas na tabela de usuários.
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON core_customuser USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY não corre dentro de uma transação.
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_customuser_phone_digits'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes, hints={'model_name': 'customuser'}),
+    ]
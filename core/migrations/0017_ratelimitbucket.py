@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-19 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_task_roulette_user_do_nothing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='Chave')),
+                ('tokens', models.FloatField(verbose_name='Fichas')),
+                ('updated_at', models.FloatField(verbose_name='Atualizado em (epoch)')),
+                ('expires_at', models.FloatField(db_index=True, verbose_name='Cheio em (epoch)')),
+            ],
+            options={
+                'verbose_name': 'Limite de Pedidos',
+                'verbose_name_plural': 'Limites de Pedidos',
+            },
+        ),
+    ]
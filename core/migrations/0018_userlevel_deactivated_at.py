@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-19 21:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_deactivated_at(apps, schema_editor):
+    # As estatísticas já gravadas nunca contaram os níveis inativos: desativá-los
+    # no próprio dia da compra mantém esse histórico igual.
+    UserLevel = apps.get_model('core', 'UserLevel')
+    UserLevel.objects.filter(is_active=False).update(deactivated_at=F('purchase_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_ratelimitbucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userlevel',
+            name='deactivated_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Data de Desativação'),
+        ),
+        migrations.RunPython(fill_deactivated_at, migrations.RunPython.noop, hints={'model_name': 'userlevel'}),
+    ]
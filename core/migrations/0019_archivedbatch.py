@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 20:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_userlevel_deactivated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20, verbose_name='Modelo')),
+                ('shard', models.CharField(blank=True, max_length=50, verbose_name='Base de Dados')),
+                ('first_id', models.BigIntegerField(verbose_name='Id Inicial')),
+                ('last_id', models.BigIntegerField(verbose_name='Id Final')),
+                ('cutoff', models.DateTimeField(verbose_name='Data Limite')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+            ],
+            options={
+                'verbose_name': 'Lote Arquivado',
+                'verbose_name_plural': 'Lotes Arquivados',
+            },
+        ),
+    ]
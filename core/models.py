@@ -1,9 +1,13 @@
 from django.db import models
+from django.db.models import Exists, OuterRef, Subquery
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
 import uuid
 import os
 
+from .search import normalize_phone
+from .sharding import ShardedManager
+
 # ---
 
 class CustomUserManager(BaseUserManager):
@@ -21,19 +25,37 @@ class CustomUserManager(BaseUserManager):
         extra_fields.setdefault('is_active', True)
         return self.create_user(phone_number, password, **extra_fields)
 
+    def sync_active_levels(self, **filters):
+        """
+        Recalcula active_level/level_active dos usuários filtrados num único
+        UPDATE: o nível ativo é o da compra ativa mais antiga.
+        """
+        active = UserLevel.objects.filter(user=OuterRef('pk'), is_active=True).order_by('pk')
+        return self.filter(**filters).update(
+            active_level=Subquery(active.values('level_id')[:1]),
+            level_active=Exists(active),
+        )
+
 # ---
 
 class CustomUser(AbstractBaseUser, PermissionsMixin):
     phone_number = models.CharField(max_length=20, unique=True, verbose_name="Número de Telefone")
+    # Só os dígitos do telefone, para a pesquisa do admin por índice (core/search.py).
+    phone_digits = models.CharField(max_length=20, db_index=True, default='', editable=False, verbose_name="Telefone (dígitos)")
     full_name = models.CharField(max_length=255, blank=True, null=True, verbose_name="Nome Completo")
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
-    date_joined = models.DateTimeField(default=timezone.now)
+    date_joined = models.DateTimeField(default=timezone.now, db_index=True)
     invite_code = models.CharField(max_length=8, unique=True, blank=True, null=True)
     invited_by = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Convidado por")
     available_balance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, verbose_name="Saldo Disponível")
     subsidy_balance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, verbose_name="Saldo de Subsídios")
     level_active = models.BooleanField(default=False, verbose_name="Nível Ativo")
+    # Cópia do nível da compra ativa (UserLevel) mantida por core/signals.py,
+    # para as páginas não consultarem UserLevel a cada pedido.
+    active_level = models.ForeignKey(
+        'Level', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Nível Atual",
+    )
     roulette_spins = models.IntegerField(default=0, verbose_name="Giros da Roleta")
 
     USERNAME_FIELD = 'phone_number'
@@ -41,6 +63,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     objects = CustomUserManager()
 
+    class Meta:
+        # Abas da página de equipa, paginadas por (date_joined, id).
+        indexes = [
+            models.Index(fields=['invited_by', '-date_joined', '-id'], name='core_user_team_idx'),
+        ]
+
     def __str__(self):
         return self.phone_number
 
@@ -51,6 +79,7 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
                 if not CustomUser.objects.filter(invite_code=new_invite_code).exists():
                     self.invite_code = new_invite_code
                     break
+        self.phone_digits = normalize_phone(self.phone_number)
         super().save(*args, **kwargs)
 
 # ---
@@ -115,8 +144,10 @@ class Deposit(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, verbose_name="Usuário")
     amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Valor")
     proof_of_payment = models.ImageField(upload_to='deposit_proofs/', verbose_name="Comprovativo")
+    # O comprovativo ainda está no disco local, à espera de transferência (core/uploads.py).
+    proof_staged = models.BooleanField(default=False, verbose_name="Comprovativo em Transferência")
     is_approved = models.BooleanField(default=False, verbose_name="Aprovado")
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Data de Criação")
     
     class Meta:
         verbose_name = "Depósito"
@@ -131,11 +162,15 @@ class Withdrawal(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, verbose_name="Usuário")
     amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Valor")
     status = models.CharField(max_length=20, default='Pending', verbose_name="Status")
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Data de Criação")
     
     class Meta:
         verbose_name = "Saque"
         verbose_name_plural = "Saques"
+        # Histórico paginado por (created_at, id) de cada usuário.
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='core_withdrawal_history_idx'),
+        ]
 
     def __str__(self):
         return f"Saque de {self.amount} por {self.user.phone_number} ({self.status})"
@@ -162,8 +197,10 @@ class Level(models.Model):
 class UserLevel(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, verbose_name="Usuário")
     level = models.ForeignKey(Level, on_delete=models.CASCADE, verbose_name="Nível")
-    purchase_date = models.DateTimeField(auto_now_add=True, verbose_name="Data da Compra")
+    purchase_date = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Data da Compra")
     is_active = models.BooleanField(default=True, verbose_name="Ativo")
+    # Preenchida ao desativar: os níveis ativos de dias passados (core/rollups.py) não mudam depois.
+    deactivated_at = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name="Data de Desativação")
 
     class Meta:
         verbose_name = "Nível do Usuário"
@@ -172,12 +209,26 @@ class UserLevel(models.Model):
     def __str__(self):
         return f"{self.user.phone_number} - {self.level.name}"
 
+    def save(self, *args, **kwargs):
+        if self.is_active:
+            self.deactivated_at = None
+        elif self.deactivated_at is None:
+            self.deactivated_at = timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'is_active' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'deactivated_at'}
+        super().save(*args, **kwargs)
+
 # ---
 
 class Task(models.Model):
-    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, verbose_name="Usuário")
+    # Sem FK na base de dados: com sharding a tabela vive noutra base (core/sharding.py).
+    # As linhas são apagadas com o usuário em core/signals.py (delete_sharded_rows).
+    user = models.ForeignKey(CustomUser, on_delete=models.DO_NOTHING, db_constraint=False, verbose_name="Usuário")
     earnings = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Ganhos")
-    completed_at = models.DateTimeField(auto_now_add=True, verbose_name="Data de Conclusão")
+    completed_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Data de Conclusão")
+
+    objects = ShardedManager()
 
     class Meta:
         verbose_name = "Tarefa"
@@ -189,11 +240,15 @@ class Task(models.Model):
 # ---
 
 class Roulette(models.Model):
-    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, verbose_name="Usuário")
+    # Sem FK na base de dados: com sharding a tabela vive noutra base (core/sharding.py).
+    # As linhas são apagadas com o usuário em core/signals.py (delete_sharded_rows).
+    user = models.ForeignKey(CustomUser, on_delete=models.DO_NOTHING, db_constraint=False, verbose_name="Usuário")
     prize = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Prêmio")
-    spin_date = models.DateTimeField(auto_now_add=True, verbose_name="Data da Rodada")
+    spin_date = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Data da Rodada")
     is_approved = models.BooleanField(default=False, verbose_name="Aprovado")
 
+    objects = ShardedManager()
+
     class Meta:
         verbose_name = "Roleta"
         verbose_name_plural = "Roletas"
@@ -216,4 +271,120 @@ class RouletteSettings(models.Model):
 
     def __str__(self):
         return "Configurações da Roleta"
-        
\ No newline at end of file
+        
+# ---
+
+class Job(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendente'),
+        (STATUS_RUNNING, 'Em execução'),
+        (STATUS_DONE, 'Concluído'),
+        (STATUS_FAILED, 'Falhou'),
+    ]
+
+    name = models.CharField(max_length=100, verbose_name="Tarefa")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Dados")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name="Estado")
+    attempts = models.IntegerField(default=0, verbose_name="Tentativas")
+    max_attempts = models.IntegerField(default=5, verbose_name="Máximo de Tentativas")
+    run_at = models.DateTimeField(default=timezone.now, verbose_name="Executar em")
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="Bloqueado em")
+    last_error = models.TextField(blank=True, verbose_name="Último Erro")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Concluído em")
+
+    class Meta:
+        verbose_name = "Tarefa em Segundo Plano"
+        verbose_name_plural = "Tarefas em Segundo Plano"
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='core_job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+# ---
+
+class DailyPlatformStats(models.Model):
+    date = models.DateField(unique=True, verbose_name="Data")
+    deposits_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Depósitos Aprovados")
+    deposits_count = models.IntegerField(default=0, verbose_name="Nº de Depósitos Aprovados")
+    withdrawals_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Saques")
+    withdrawals_count = models.IntegerField(default=0, verbose_name="Nº de Saques")
+    new_users = models.IntegerField(default=0, verbose_name="Novos Usuários")
+    levels_purchased = models.IntegerField(default=0, verbose_name="Níveis Comprados")
+    levels_purchased_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Valor dos Níveis Comprados")
+    active_levels = models.IntegerField(default=0, verbose_name="Níveis Ativos")
+    tasks_payout = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Ganhos de Tarefas")
+    roulette_payout = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Prêmios da Roleta")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Estatística Diária"
+        verbose_name_plural = "Estatísticas Diárias"
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"Estatísticas de {self.date}"
+
+# ---
+
+class ArchivedUserTotals(models.Model):
+    # Totais das linhas de Task e Roulette já movidas para o arquivo
+    # (ver core/archive.py), para que os rendimentos continuem corretos.
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='archived_totals', verbose_name="Usuário")
+    tasks_count = models.IntegerField(default=0, verbose_name="Tarefas Arquivadas")
+    tasks_earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Ganhos de Tarefas Arquivados")
+    roulette_count = models.IntegerField(default=0, verbose_name="Rodadas Arquivadas")
+    roulette_prizes = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Prêmios da Roleta Arquivados")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Totais Arquivados do Usuário"
+        verbose_name_plural = "Totais Arquivados dos Usuários"
+
+    def __str__(self):
+        return f"Totais arquivados de {self.user.phone_number}"
+
+# ---
+
+class ArchivedBatch(models.Model):
+    # Lote de Task/Roulette já somado em ArchivedUserTotals cujas linhas ainda
+    # podem estar no shard (core/archive.py): o DELETE é repetido a partir
+    # desta marca, sem somar os totais outra vez.
+    name = models.CharField(max_length=20, verbose_name="Modelo")
+    shard = models.CharField(max_length=50, blank=True, verbose_name="Base de Dados")
+    first_id = models.BigIntegerField(verbose_name="Id Inicial")
+    last_id = models.BigIntegerField(verbose_name="Id Final")
+    cutoff = models.DateTimeField(verbose_name="Data Limite")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
+
+    class Meta:
+        verbose_name = "Lote Arquivado"
+        verbose_name_plural = "Lotes Arquivados"
+
+    def __str__(self):
+        return f"{self.name} {self.first_id}-{self.last_id}"
+
+# ---
+
+class RateLimitBucket(models.Model):
+    # Balde de fichas de um limite de pedidos (core/ratelimit.py), por chave
+    # "url:scope:identidade". Guardado na base de dados para que o consumo seja
+    # atómico entre processos (SELECT ... FOR UPDATE).
+    key = models.CharField(max_length=255, unique=True, verbose_name="Chave")
+    tokens = models.FloatField(verbose_name="Fichas")
+    updated_at = models.FloatField(verbose_name="Atualizado em (epoch)")
+    # Quando o balde volta a estar cheio; a partir daí a linha pode ser apagada.
+    expires_at = models.FloatField(db_index=True, verbose_name="Cheio em (epoch)")
+
+    class Meta:
+        verbose_name = "Limite de Pedidos"
+        verbose_name_plural = "Limites de Pedidos"
+
+    def __str__(self):
+        return self.key
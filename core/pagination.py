@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value, pk):
+    return f'{value.isoformat()}_{pk}'
+
+
+def decode_cursor(cursor):
+    try:
+        value, pk = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(value), int(pk)
+    except (AttributeError, ValueError):
+        raise InvalidCursor(cursor)
+
+
+def keyset_page(queryset, field, cursor=None, page_size=20):
+    """
+    Uma página de `queryset` do mais recente para o mais antigo, ordenada por
+    (`field`, id). O cursor é a posição da última linha da página anterior, por
+    isso o custo não cresce com o número de páginas já lidas (sem OFFSET).
+    Devolve (linhas, próximo cursor ou None).
+    """
+    queryset = queryset.order_by(f'-{field}', '-id')
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(getattr(rows[-1], field), rows[-1].pk)
+    return rows, next_cursor
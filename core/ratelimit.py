@@ -0,0 +1,132 @@
+import math
+import random
+import threading
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+
+from .models import RateLimitBucket
+
+# Limites por nome de URL (settings.RATE_LIMITS), no formato "N/período":
+#     'login': {'ip': '10/m'},
+#     'process_task': {'ip': '60/m', 'user': '10/m', 'json': True},
+# Cada limite é um balde de N fichas que se repõe a N por período: aceita
+# rajadas de até N pedidos e, depois, um pedido a cada período/N. Os baldes
+# vivem na base de dados (RateLimitBucket) e cada consumo bloqueia a linha
+# com SELECT ... FOR UPDATE, por isso pedidos em simultâneo, em qualquer
+# processo, não passam o limite.
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+SCOPES = ('ip', 'user')
+
+BUCKET_KEY = 'ratelimit:{}:{}:{}'
+REJECTED_KEY = 'ratelimit:rejected:{}:{}'
+# Fração dos pedidos que apaga os baldes já cheios (como o _cull da cache em base de dados).
+PRUNE_PROBABILITY = 0.01
+
+# O SQLite não tem SELECT ... FOR UPDATE: os consumos deste processo passam
+# um de cada vez (o SQLite só serve o desenvolvimento local, com um processo).
+_sqlite_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    count, period = rate.split('/')
+    return int(count), PERIODS[period.strip()[0]]
+
+
+def _locked_bucket(key, capacity, now):
+    """Balde de `key`, bloqueado até ao fim da transação; um balde novo começa cheio."""
+    buckets = RateLimitBucket.objects.using(DEFAULT_DB_ALIAS)
+    bucket = buckets.select_for_update().filter(key=key).first()
+    if bucket is not None:
+        return bucket
+    try:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            return buckets.create(key=key, tokens=capacity, updated_at=now, expires_at=now)
+    except IntegrityError:
+        # Outro pedido criou o balde entretanto: espera pelo seu bloqueio.
+        return buckets.select_for_update().get(key=key)
+
+
+def consume(key, rate):
+    """
+    Tira uma ficha do balde de `key`. Devolve 0 se o pedido é permitido ou o
+    número de segundos até haver uma ficha disponível.
+    """
+    capacity, period = parse_rate(rate)
+    refill = capacity / period
+    lock = _sqlite_lock if connections[DEFAULT_DB_ALIAS].vendor == 'sqlite' else nullcontext()
+
+    with lock, transaction.atomic(using=DEFAULT_DB_ALIAS):
+        now = time.time()
+        bucket = _locked_bucket(key, capacity, now)
+        tokens = min(capacity, bucket.tokens + (now - bucket.updated_at) * refill)
+        if tokens < 1:
+            return max(1, math.ceil((1 - tokens) / refill))
+        tokens -= 1
+        RateLimitBucket.objects.using(DEFAULT_DB_ALIAS).filter(pk=bucket.pk).update(
+            tokens=tokens, updated_at=now, expires_at=now + (capacity - tokens) / refill,
+        )
+
+    if random.random() < PRUNE_PROBABILITY:
+        RateLimitBucket.objects.using(DEFAULT_DB_ALIAS).filter(expires_at__lt=now).delete()
+    return 0
+
+
+def client_ip(request):
+    # Atrás de N proxies de confiança, o IP real é o N-ésimo a contar do fim.
+    proxy_count = settings.RATE_LIMIT_PROXY_COUNT
+    forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    if proxy_count and forwarded_for:
+        addresses = [a.strip() for a in forwarded_for.split(',') if a.strip()]
+        if len(addresses) >= proxy_count:
+            return addresses[-proxy_count]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def check_request(request, url_name, limits):
+    """
+    Aplica os limites configurados para `url_name`. Devolve None se o pedido
+    passa ou (scope, retry_after) do primeiro balde esgotado. Só lê o id do
+    usuário da sessão, sem carregar o usuário da base de dados.
+    """
+    identities = {
+        'ip': client_ip(request),
+        'user': request.session.get(SESSION_KEY),
+    }
+    for scope in SCOPES:
+        rate = limits.get(scope)
+        identity = identities[scope]
+        if not rate or not identity:
+            continue
+        retry_after = consume(BUCKET_KEY.format(url_name, scope, identity), rate)
+        if retry_after:
+            record_rejection(url_name, scope)
+            return scope, retry_after
+    return None
+
+
+def record_rejection(url_name, scope):
+    key = REJECTED_KEY.format(url_name, scope)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def rejected_counts():
+    """Contadores de pedidos rejeitados, por nome de URL e scope."""
+    keys = {
+        REJECTED_KEY.format(url_name, scope): (url_name, scope)
+        for url_name in settings.RATE_LIMITS
+        for scope in SCOPES
+    }
+    values = cache.get_many(keys)
+    counts = {}
+    for key, (url_name, scope) in keys.items():
+        counts.setdefault(url_name, {})[scope] = values.get(key, 0)
+    return counts
@@ -0,0 +1,89 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+
+from . import events
+from .cache import bump_version, user_version_key
+from .models import CustomUser, UserLevel
+
+CENTS = Decimal('0.01')
+
+
+def commission_tiers():
+    """
+    [(nível da rede, percentagem, valor fixo)], do convidante direto (1) para cima.
+    REFERRAL_COMMISSION_RATES dá as percentagens sobre o valor do nível comprado;
+    REFERRAL_SUBSIDY continua a ser o valor fixo pago ao convidante direto.
+    """
+    rates = list(settings.REFERRAL_COMMISSION_RATES)
+    if settings.REFERRAL_SUBSIDY and not rates:
+        rates = [Decimal('0')]
+    return [
+        (tier, rate, settings.REFERRAL_SUBSIDY if tier == 1 else Decimal('0'))
+        for tier, rate in enumerate(rates, start=1)
+    ]
+
+
+def commission_amount(tier_rate, tier_flat, deposit_value):
+    return (deposit_value * tier_rate / 100 + tier_flat).quantize(CENTS)
+
+
+def ancestor_chain(user_id, depth):
+    """Ids de quem convidou `user_id`, por nível da rede, lidos numa única consulta."""
+    if depth < 1:
+        return []
+    paths = ['__'.join(['invited_by'] * tier) for tier in range(1, depth + 1)]
+    chain = CustomUser.objects.filter(pk=user_id).values_list(*paths).first() or ()
+    ancestors = []
+    for ancestor_id in chain:
+        # Para na primeira lacuna (ou num ciclo) da cadeia de convites.
+        if ancestor_id is None or ancestor_id == user_id or ancestor_id in ancestors:
+            break
+        ancestors.append(ancestor_id)
+    return ancestors
+
+
+def pay_referral_commissions(user, level):
+    """
+    Credita as comissões da compra de `level` por `user` a toda a rede acima dele.
+    Só recebe quem tem um nível ativo (uma consulta para todos) e todos os saldos
+    sobem num único UPDATE. Deve correr dentro da transação da compra.
+    Devolve {id do beneficiário: valor}.
+    """
+    tiers = commission_tiers()
+    ancestors = ancestor_chain(user.pk, len(tiers))
+    if not ancestors:
+        return {}
+
+    eligible = set(
+        UserLevel.objects.filter(user_id__in=ancestors, is_active=True).values_list('user_id', flat=True)
+    )
+    payouts = {}
+    for ancestor_id, (tier, rate, flat) in zip(ancestors, tiers):
+        amount = commission_amount(rate, flat, level.deposit_value)
+        if ancestor_id in eligible and amount > 0:
+            payouts[ancestor_id] = amount
+    if not payouts:
+        return payouts
+
+    commission = Case(
+        *[When(pk=ancestor_id, then=Value(amount)) for ancestor_id, amount in payouts.items()],
+        output_field=DecimalField(max_digits=10, decimal_places=2),
+    )
+    CustomUser.objects.filter(pk__in=payouts).update(
+        subsidy_balance=F('subsidy_balance') + commission,
+        available_balance=F('available_balance') + commission,
+    )
+
+    # update() não envia post_save: as versões de cache são trocadas aqui.
+    def bump_versions():
+        for ancestor_id in payouts:
+            bump_version(user_version_key(ancestor_id))
+
+    transaction.on_commit(bump_versions)
+    # O cliente recarrega o saldo (api/balance/) ao receber o evento.
+    for ancestor_id, amount in payouts.items():
+        events.publish(ancestor_id, 'commission', {'amount': amount})
+    return payouts
@@ -0,0 +1,135 @@
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .archive import archived_daily_totals
+from .models import CustomUser, DailyPlatformStats, Deposit, Roulette, Task, UserLevel, Withdrawal
+from .sharding import merge_totals
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _per_day(queryset, date_field, **aggregates):
+    """{data: {agregado: valor}} agrupado pelo dia local de `date_field`."""
+    rows = (
+        queryset.annotate(day=TruncDate(date_field))
+        .values('day').annotate(**aggregates).order_by()
+    )
+    return {row.pop('day'): row for row in rows}
+
+
+def _per_day_shards(queryset, date_field, **aggregates):
+    """_per_day() de Task/Roulette somado em todos os shards (core/sharding.py)."""
+    return merge_totals(_per_day(shard, date_field, **aggregates) for shard in queryset.on_shards())
+
+
+def refresh_daily_stats(lookback_days=2, full=False):
+    """
+    Atualiza DailyPlatformStats de forma incremental: só recalcula os dias a
+    partir da última data já agregada (a marca d'água) menos `lookback_days`,
+    para apanhar saques alterados pouco depois. Depósitos aprovados mais tarde
+    atualizam o seu dia em refresh_deposit_stats() (core/signals.py). Cada
+    consulta filtra por intervalo de datas indexado, nunca a tabela inteira.
+    Devolve o número de dias atualizados.
+    """
+    today = timezone.localdate()
+    watermark = None if full else DailyPlatformStats.objects.aggregate(last=Max('date'))['last']
+    if watermark is not None:
+        first_day = watermark - timedelta(days=lookback_days)
+    else:
+        first_joined = CustomUser.objects.aggregate(first=Min('date_joined'))['first']
+        if first_joined is None:
+            return 0
+        first_day = timezone.localdate(first_joined)
+
+    start = _day_start(first_day)
+    end = _day_start(today + timedelta(days=1))
+
+    deposits = _per_day(
+        Deposit.objects.filter(created_at__gte=start, created_at__lt=end, is_approved=True),
+        'created_at', total=Sum('amount'), count=Count('id'),
+    )
+    withdrawals = _per_day(
+        Withdrawal.objects.filter(created_at__gte=start, created_at__lt=end),
+        'created_at', total=Sum('amount'), count=Count('id'),
+    )
+    new_users = _per_day(
+        CustomUser.objects.filter(date_joined__gte=start, date_joined__lt=end),
+        'date_joined', count=Count('id'),
+    )
+    levels = _per_day(
+        UserLevel.objects.filter(purchase_date__gte=start, purchase_date__lt=end),
+        'purchase_date', count=Count('id'), total=Sum('level__deposit_value'),
+    )
+    deactivated = _per_day(
+        UserLevel.objects.filter(deactivated_at__gte=start, deactivated_at__lt=end),
+        'deactivated_at', count=Count('id'),
+    )
+    # Tarefas e giros antigos já saíram das tabelas (manage.py archive_history):
+    # os totais desses dias vêm dos ficheiros de arquivo.
+    tasks = merge_totals([
+        _per_day_shards(
+            Task.objects.filter(completed_at__gte=start, completed_at__lt=end),
+            'completed_at', total=Sum('earnings'),
+        ),
+        archived_daily_totals('task', first_day, today),
+    ])
+    roulette = merge_totals([
+        _per_day_shards(
+            Roulette.objects.filter(spin_date__gte=start, spin_date__lt=end),
+            'spin_date', total=Sum('prize'),
+        ),
+        archived_daily_totals('roulette', first_day, today),
+    ])
+
+    # Níveis ativos no fim de cada dia: os do dia anterior à janela, mais os
+    # comprados, menos os desativados (deactivated_at) em cada dia.
+    active_levels = None if full else (
+        DailyPlatformStats.objects.filter(date=first_day - timedelta(days=1))
+        .values_list('active_levels', flat=True).first()
+    )
+    if active_levels is None:
+        active_levels = (
+            UserLevel.objects.filter(purchase_date__lt=start)
+            .exclude(deactivated_at__lt=start).count()
+        )
+
+    days = 0
+    with transaction.atomic():
+        day = first_day
+        while day <= today:
+            active_levels += levels.get(day, {}).get('count', 0) - deactivated.get(day, {}).get('count', 0)
+            DailyPlatformStats.objects.update_or_create(date=day, defaults={
+                'deposits_total': deposits.get(day, {}).get('total') or 0,
+                'deposits_count': deposits.get(day, {}).get('count', 0),
+                'withdrawals_total': withdrawals.get(day, {}).get('total') or 0,
+                'withdrawals_count': withdrawals.get(day, {}).get('count', 0),
+                'new_users': new_users.get(day, {}).get('count', 0),
+                'levels_purchased': levels.get(day, {}).get('count', 0),
+                'levels_purchased_total': levels.get(day, {}).get('total') or 0,
+                'active_levels': active_levels,
+                'tasks_payout': tasks.get(day, {}).get('total') or 0,
+                'roulette_payout': roulette.get(day, {}).get('total') or 0,
+            })
+            day += timedelta(days=1)
+            days += 1
+    return days
+
+
+def refresh_deposit_stats(day):
+    """
+    Recalcula só os depósitos aprovados de `day` numa linha já agregada: um
+    depósito aprovado fora da janela de refresh_daily_stats() conta no dia em
+    que foi criado, como os restantes.
+    """
+    totals = Deposit.objects.filter(
+        created_at__gte=_day_start(day), created_at__lt=_day_start(day + timedelta(days=1)), is_approved=True,
+    ).aggregate(total=Sum('amount'), count=Count('id'))
+    return DailyPlatformStats.objects.filter(date=day).update(
+        deposits_total=totals['total'] or 0, deposits_count=totals['count'], updated_at=timezone.now(),
+    )
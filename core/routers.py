@@ -0,0 +1,103 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .sharding import SHARDED_MODELS, is_sharded, shard_for, sharding_enabled
+
+# Estado do pedido atual (ver ReplicaPinningMiddleware):
+# - _pinned: leituras devem ir ao primário (o usuário escreveu há pouco);
+# - _wrote: houve pelo menos uma escrita neste pedido.
+_pinned = ContextVar('pinned_to_primary', default=False)
+_wrote = ContextVar('wrote_to_primary', default=False)
+
+
+def start_request(pinned=False):
+    return _pinned.set(pinned), _wrote.set(False)
+
+
+def end_request(tokens):
+    pinned_token, wrote_token = tokens
+    _pinned.reset(pinned_token)
+    _wrote.reset(wrote_token)
+
+
+def wrote_to_primary():
+    return _wrote.get()
+
+
+class PrimaryReplicaRouter:
+    """
+    Envia as escritas para o primário ('default') e as leituras para uma das
+    réplicas em settings.DATABASE_REPLICAS. Depois de uma escrita, as leituras
+    do mesmo pedido (e, via cookie, dos pedidos seguintes do mesmo navegador
+    durante REPLICA_STICKY_SECONDS) ficam no primário.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or _pinned.get():
+            return DEFAULT_DB_ALIAS
+        # Dentro de uma transação as leituras têm de ver as escritas ainda não confirmadas.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db == DEFAULT_DB_ALIAS:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _pinned.set(True)
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primário e réplicas têm os mesmos dados.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ShardRouter:
+    """
+    Coloca Task e Roulette no shard do usuário (settings.DATABASE_SHARDS),
+    a partir da instância gravada ou do usuário de um gestor relacionado
+    (user.task_set). Consultas sem usuário devem escolher o shard com
+    Task.objects.for_user() ou percorrer todos com on_shards(). Os restantes
+    modelos seguem para o PrimaryReplicaRouter.
+    """
+
+    def _shard_from_hints(self, model, hints):
+        if not is_sharded(model):
+            return None
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        # _meta e não type(): request.user chega como SimpleLazyObject.
+        if is_sharded(instance._meta.model):
+            return shard_for(instance.user_id)
+        # Gestor relacionado a partir do usuário: user.task_set, user.roulette_set.
+        return shard_for(instance.pk)
+
+    def db_for_read(self, model, **hints):
+        return self._shard_from_hints(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._shard_from_hints(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Task/Roulette apontam para usuários que vivem na base principal.
+        if is_sharded(obj1._meta.model) or is_sharded(obj2._meta.model):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_SHARDS:
+            return model_name is not None and f'{app_label}.{model_name}' in SHARDED_MODELS
+        # Com shards configurados, Task/Roulette não têm tabela na base principal:
+        # uma consulta sem for_user()/on_shards() falha em vez de ler uma tabela vazia.
+        if sharding_enabled() and f'{app_label}.{model_name}' in SHARDED_MODELS:
+            return False
+        return None
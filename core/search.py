@@ -0,0 +1,41 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+# Com menos de 3 caracteres o pg_trgm não tem trigramas para usar.
+TRIGRAM_MIN_LENGTH = 3
+
+
+def normalize_phone(phone_number):
+    """Só os dígitos: '+244 923-000-111' e '244923000111' encontram o mesmo usuário."""
+    return re.sub(r'\D', '', phone_number or '')
+
+
+def search_lookup(term):
+    """
+    Modo de pesquisa do admin para `term`:
+      "=923000111"  igualdade (índice btree);
+      em PostgreSQL, a partir de 3 caracteres, substring ("contains"),
+      servida pelos índices GIN pg_trgm (migração 0015);
+      nos restantes casos, prefixo ("startswith"), servido pelo índice btree.
+    Devolve (lookup, termo sem o "=").
+    """
+    term = term.strip()
+    if term.startswith('='):
+        return 'exact', term[1:].strip()
+    if connection.vendor == 'postgresql' and len(term) >= TRIGRAM_MIN_LENGTH:
+        return 'contains', term
+    return 'startswith', term
+
+
+def user_search_q(term):
+    """Q sobre CustomUser para um termo do admin: telefone normalizado ou código de convite."""
+    lookup, term = search_lookup(term)
+    if not term:
+        return Q(pk__in=[])
+    q = Q(**{f'invite_code__{lookup}': term.lower()})
+    digits = normalize_phone(term)
+    if digits:
+        q |= Q(**{f'phone_digits__{lookup}': digits})
+    return q
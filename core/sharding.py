@@ -0,0 +1,69 @@
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+# Modelos (label_lower) repartidos por usuário entre settings.DATABASE_SHARDS.
+SHARDED_MODELS = {'core.task', 'core.roulette'}
+
+
+def sharding_enabled():
+    return bool(settings.DATABASE_SHARDS)
+
+
+def is_sharded(model):
+    return sharding_enabled() and model._meta.label_lower in SHARDED_MODELS
+
+
+def shard_for(user_id):
+    """Base de dados de um usuário. O crc32 é estável entre processos e reinícios."""
+    shards = settings.DATABASE_SHARDS
+    return shards[zlib.crc32(str(user_id).encode()) % len(shards)]
+
+
+def merge_totals(results):
+    """Soma resultados {chave: número} (ou {chave: {campo: número}}) vindos de cada shard."""
+    merged = {}
+    for result in results:
+        for key, value in result.items():
+            if isinstance(value, dict):
+                merged[key] = merge_totals([merged.get(key, {}), value])
+            elif value is not None:
+                merged[key] = merged[key] + value if merged.get(key) is not None else value
+            else:
+                merged.setdefault(key, None)
+    return merged
+
+
+class ShardedQuerySet(models.QuerySet):
+    def for_user(self, user):
+        """Linhas de um usuário, lidas diretamente do seu shard."""
+        user_id = getattr(user, 'pk', user)
+        queryset = self.filter(user_id=user_id)
+        if is_sharded(self.model):
+            queryset = queryset.using(shard_for(user_id))
+        return queryset
+
+    def create(self, **kwargs):
+        # Sem instância o router não sabe o usuário: escolhe-se o shard aqui.
+        if is_sharded(self.model) and self._db is None:
+            user_id = kwargs['user_id'] if 'user_id' in kwargs else kwargs['user'].pk
+            return self.using(shard_for(user_id)).create(**kwargs)
+        return super().create(**kwargs)
+
+    def on_shards(self):
+        """
+        Uma cópia da consulta por shard, para relatórios que percorrem todos os
+        usuários. Sem sharding, ou se a consulta já escolheu a base (for_user(),
+        using()), devolve só a própria consulta.
+        """
+        if not is_sharded(self.model) or self._db is not None:
+            return [self]
+        return [self.using(alias) for alias in settings.DATABASE_SHARDS]
+
+    def aggregate_shards(self, **aggregates):
+        """aggregate() em todos os shards, somando os resultados (Sum/Count)."""
+        return merge_totals(queryset.aggregate(**aggregates) for queryset in self.on_shards())
+
+
+ShardedManager = models.Manager.from_queryset(ShardedQuerySet)
@@ -0,0 +1,84 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import events, rollups
+from .cache import (
+    LEVELS_VERSION_KEY, SETTINGS_VERSION_KEY, bump_version, team_version_key, user_version_key,
+)
+from .models import (
+    CustomUser, Deposit, Level, PlatformBankDetails, PlatformSettings, Roulette, RouletteSettings,
+    Task, UserLevel, Withdrawal,
+)
+
+
+@receiver([post_save, post_delete], sender=PlatformSettings)
+@receiver([post_save, post_delete], sender=PlatformBankDetails)
+@receiver([post_save, post_delete], sender=RouletteSettings)
+def bump_settings_version(sender, **kwargs):
+    bump_version(SETTINGS_VERSION_KEY)
+
+
+@receiver([post_save, post_delete], sender=Level)
+def bump_levels_version(sender, **kwargs):
+    bump_version(LEVELS_VERSION_KEY)
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def bump_custom_user_version(sender, instance, signal, created=False, **kwargs):
+    bump_version(user_version_key(instance.pk))
+    if signal is post_save:
+        # Saldo e giros em direto para as páginas abertas (core/events.py).
+        events.publish(instance.pk, 'balance', events.balance_state(instance))
+    # Um novo convidado (ou um convidado removido) muda a equipa de quem convidou.
+    if instance.invited_by_id and (created or signal is post_delete):
+        bump_version(team_version_key(instance.invited_by_id))
+
+
+@receiver(pre_delete, sender=CustomUser)
+def delete_sharded_rows(sender, instance, **kwargs):
+    # Task/Roulette podem viver no shard do usuário, fora do alcance do CASCADE
+    # (on_delete=DO_NOTHING): são apagadas aqui, com ou sem sharding.
+    Task.objects.for_user(instance).delete()
+    Roulette.objects.for_user(instance).delete()
+
+
+@receiver([post_save, post_delete], sender=Deposit)
+@receiver([post_save, post_delete], sender=Withdrawal)
+@receiver([post_save, post_delete], sender=Task)
+@receiver([post_save, post_delete], sender=Roulette)
+def bump_user_version(sender, instance, **kwargs):
+    bump_version(user_version_key(instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=UserLevel)
+def bump_user_level_version(sender, instance, **kwargs):
+    CustomUser.objects.sync_active_levels(pk=instance.user_id)
+    bump_version(user_version_key(instance.user_id))
+    # O nível ativo de um convidado entra nas contagens da equipa de quem convidou.
+    if UserLevel.user.is_cached(instance):
+        invited_by_id = instance.user.invited_by_id
+    else:
+        invited_by_id = CustomUser.objects.filter(pk=instance.user_id).values_list('invited_by_id', flat=True).first()
+    if invited_by_id:
+        bump_version(team_version_key(invited_by_id))
+
+
+@receiver(post_save, sender=Deposit)
+def publish_deposit_event(sender, instance, **kwargs):
+    events.publish(instance.user_id, 'deposit', {
+        'id': instance.pk, 'amount': instance.amount, 'is_approved': instance.is_approved,
+    })
+
+
+@receiver([post_save, post_delete], sender=Deposit)
+def refresh_deposit_day(sender, instance, created=False, **kwargs):
+    # Um depósito novo ainda não aprovado não conta; aprovações, edições e
+    # remoções corrigem o dia do depósito em DailyPlatformStats, mesmo fora da
+    # janela de refresh_daily_stats().
+    if created and not instance.is_approved:
+        return
+    transaction.on_commit(partial(rollups.refresh_deposit_stats, timezone.localdate(instance.created_at)))
@@ -0,0 +1,53 @@
+import json
+from functools import lru_cache
+from pathlib import Path
+
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+MIME_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+}
+
+
+@lru_cache(maxsize=1)
+def load_variants_manifest():
+    # Gerado pelo comando generate_image_variants.
+    manifest_path = Path(settings.BASE_DIR) / 'static' / 'variants' / 'manifest.json'
+    try:
+        return json.loads(manifest_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+@register.simple_tag
+def picture(name, alt='', css_class='', sizes='100vw', loading='lazy'):
+    """
+    Gera um <picture> com srcset AVIF/WebP para a imagem estática `name`.
+    Sem manifesto (ou sem variantes para a imagem) devolve um <img> simples.
+    """
+    entry = load_variants_manifest().get(name)
+    if not entry:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}">',
+            static(name), alt, css_class, loading,
+        )
+
+    sources = format_html_join(
+        '',
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (MIME_TYPES[fmt], ', '.join(f'{static(path)} {width}w' for path, width in variants), sizes)
+            for fmt, variants in entry['variants'].items() if variants
+        ),
+    )
+    # Ficheiros duplicados apontam todos para a mesma origem canónica.
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}" class="{}" width="{}" height="{}" loading="{}"></picture>',
+        sources, static(entry['src']), alt, css_class, entry['width'], entry['height'], loading,
+    )
@@ -1,3 +1,1036 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gc
+import json
+import re
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import storages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import connection, connections
+from django.db.models import Count, F, Sum
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import (
+    archive, events, exports, forecast, jobs, middleware, ratelimit, referrals, rollups, routers, sharding, uploads,
+    views,
+)
+from .middleware import HTMLCompressionMiddleware, RateLimitMiddleware, ReplicaPinningMiddleware
+from .models import (
+    ArchivedBatch, ArchivedUserTotals, CustomUser, DailyPlatformStats, Deposit, Job, Level, RateLimitBucket, Roulette,
+    Task, UserLevel, Withdrawal,
+)
+from .routers import PrimaryReplicaRouter, ShardRouter
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        tokens = routers.start_request()
+        self.addCleanup(routers.end_request, tokens)
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.router.db_for_read(CustomUser), 'replica')
+
+    def test_writes_go_to_primary_and_pin_following_reads(self):
+        self.assertEqual(self.router.db_for_write(CustomUser), 'default')
+        self.assertTrue(routers.wrote_to_primary())
+        self.assertEqual(self.router.db_for_read(CustomUser), 'default')
+
+    def test_pinned_request_reads_from_primary(self):
+        tokens = routers.start_request(pinned=True)
+        self.addCleanup(routers.end_request, tokens)
+        self.assertEqual(self.router.db_for_read(CustomUser), 'default')
+
+    def test_instance_loaded_from_primary_stays_on_primary(self):
+        user = CustomUser(phone_number='900000000')
+        user._state.db = 'default'
+        self.assertEqual(self.router.db_for_read(CustomUser, instance=user), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_primary(self):
+        self.assertEqual(self.router.db_for_read(CustomUser), 'default')
+
+    def test_migrations_only_run_on_primary(self):
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_STICKY_SECONDS=15)
+class ReplicaPinningMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = PrimaryReplicaRouter()
+
+    def test_write_sets_pin_cookie(self):
+        def view(request):
+            self.router.db_for_write(CustomUser)
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(view)(self.factory.get('/'))
+        cookie = response.cookies['primary_pin']
+        self.assertEqual(cookie['max-age'], 15)
+
+    def test_read_only_request_does_not_pin(self):
+        def view(request):
+            self.assertEqual(self.router.db_for_read(CustomUser), 'replica')
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(view)(self.factory.get('/'))
+        self.assertNotIn('primary_pin', response.cookies)
+
+    def test_pin_cookie_routes_reads_to_primary(self):
+        def view(request):
+            self.assertEqual(self.router.db_for_read(CustomUser), 'default')
+            self.assertFalse(routers.wrote_to_primary())
+            return HttpResponse()
+
+        request = self.factory.get('/')
+        request.COOKIES['primary_pin'] = '1'
+        response = ReplicaPinningMiddleware(view)(request)
+        self.assertNotIn('primary_pin', response.cookies)
+
+    def test_unsafe_request_reads_from_primary_before_any_write(self):
+        def view(request):
+            self.assertEqual(self.router.db_for_read(CustomUser), 'default')
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(view)(self.factory.post('/'))
+        self.assertIn('primary_pin', response.cookies)
+
+
+
+# Corre com uma réplica local, p.ex.:
+# REPLICA_DATABASE_URL=sqlite:////tmp/replica.sqlite3 manage.py test core.tests.ReplicaRoutingTests
+# Nos testes a réplica é um espelho do 'default' por outra ligação: o que se
+# verifica é por qual das duas ligações passa cada consulta.
+@skipUnless(settings.DATABASE_REPLICAS, 'sem REPLICA_DATABASE_URL')
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        level = Level.objects.create(name='N1', deposit_value=30, daily_gain=2, monthly_gain=60, cycle_days=90)
+        self.user = CustomUser.objects.create_user('900000010', 'senha', available_balance=10)
+        UserLevel.objects.create(user=self.user, level=level)
+        self.client.force_login(self.user)
+
+    def test_reads_without_pin_go_to_the_replica(self):
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.assertEqual(self.client.get('/api/balance/').status_code, 200)
+        self.assertTrue(replica_queries.captured_queries)
+
+    def test_first_post_reads_user_and_tasks_from_primary(self):
+        # Sem cookie de fixação: o usuário e a contagem de tarefas do dia vêm do primário.
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.post('/process_task/')
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(replica_queries.captured_queries, [])
+        self.assertIn(settings.REPLICA_PIN_COOKIE_NAME, response.cookies)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.available_balance, 12)
+
+        # Com o cookie, as leituras seguintes também ficam no primário.
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            self.assertEqual(self.client.get('/api/balance/').json()['available_balance'], '12.00')
+        self.assertEqual(replica_queries.captured_queries, [])
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
+
+
+@override_settings(STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}})
+@override_settings(CACHES=LOCMEM_CACHE, RATE_LIMIT_ENABLED=True, RATE_LIMIT_PROXY_COUNT=1, RATE_LIMITS={
+    'login': {'ip': '2/m'},
+    'process_task': {'user': '1/m', 'json': True},
+})
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_third_login_attempt_gets_429_with_retry_after(self):
+        for _ in range(2):
+            self.assertEqual(self.client.post('/login/', {'username': 'x', 'password': 'y'}).status_code, 200)
+        response = self.client.post('/login/', {'username': 'x', 'password': 'y'})
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+
+    def test_json_endpoints_get_json_error_body(self):
+        user = CustomUser.objects.create_user('900000950', 'senha')
+        self.client.force_login(user)
+        self.client.post('/process_task/')
+        response = self.client.post('/process_task/')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(response.json(), {'success': False, 'message': RateLimitMiddleware.message})
+
+    def test_clients_behind_the_proxy_have_separate_limits(self):
+        for address in ('10.0.0.1', '10.0.0.2'):
+            for _ in range(2):
+                response = self.client.post(
+                    '/login/', {'username': 'x', 'password': 'y'}, HTTP_X_FORWARDED_FOR=address,
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_bucket_refills_gradually_instead_of_per_window(self):
+        for _ in range(5):
+            self.assertEqual(ratelimit.consume('ratelimit:test', '5/m'), 0)
+        # Uma ficha a cada 12 s: esgotado o balde, não há uma nova rajada no minuto seguinte.
+        self.assertEqual(ratelimit.consume('ratelimit:test', '5/m'), 12)
+        RateLimitBucket.objects.filter(key='ratelimit:test').update(updated_at=F('updated_at') - 12)
+        self.assertEqual(ratelimit.consume('ratelimit:test', '5/m'), 0)
+        self.assertTrue(ratelimit.consume('ratelimit:test', '5/m'))
+
+    @override_settings(RATE_LIMIT_PROXY_COUNT=0)
+    def test_forwarded_for_is_ignored_without_trusted_proxy(self):
+        statuses = [
+            self.client.post('/login/', {'username': 'x', 'password': 'y'}, HTTP_X_FORWARDED_FOR=address).status_code
+            for address in ('10.0.0.1', '10.0.0.2', '10.0.0.3')
+        ]
+        self.assertEqual(statuses, [200, 200, 429])
+
+
+# Transações reais: cada thread usa a sua ligação à base de dados.
+class RateLimitConcurrencyTests(TransactionTestCase):
+    def test_concurrent_requests_do_not_exceed_the_limit(self):
+        def consume(_):
+            try:
+                return ratelimit.consume('ratelimit:test', '5/m')
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            results = list(pool.map(consume, range(40)))
+        self.assertEqual(results.count(0), 5)
+
+
+@override_settings(HTML_COMPRESSION_MIN_SIZE=0)
+class HTMLCompressionMiddlewareTests(SimpleTestCase):
+    def compress(self, accept_encoding, csrf=False):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        if csrf:
+            request.META['CSRF_COOKIE_USED'] = True
+        response = HttpResponse('<p>conteúdo</p>' * 200, content_type='text/html')
+        response['ETag'] = '"abc"'
+        return HTMLCompressionMiddleware(lambda request: response)(request)
+
+    def test_encoding_follows_accept_encoding(self):
+        self.assertNotIn('Content-Encoding', self.compress('identity'))
+        self.assertEqual(self.compress('gzip')['Content-Encoding'], 'gzip')
+        expected = 'gzip' if middleware.brotli is None else 'br'
+        self.assertEqual(self.compress('br, gzip')['Content-Encoding'], expected)
+
+    def test_pages_with_csrf_token_are_never_brotli(self):
+        self.assertEqual(self.compress('br, gzip', csrf=True)['Content-Encoding'], 'gzip')
+
+    def test_compressed_response_gets_weak_etag(self):
+        response = self.compress('gzip')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+
+@override_settings(
+    HTML_COMPRESSION_MIN_SIZE=0,
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class PageETagTests(TestCase):
+    def test_repeat_visit_with_weak_etag_gets_304(self):
+        self.client.force_login(CustomUser.objects.create_user('900000960', 'senha'))
+        response = self.client.get('/sobre/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+
+        response = self.client.get('/sobre/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHE,
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class AnonymousShellTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_shell_is_public_and_carries_no_token_or_user_data(self):
+        for url in ('/login/', '/cadastro/?invite=ABC123'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('public', response['Cache-Control'])
+            self.assertIn(f'max-age={settings.ANONYMOUS_SHELL_MAX_AGE}', response['Cache-Control'])
+            self.assertNotIn('Cookie', response.get('Vary', ''))
+            self.assertNotIn(settings.CSRF_COOKIE_NAME, response.cookies)
+            self.assertContains(response, 'name="csrfmiddlewaretoken" value=""')
+            self.assertNotContains(response, 'ABC123')
+
+        # A segunda visita vem da cache partilhada, sem consultas.
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/login/').status_code, 200)
+
+    def test_csrf_endpoint_returns_token_and_sets_cookie(self):
+        response = self.client.get('/csrf/')
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertTrue(response.json()['csrfToken'])
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+
+        # O token preenchido pelo shell.js é aceite no POST do formulário.
+        client = Client(enforce_csrf_checks=True)
+        token = client.get('/csrf/').json()['csrfToken']
+        self.assertEqual(client.post('/login/', {'username': 'x', 'password': 'y'}).status_code, 403)
+        response = client.post('/login/', {'username': 'x', 'password': 'y', 'csrfmiddlewaretoken': token})
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ApiETagTests(TestCase):
+    # api/balance/ soma as tarefas no shard do usuário.
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user('900000970', 'senha', available_balance=10)
+        self.client.force_login(self.user)
+
+    def test_balance_poll_gets_304_until_the_balance_changes(self):
+        response = self.client.get('/api/balance/')
+        self.assertEqual(response.json()['available_balance'], '10.00')
+        self.assertIn('private', response['Cache-Control'])
+        etag = response['ETag']
+
+        # O 304 sai só da sessão e da cache, sem carregar o usuário.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/balance/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([query for query in queries if 'core_customuser' in query['sql']])
+
+        self.user.available_balance += 5
+        self.user.save()
+        response = self.client.get('/api/balance/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['available_balance'], '15.00')
+
+    def test_levels_etag_changes_with_levels(self):
+        etag = self.client.get('/api/levels/')['ETag']
+        self.assertEqual(self.client.get('/api/levels/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Level.objects.create(name='N1', deposit_value=30, daily_gain=1, monthly_gain=30, cycle_days=90)
+        response = self.client.get('/api/levels/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([level['name'] for level in response.json()['levels']], ['N1'])
+
+
+class StartupImportsTests(SimpleTestCase):
+    def test_setup_does_not_import_cloudinary(self):
+        # O Cloudinary só deve ser importado no primeiro acesso ao default_storage.
+        script = (
+            'import json, sys, django; django.setup(); '
+            'print(json.dumps(sorted(m for m in sys.modules if m.split(".")[0] in ("cloudinary", "cloudinary_storage"))))'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(json.loads(result.stdout), [])
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        jobs.HANDLERS['test_job'] = self.handler
+        self.addCleanup(jobs.HANDLERS.pop, 'test_job')
+
+    def handler(self, fail=False):
+        self.calls.append(fail)
+        if fail:
+            raise RuntimeError('falhou')
+
+    def test_enqueue_runs_synchronously_without_skip_locked(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = jobs.enqueue('test_job')
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DONE)
+        self.assertEqual(self.calls, [False])
+
+    @override_settings(JOBS_RETRY_BASE_DELAY=30)
+    def test_failed_job_is_retried_with_backoff_then_marked_failed(self):
+        job = Job.objects.create(name='test_job', payload={'fail': True}, max_attempts=2)
+        self.assertFalse(jobs.run_job(job))
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+        self.assertGreater(job.run_at, job.created_at)
+        self.assertFalse(jobs.run_job(job))
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIn('RuntimeError', job.last_error)
+
+
+class ArchiveTests(TestCase):
+    # Task/Roulette podem viver nos shards (SHARD_DATABASE_URLS).
+    databases = '__all__'
+
+    def setUp(self):
+        archive_root = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_root.cleanup)
+        self.enterContext(override_settings(ARCHIVE_ROOT=archive_root.name))
+        self.user = CustomUser.objects.create_user('900000003', 'senha')
+
+    def test_old_rows_move_to_archive_and_totals(self):
+        old = timezone.now() - timedelta(days=120)
+        for earnings in (5, 7):
+            task = Task.objects.create(user=self.user, earnings=earnings)
+            Task.objects.for_user(self.user).filter(pk=task.pk).update(completed_at=old)
+        Task.objects.create(user=self.user, earnings=3)
+        spin = Roulette.objects.create(user=self.user, prize=100)
+        Roulette.objects.for_user(self.user).filter(pk=spin.pk).update(spin_date=old)
+
+        cutoff = timezone.now() - timedelta(days=90)
+        self.assertEqual(archive.archive_model('task', cutoff, batch_size=1), 2)
+        self.assertEqual(archive.archive_model('roulette', cutoff), 1)
+        # Repetir não arquiva nada em duplicado.
+        self.assertEqual(archive.archive_model('task', cutoff), 0)
+
+        self.assertEqual(Task.objects.for_user(self.user).count(), 1)
+        self.assertFalse(Roulette.objects.for_user(self.user).exists())
+        totals = ArchivedUserTotals.objects.get(user=self.user)
+        self.assertEqual((totals.tasks_count, totals.tasks_earnings), (2, 12))
+        self.assertEqual((totals.roulette_count, totals.roulette_prizes), (1, 100))
+        rows = list(archive.iter_archive('task', user_id=self.user.pk))
+        self.assertEqual(sorted(row['earnings'] for row in rows), ['5.00', '7.00'])
+
+    def test_failed_delete_is_retried_without_counting_totals_twice(self):
+        old = timezone.now() - timedelta(days=120)
+        for earnings in (5, 7):
+            task = Task.objects.create(user=self.user, earnings=earnings)
+            Task.objects.for_user(self.user).filter(pk=task.pk).update(completed_at=old)
+        cutoff = timezone.now() - timedelta(days=90)
+
+        # O shard cai entre o commit dos totais e o DELETE.
+        with mock.patch.object(archive, '_delete_batch', side_effect=RuntimeError('shard indisponível')):
+            with self.assertRaises(RuntimeError):
+                archive.archive_model('task', cutoff)
+        self.assertEqual(Task.objects.for_user(self.user).count(), 2)
+        self.assertEqual(ArchivedBatch.objects.count(), 1)
+
+        self.assertEqual(archive.archive_model('task', cutoff), 0)
+
+        self.assertFalse(Task.objects.for_user(self.user).exists())
+        self.assertFalse(ArchivedBatch.objects.exists())
+        totals = ArchivedUserTotals.objects.get(user=self.user)
+        self.assertEqual((totals.tasks_count, totals.tasks_earnings), (2, 12))
+
+    def test_full_rollup_keeps_archived_days(self):
+        old = timezone.now() - timedelta(days=120)
+        CustomUser.objects.filter(pk=self.user.pk).update(date_joined=old - timedelta(days=1))
+        task = Task.objects.create(user=self.user, earnings=5)
+        Task.objects.for_user(self.user).filter(pk=task.pk).update(completed_at=old)
+        spin = Roulette.objects.create(user=self.user, prize=100)
+        Roulette.objects.for_user(self.user).filter(pk=spin.pk).update(spin_date=old)
+        rollups.refresh_daily_stats(full=True)
+        day = DailyPlatformStats.objects.get(date=timezone.localdate(old))
+        self.assertEqual((day.tasks_payout, day.roulette_payout), (5, 100))
+
+        cutoff = timezone.now() - timedelta(days=90)
+        archive.archive_model('task', cutoff)
+        archive.archive_model('roulette', cutoff)
+        rollups.refresh_daily_stats(full=True)
+
+        day.refresh_from_db()
+        self.assertEqual((day.tasks_payout, day.roulette_payout), (5, 100))
+
+
+@override_settings(
+    WITHDRAWAL_HISTORY_PAGE_SIZE=2,
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class WithdrawalHistoryTests(TestCase):
+    def test_load_more_walks_history_without_gaps(self):
+        user = CustomUser.objects.create_user('900000004', 'senha')
+        withdrawals = [Withdrawal.objects.create(user=user, amount=amount) for amount in (14, 15, 16, 17, 18)]
+        # Empates em created_at são desfeitos pelo id.
+        Withdrawal.objects.filter(pk__in=[w.pk for w in withdrawals[1:4]]).update(created_at=timezone.now())
+        self.client.force_login(user)
+
+        response = self.client.get('/saque/')
+        seen = [int(record.amount) for record in response.context['withdrawal_records']]
+        cursor = response.context['next_cursor']
+        while cursor:
+            data = self.client.get('/saque/historico/', {'cursor': cursor}).json()
+            seen += [int(amount) for amount in re.findall(r'(\d+)[.,]00 \$', data['html'])]
+            cursor = data['next_cursor']
+
+        self.assertEqual(sorted(seen), [14, 15, 16, 17, 18])
+        self.assertEqual(self.client.get('/saque/historico/', {'cursor': 'x'}).status_code, 400)
+
+
+@override_settings(REFERRAL_SUBSIDY=Decimal('11'), REFERRAL_COMMISSION_RATES=[Decimal('10'), Decimal('5'), Decimal('2')])
+class ReferralCommissionTests(TestCase):
+    def test_commissions_go_up_the_chain_to_ancestors_with_active_level(self):
+        level = Level.objects.create(name='N1', deposit_value=100, daily_gain=1, monthly_gain=30, cycle_days=30)
+        chain = []
+        for index in range(4):
+            inviter = chain[-1] if chain else None
+            chain.append(CustomUser.objects.create_user(f'90000010{index}', 'senha', invited_by=inviter))
+        top, second, direct, buyer = chain
+        for ancestor in (top, direct):
+            UserLevel.objects.create(user=ancestor, level=level)
+
+        with self.assertNumQueries(3), self.captureOnCommitCallbacks(execute=True):
+            payouts = referrals.pay_referral_commissions(buyer, level)
+
+        # Nível 1: 10% + 11 fixo; nível 2 sem nível ativo; nível 3: 2%.
+        self.assertEqual(payouts, {direct.pk: Decimal('21.00'), top.pk: Decimal('2.00')})
+        balances = dict(CustomUser.objects.values_list('pk', 'subsidy_balance'))
+        self.assertEqual(balances[direct.pk], Decimal('21.00'))
+        self.assertEqual(balances[second.pk], 0)
+        self.assertEqual(balances[top.pk], Decimal('2.00'))
+
+
+@override_settings(REFERRAL_SUBSIDY=Decimal('0'), REFERRAL_COMMISSION_RATES=[Decimal('2.5')])
+class ReconcileBalancesTests(TestCase):
+    databases = '__all__'
+
+    def reconcile(self, *args):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/drift.csv'
+            call_command('reconcile_balances', '--output', path, *args, stderr=StringIO())
+            with open(path, newline='') as output:
+                return {int(row['user_id']): row for row in csv.DictReader(output)}
+
+    def test_commission_is_rounded_per_purchase(self):
+        free = Level.objects.create(name='N0', deposit_value=0, daily_gain=1, monthly_gain=30, cycle_days=30)
+        level = Level.objects.create(name='N1', deposit_value=Decimal('10.10'), daily_gain=1, monthly_gain=30, cycle_days=30)
+        inviter = CustomUser.objects.create_user('900000110', 'senha')
+        buyer = CustomUser.objects.create_user('900000111', 'senha', invited_by=inviter)
+        UserLevel.objects.create(user=inviter, level=free)
+        for _ in range(3):
+            UserLevel.objects.create(user=buyer, level=level)
+            referrals.pay_referral_commissions(buyer, level)
+        CustomUser.objects.filter(pk=buyer.pk).update(available_balance=Decimal('-30.30'))
+
+        # 3 × 0,25 (0,2525 arredondado por compra), não 0,76 (30,30 × 2,5%).
+        inviter.refresh_from_db()
+        self.assertEqual(inviter.subsidy_balance, Decimal('0.75'))
+        self.assertEqual(self.reconcile(), {})
+
+    def test_reports_only_users_with_drift(self):
+        consistent = CustomUser.objects.create_user('900000112', 'senha')
+        drifted = CustomUser.objects.create_user('900000113', 'senha')
+        for user in (consistent, drifted):
+            Deposit.objects.create(user=user, amount=100, is_approved=True)
+            Withdrawal.objects.create(user=user, amount=30)
+            Task.objects.create(user=user, earnings=5)
+        # Esperado: 100 - 30 + 5 = 75.
+        CustomUser.objects.filter(pk=consistent.pk).update(available_balance=75)
+        CustomUser.objects.filter(pk=drifted.pk).update(available_balance=80)
+
+        stdout, stderr = StringIO(), StringIO()
+        call_command('reconcile_balances', '--chunk-size', '1', stdout=stdout, stderr=stderr)
+
+        rows = list(csv.DictReader(StringIO(stdout.getvalue())))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(int(rows[0]['user_id']), drifted.pk)
+        self.assertEqual(
+            (rows[0]['available_balance'], rows[0]['expected_available_balance'], rows[0]['available_drift']),
+            ('80.00', '75.00', '5.00'),
+        )
+        self.assertIn('2 usuários verificados, 1 com diferenças', stderr.getvalue())
+        self.assertIn('drift total do saldo disponível: 5.00', stderr.getvalue())
+        # Só reporta: os saldos não são alterados.
+        self.assertEqual(
+            dict(CustomUser.objects.values_list('pk', 'available_balance')),
+            {consistent.pk: 75, drifted.pk: 80},
+        )
+
+
+class DailyStatsRollupTests(TestCase):
+    # Tarefas e giros podem viver nos shards (SHARD_DATABASE_URLS).
+    databases = '__all__'
+
+    def setUp(self):
+        archive_root = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_root.cleanup)
+        self.enterContext(override_settings(ARCHIVE_ROOT=archive_root.name))
+        self.today = timezone.localdate()
+        self.user = CustomUser.objects.create_user('900000120', 'senha')
+        self.at(CustomUser.objects.filter(pk=self.user.pk), 'date_joined', 5)
+
+    def at(self, queryset, field, days_ago):
+        moment = timezone.make_aware(datetime.combine(self.today - timedelta(days=days_ago), time(12)))
+        queryset.update(**{field: moment})
+
+    def stats(self, days_ago):
+        return DailyPlatformStats.objects.get(date=self.today - timedelta(days=days_ago))
+
+    def test_full_refresh_matches_source_rows(self):
+        level = Level.objects.create(name='N1', deposit_value=30, daily_gain=2, monthly_gain=60, cycle_days=90)
+        for amount, approved in ((100, True), (40, True), (999, False)):
+            deposit = Deposit.objects.create(user=self.user, amount=amount, is_approved=approved)
+            self.at(Deposit.objects.filter(pk=deposit.pk), 'created_at', 3)
+        withdrawal = Withdrawal.objects.create(user=self.user, amount=25)
+        self.at(Withdrawal.objects.filter(pk=withdrawal.pk), 'created_at', 2)
+        user_level = UserLevel.objects.create(user=self.user, level=level)
+        self.at(UserLevel.objects.filter(pk=user_level.pk), 'purchase_date', 3)
+        for earnings in (2, 3):
+            task = Task.objects.create(user=self.user, earnings=earnings)
+            self.at(Task.objects.for_user(self.user).filter(pk=task.pk), 'completed_at', 1)
+
+        self.assertEqual(rollups.refresh_daily_stats(full=True), 6)
+
+        self.assertEqual(self.stats(5).new_users, 1)
+        day = self.stats(3)
+        self.assertEqual((day.deposits_total, day.deposits_count), (140, 2))
+        self.assertEqual((day.levels_purchased, day.levels_purchased_total, day.active_levels), (1, 30, 1))
+        self.assertEqual((self.stats(2).withdrawals_total, self.stats(2).withdrawals_count), (25, 1))
+        self.assertEqual(self.stats(1).tasks_payout, 5)
+        # O nível comprado continua ativo nos dias seguintes.
+        self.assertEqual(self.stats(0).active_levels, 1)
+        self.assertEqual(
+            sum(day.deposits_total for day in DailyPlatformStats.objects.all()),
+            Deposit.objects.filter(is_approved=True).aggregate(total=Sum('amount'))['total'],
+        )
+
+    def test_incremental_refresh_starts_at_watermark_minus_lookback(self):
+        rollups.refresh_daily_stats(full=True)
+        DailyPlatformStats.objects.update(deposits_total=7)
+        Deposit.objects.create(user=self.user, amount=50, is_approved=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(rollups.refresh_daily_stats(lookback_days=1), 2)
+
+        # Só ontem e hoje foram recalculados; os dias anteriores ficam como estavam.
+        self.assertEqual(self.stats(0).deposits_total, 50)
+        self.assertEqual(self.stats(1).deposits_total, 0)
+        self.assertEqual([self.stats(days).deposits_total for days in (2, 3, 4, 5)], [7] * 4)
+        deposit_reads = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and 'FROM "core_deposit"' in query['sql']
+        ]
+        self.assertEqual(len(deposit_reads), 1)
+        self.assertIn('"core_deposit"."created_at" >=', deposit_reads[0])
+
+    def test_late_approval_updates_the_deposit_day_outside_the_lookback(self):
+        deposit = Deposit.objects.create(user=self.user, amount=80)
+        self.at(Deposit.objects.filter(pk=deposit.pk), 'created_at', 4)
+        rollups.refresh_daily_stats(full=True)
+        self.assertEqual(self.stats(4).deposits_count, 0)
+
+        deposit.refresh_from_db()
+        deposit.is_approved = True
+        with self.captureOnCommitCallbacks(execute=True):
+            deposit.save()
+        rollups.refresh_daily_stats(lookback_days=1)
+
+        self.assertEqual((self.stats(4).deposits_total, self.stats(4).deposits_count), (80, 1))
+
+    def test_deactivation_does_not_rewrite_past_active_levels(self):
+        level = Level.objects.create(name='N1', deposit_value=30, daily_gain=2, monthly_gain=60, cycle_days=90)
+        user_level = UserLevel.objects.create(user=self.user, level=level)
+        self.at(UserLevel.objects.filter(pk=user_level.pk), 'purchase_date', 3)
+        rollups.refresh_daily_stats(full=True)
+
+        user_level.refresh_from_db()
+        user_level.is_active = False
+        user_level.save(update_fields=['is_active'])
+        self.assertEqual(rollups.refresh_daily_stats(lookback_days=1), 2)
+
+        self.assertEqual([self.stats(days).active_levels for days in (3, 2, 1, 0)], [1, 1, 1, 0])
+        user_level.refresh_from_db()
+        self.assertIsNotNone(user_level.deactivated_at)
+        rollups.refresh_daily_stats(full=True)
+        self.assertEqual([self.stats(days).active_levels for days in (3, 2, 1, 0)], [1, 1, 1, 0])
+
+
+class SeedSyntheticTests(TestCase):
+    databases = '__all__'
+
+    def test_generates_users_with_history_and_referral_tree(self):
+        Level.objects.create(name='N1', deposit_value=30, daily_gain=1, monthly_gain=30, cycle_days=90)
+        call_command('seed_synthetic', users=200, days=5, chunk_size=64, seed=1, stdout=StringIO())
+
+        self.assertEqual(CustomUser.objects.count(), 200)
+        self.assertTrue(CustomUser.objects.filter(invited_by__isnull=False).exists())
+        old_tasks = Task.objects.filter(completed_at__lt=timezone.now() - timedelta(days=1))
+        self.assertTrue(any(shard.exists() for shard in old_tasks.on_shards()))
+        user = CustomUser.objects.order_by('-pk').first()
+        self.assertTrue(user.check_password('synthetic'))
+
+
+class ExportCsvTests(TestCase):
+    databases = '__all__'
+
+    def test_admin_action_streams_selected_rows(self):
+        admin_user = CustomUser.objects.create_superuser('900000200', 'senha')
+        tasks = [Task.objects.create(user=admin_user, earnings=earnings) for earnings in (1, 2, 3)]
+        self.client.force_login(admin_user)
+
+        # Com sharding o admin mostra um shard de cada vez (?shard=).
+        query = f'?shard={sharding.shard_for(admin_user.pk)}' if settings.DATABASE_SHARDS else ''
+        response = self.client.post(f'/admin/core/task/{query}', {
+            'action': 'export_csv', '_selected_action': [tasks[0].pk, tasks[2].pk],
+        })
+
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,user__phone_number,earnings,completed_at')
+        self.assertEqual([line.split(',')[:3] for line in lines[1:]], [
+            [str(tasks[0].pk), '900000200', '1.00'], [str(tasks[2].pk), '900000200', '3.00'],
+        ])
+
+    async def test_admin_action_streams_asynchronously_under_asgi(self):
+        admin_user = await sync_to_async(CustomUser.objects.create_superuser)('900000201', 'senha')
+        task = await sync_to_async(Task.objects.create)(user=admin_user, earnings=4)
+        await self.async_client.aforce_login(admin_user)
+
+        query = f'?shard={sharding.shard_for(admin_user.pk)}' if settings.DATABASE_SHARDS else ''
+        response = await self.async_client.post(f'/admin/core/task/{query}', {
+            'action': 'export_csv', '_selected_action': [task.pk],
+        })
+
+        # Um iterador síncrono seria lido por inteiro (list()) antes de enviar o primeiro byte.
+        self.assertTrue(response.is_async)
+        content = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(content.splitlines()[1].split(',')[:3], [str(task.pk), '900000201', '4.00'])
+
+    def test_command_writes_to_stdout(self):
+        user = CustomUser.objects.create_user('900000202', 'senha')
+        Deposit.objects.create(user=user, amount=30, proof_of_payment='deposit_proofs/a.gif')
+        stdout = StringIO()
+        call_command('export_csv', 'deposit', stdout=stdout)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(lines[0], 'id,user__phone_number,amount,is_approved,proof_of_payment,created_at')
+        self.assertEqual(lines[1].split(',')[1:4], ['900000202', '30.00', 'false'])
+
+
+class ExportFormatTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('900000210', 'senha', full_name='Ana, "A"')
+        CustomUser.objects.create_user('900000211', 'senha', full_name='')
+        Deposit.objects.create(user=self.user, amount=30, is_approved=True, proof_of_payment='deposit_proofs/a.gif')
+
+    def test_values_use_the_copy_format(self):
+        lines = ''.join(exports.stream_csv(CustomUser.objects.all(), exports.EXPORTS['user'][1]))
+        self.assertNotIn('\r', lines)
+        # Texto vazio e NULL saem iguais: campo vazio, sem aspas.
+        columns = lines.splitlines()[2].split(',')
+        self.assertEqual((columns[2], columns[4]), ('', ''))
+        header, row, _ = csv.reader(StringIO(lines))
+        values = dict(zip(header, row))
+        self.assertEqual(values['full_name'], 'Ana, "A"')
+        self.assertEqual(values['invited_by__phone_number'], '')
+        self.assertEqual((values['is_active'], values['is_staff']), ('true', 'false'))
+        self.assertEqual(
+            values['date_joined'],
+            self.user.date_joined.astimezone(dt_timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+        )
+
+    @skipUnless(connection.vendor == 'postgresql' and exports._copy_supported(connection), 'sem COPY (psycopg 3)')
+    def test_copy_and_iterator_write_the_same_csv(self):
+        for name in ('user', 'deposit', 'withdrawal'):
+            model, fields = exports.EXPORTS[name]
+            queryset = model.objects.order_by('pk')
+            copied = ''.join(exports._copy_rows(queryset, fields))
+            iterated = ''.join(exports._iterate_rows(queryset.values_list(*fields), exports._csv_writer()))
+            self.assertEqual(copied, iterated, name)
+
+
+class PayoutForecastTests(TestCase):
+    def test_schedule_stops_at_end_of_each_cycle_and_applies_what_if_gain(self):
+        level = Level.objects.create(name='N1', deposit_value=30, daily_gain=2, monthly_gain=60, cycle_days=10)
+        for index, days_ago in enumerate((0, 0, 7, 12)):
+            user = CustomUser.objects.create_user(f'90000030{index}', 'senha')
+            user_level = UserLevel.objects.create(user=user, level=level)
+            UserLevel.objects.filter(pk=user_level.pk).update(purchase_date=timezone.now() - timedelta(days=days_ago))
+
+        result = forecast.payout_forecast(horizon=30)
+        # Duas compras de hoje pagam 10 dias, a de há 7 dias mais 3; a de há 12 já terminou.
+        self.assertEqual([amount for day, amount in result['schedule'][:4]], [6, 6, 6, 4])
+        self.assertEqual(result['totals'][30], 2 * 2 * 10 + 2 * 3)
+
+        simulated = forecast.payout_forecast(horizon=30, daily_gains={level.id: Decimal('1')})
+        self.assertEqual(simulated['remaining_total'], 23)
+
+        stdout = StringIO()
+        call_command('forecast_payouts', '--horizon', '3', '--daily-gain', 'N1=1', '--schedule', stdout=stdout)
+        rows = list(csv.reader(StringIO(stdout.getvalue())))
+        self.assertEqual(rows[0], ['date', 'payout'])
+        self.assertEqual([row[1] for row in rows[1:]], ['3', '3', '3'])
+
+
+@override_settings(
+    TEAM_PAGE_SIZE=2,
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class TeamTabsTests(TestCase):
+    def setUp(self):
+        self.level = Level.objects.create(name='N1', deposit_value=30, daily_gain=1, monthly_gain=30, cycle_days=90)
+        self.inviter = CustomUser.objects.create_user('900000400', 'senha')
+        for index in range(5):
+            member = CustomUser.objects.create_user(f'90000041{index}', 'senha', invited_by=self.inviter)
+            if index < 3:
+                UserLevel.objects.create(user=member, level=self.level)
+        self.client.force_login(self.inviter)
+
+    def test_page_renders_counts_and_only_first_page_of_first_tab(self):
+        response = self.client.get('/equipa/')
+        self.assertEqual([(tab['tab'], tab['count']) for tab in response.context['levels_data']], [
+            ('nao-investido', 2), (str(self.level.pk), 3),
+        ])
+        self.assertContains(response, 'member-card', count=2)
+
+    def test_tab_endpoint_pages_through_members(self):
+        phones, cursor = [], None
+        while True:
+            params = {'tab': self.level.pk, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get('/equipa/membros/', params).json()
+            phones += re.findall(r'(9000004\d\d)', data['html'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(phones, ['900000412', '900000411', '900000410'])
+        self.assertEqual(self.client.get('/equipa/membros/', {'tab': 'x'}).status_code, 400)
+
+
+class StagedDepositProofTests(TestCase):
+    def setUp(self):
+        staging_root = tempfile.TemporaryDirectory()
+        self.addCleanup(staging_root.cleanup)
+        # InMemoryStorage faz de armazenamento remoto (Cloudinary em produção).
+        self.enterContext(override_settings(DEPOSIT_PROOF_STAGING=True, STORAGES={
+            **settings.STORAGES,
+            'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+            'staging': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': staging_root.name}},
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        }))
+        self.user = CustomUser.objects.create_user('900000500', 'senha')
+        self.client.force_login(self.user)
+
+    def post_deposit(self):
+        gif = b'GIF89a\x01\x00\x01\x00\x00\x00\x00!\xf9\x04\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x01\x00\x00'
+        return self.client.post('/deposito/', {
+            'amount': '30', 'proof_of_payment': SimpleUploadedFile('comprovativo.gif', gif, content_type='image/gif'),
+        })
+
+    def test_proof_is_staged_then_transferred_by_job(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.post_deposit()
+        deposit = Deposit.objects.get(user=self.user)
+        self.assertTrue(deposit.proof_staged)
+        self.assertTrue(storages['staging'].exists(deposit.proof_of_payment.name))
+        self.assertFalse(storages['default'].exists(deposit.proof_of_payment.name))
+        staged_name = deposit.proof_of_payment.name
+
+        for callback in callbacks:
+            callback()
+
+        deposit.refresh_from_db()
+        self.assertFalse(deposit.proof_staged)
+        self.assertTrue(storages['default'].exists(deposit.proof_of_payment.name))
+        self.assertFalse(storages['staging'].exists(staged_name))
+        self.assertEqual(Job.objects.get(name='transfer_deposit_proof').status, Job.STATUS_DONE)
+
+    def test_staged_file_is_removed_when_the_deposit_is_not_saved(self):
+        deposit = Deposit(user=self.user, amount='inválido')
+        with self.assertRaises(ValidationError):
+            uploads.stage_deposit_proof(deposit, SimpleUploadedFile('comprovativo.gif', b'GIF89a'))
+        self.assertFalse(Deposit.objects.exists())
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(storages['staging'].listdir('deposit_proofs'), ([], []))
+
+
+@override_settings(STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}})
+class ActiveLevelTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.level = Level.objects.create(name='N1', deposit_value=30, daily_gain=2, monthly_gain=60, cycle_days=90)
+        self.user = CustomUser.objects.create_user('900000600', 'senha', available_balance=30)
+
+    def test_purchase_and_deactivation_keep_active_level_in_sync(self):
+        self.client.force_login(self.user)
+        self.client.post('/nivel/', {'level_id': self.level.pk})
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.active_level, self.user.level_active), (self.level, True))
+
+        user_level = UserLevel.objects.get(user=self.user)
+        user_level.is_active = False
+        user_level.save()
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.active_level, self.user.level_active), (None, False))
+
+    def test_signup_and_login_work_with_both_backends(self):
+        response = self.client.post('/cadastro/', {
+            'phone_number': '900000601', 'password': 'senha-longa-1', 'confirm_password': 'senha-longa-1',
+        })
+        self.assertRedirects(response, '/menu/', fetch_redirect_response=False)
+        self.client.logout()
+        response = self.client.post('/login/', {'username': '900000601', 'password': 'errada'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post('/login/', {'username': '900000601', 'password': 'senha-longa-1'})
+        self.assertRedirects(response, '/menu/', fetch_redirect_response=False)
+
+    def test_task_pages_do_not_query_user_levels(self):
+        UserLevel.objects.create(user=self.user, level=self.level)
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/tarefa/')
+            response = self.client.post('/process_task/')
+
+        self.assertEqual(response.json()['daily_gain'], '2.00')
+        self.assertFalse([query for query in queries if 'core_userlevel' in query['sql']])
+        self.assertFalse([query for query in queries if query['sql'].startswith('SELECT') and 'FROM "core_level"' in query['sql']])
+
+    def test_balance_views_do_not_overwrite_a_concurrent_deactivation(self):
+        UserLevel.objects.create(user=self.user, level=self.level)
+        stale_user = CustomUser.objects.get(pk=self.user.pk)
+        stale_user.roulette_spins = 1
+        CustomUser.objects.filter(pk=self.user.pk).update(roulette_spins=1)
+        # Desativado (pelo admin, noutro pedido) depois de o usuário ter sido carregado.
+        user_level = UserLevel.objects.get(user=self.user)
+        user_level.is_active = False
+        user_level.save()
+
+        for view in (views.process_task, views.spin_roulette):
+            request = RequestFactory().post('/')
+            request.user = stale_user
+            self.assertTrue(json.loads(view(request).content)['success'])
+
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.active_level, self.user.level_active), (None, False))
+        self.assertEqual(self.user.roulette_spins, 0)
+        self.assertEqual(self.user.available_balance, stale_user.available_balance)
+
+
+@override_settings(DATABASE_SHARDS=['shard_0', 'shard_1'])
+class ShardRouterTests(SimpleTestCase):
+    def test_rows_follow_the_user_hash(self):
+        router = ShardRouter()
+        shards = {sharding.shard_for(user_id) for user_id in range(1, 50)}
+        self.assertEqual(shards, {'shard_0', 'shard_1'})
+        self.assertEqual(sharding.shard_for(7), sharding.shard_for(7))
+
+        task = Task(user_id=7)
+        self.assertEqual(router.db_for_write(Task, instance=task), sharding.shard_for(7))
+        self.assertEqual(router.db_for_read(Roulette, instance=CustomUser(pk=7)), sharding.shard_for(7))
+        self.assertIsNone(router.db_for_read(Task))
+        self.assertIsNone(router.db_for_write(CustomUser, instance=task))
+        self.assertFalse(router.allow_migrate('shard_0', 'core', 'customuser'))
+        self.assertTrue(router.allow_migrate('shard_1', 'core', 'task'))
+        self.assertFalse(router.allow_migrate('default', 'core', 'roulette'))
+        self.assertIsNone(router.allow_migrate('default', 'core', 'customuser'))
+
+    def test_merge_totals_adds_per_shard_results(self):
+        merged = sharding.merge_totals([
+            {'a': {'total': Decimal('1')}, 'b': None},
+            {'a': {'total': Decimal('2')}, 'b': 3},
+        ])
+        self.assertEqual(merged, {'a': {'total': Decimal('3')}, 'b': 3})
+
+
+# Corre com várias bases SQLite locais, p.ex.:
+# SHARD_DATABASE_URLS=sqlite:////tmp/shard0.sqlite3,sqlite:////tmp/shard1.sqlite3 manage.py test
+@skipUnless(settings.DATABASE_SHARDS, 'sem SHARD_DATABASE_URLS')
+@override_settings(STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}})
+class ShardedStorageTests(TestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.level = Level.objects.create(name='N1', deposit_value=30, daily_gain=2, monthly_gain=60, cycle_days=90)
+        self.users = [CustomUser.objects.create_user(f'90000070{i}', 'senha') for i in range(6)]
+        for user in self.users:
+            UserLevel.objects.create(user=user, level=self.level)
+
+    def test_task_rows_live_on_the_user_shard_and_reports_fan_out(self):
+        for user in self.users:
+            self.client.force_login(user)
+            self.assertTrue(self.client.post('/process_task/').json()['success'])
+            self.assertEqual(Task.objects.for_user(user).count(), 1)
+            self.assertEqual(Task.objects.using(sharding.shard_for(user.pk)).filter(user=user).count(), 1)
+        self.assertNotIn(Task._meta.db_table, connections['default'].introspection.table_names())
+        self.assertEqual(Task.objects.aggregate_shards(total=Sum('earnings'))['total'], Decimal('12'))
+
+        lines = ''.join(exports.stream_csv(Task.objects.all(), exports.EXPORTS['task'][1])).splitlines()
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(sorted(line.split(',')[1] for line in lines[1:]), [user.phone_number for user in self.users])
+
+        self.users[0].delete()
+        self.assertEqual(Task.objects.aggregate_shards(count=Count('id'))['count'], 5)
+
+
+@override_settings(EVENT_BUS='memory', EVENTS_KEEPALIVE_SECONDS=5)
+class EventStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('900000800', 'senha', available_balance=10)
+
+    def credit(self, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.available_balance += amount
+            self.user.save()
+
+    async def test_stream_sends_current_state_then_published_events(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/api/events/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = aiter(response.streaming_content)
+
+        first = (await anext(chunks)).decode()
+        self.assertIn('event: balance', first)
+        self.assertIn('"available_balance": "10.00"', first)
+
+        await sync_to_async(self.credit)(5)
+        self.assertIn(b'"available_balance": "15.00"', await anext(chunks))
+
+        # Cliente desligado: o gerador é finalizado e a ligação sai do bus.
+        await chunks.aclose()
+        del chunks, response
+        gc.collect()
+        await asyncio.sleep(0.01)
+        self.assertNotIn(self.user.pk, events._subscribers)
+
+    def test_requires_asgi(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/api/events/').status_code, 501)
+
+
+@override_settings(STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}})
+class AdminSearchTests(TestCase):
+    def setUp(self):
+        self.admin_user = CustomUser.objects.create_superuser('900000900', 'senha')
+        self.user = CustomUser.objects.create_user('+244 923-000-111', 'senha', invite_code='ab12cd34')
+        CustomUser.objects.create_user('244 800 923 000', 'senha')
+        self.deposit = Deposit.objects.create(user=self.user, amount=30, proof_of_payment='deposit_proofs/x.png')
+        self.client.force_login(self.admin_user)
+
+    def search(self, url, term):
+        response = self.client.get(url, {'q': term})
+        return list(response.context['cl'].result_list)
+
+    def test_phone_and_invite_code_match_by_prefix_or_exactly(self):
+        self.assertEqual(self.user.phone_digits, '244923000111')
+        self.assertEqual(self.search('/admin/core/customuser/', '244 923'), [self.user])
+        self.assertEqual(self.search('/admin/core/customuser/', '=244923000111'), [self.user])
+        self.assertEqual(self.search('/admin/core/customuser/', '=244923'), [])
+        self.assertEqual(self.search('/admin/core/customuser/', 'AB12'), [self.user])
+        self.assertEqual(self.search('/admin/core/deposit/', '+244923'), [self.deposit])
+
+    def test_search_does_not_use_substring_like_outside_postgresql(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search('/admin/core/deposit/', '923')
+        searches = [query['sql'] for query in queries if 'phone_digits' in query['sql']]
+        self.assertTrue(searches)
+        self.assertFalse([sql for sql in searches if "LIKE '%923" in sql or '%%923' in sql])
@@ -0,0 +1,57 @@
+from django.core.files.storage import storages
+from django.db import transaction
+
+from .jobs import enqueue
+from .models import Deposit
+
+
+def staging_storage():
+    return storages['staging']
+
+
+def stage_deposit_proof(deposit, uploaded_file):
+    """
+    Grava o comprovativo no armazenamento 'staging', guarda o depósito e agenda a
+    transferência para o armazenamento definitivo. O pedido não espera pelo
+    upload remoto. Se o depósito não for gravado, o ficheiro em espera é
+    apagado.
+    """
+    field = deposit._meta.get_field('proof_of_payment')
+    storage = staging_storage()
+    staged_name = storage.save(field.generate_filename(deposit, uploaded_file.name), uploaded_file)
+
+    try:
+        with transaction.atomic():
+            # Atribuir o nome (e não o ficheiro) evita que save() envie o upload ao 'default'.
+            deposit.proof_of_payment = staged_name
+            deposit.proof_staged = True
+            deposit.save()
+            enqueue('transfer_deposit_proof', {'deposit_id': deposit.pk})
+    except Exception:
+        storage.delete(staged_name)
+        deposit.proof_of_payment = None
+        deposit.proof_staged = False
+        raise
+    return deposit
+
+
+def transfer_deposit_proof(deposit_id):
+    """
+    Envia o comprovativo em espera para o armazenamento do campo e troca a
+    referência no depósito. Uma falha deixa tudo como estava, para o job
+    tentar de novo.
+    """
+    deposit = Deposit.objects.filter(pk=deposit_id, proof_staged=True).only('proof_of_payment').first()
+    if deposit is None:
+        return
+    staged_name = deposit.proof_of_payment.name
+    storage = staging_storage()
+
+    with storage.open(staged_name, 'rb') as staged_file:
+        final_name = deposit.proof_of_payment.storage.save(staged_name, staged_file)
+
+    # Só troca se ninguém mudou o comprovativo entretanto.
+    Deposit.objects.filter(pk=deposit_id, proof_staged=True, proof_of_payment=staged_name).update(
+        proof_of_payment=final_name, proof_staged=False,
+    )
+    storage.delete(staged_name)
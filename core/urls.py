@@ -14,17 +14,28 @@ urlpatterns = [
     path('cadastro/', views.cadastro, name='cadastro'),
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
+    path('csrf/', views.csrf_token, name='csrf_token'),
+    path('ratelimit/stats/', views.ratelimit_stats, name='ratelimit_stats'),
     path('deposito/', views.deposito, name='deposito'),
     path('saque/', views.saque, name='saque'),
+    path('saque/historico/', views.withdrawal_history, name='withdrawal_history'),
     path('tarefa/', views.tarefa, name='tarefa'),
     path('process_task/', views.process_task, name='process_task'),
     path('nivel/', views.nivel, name='nivel'),
     path('equipa/', views.equipa, name='equipa'),
+    path('equipa/membros/', views.equipa_membros, name='equipa_membros'),
     path('roleta/', views.roleta, name='roleta'),
     path('spin-roulette/', views.spin_roulette, name='spin_roulette'),
     path('sobre/', views.sobre, name='sobre'),
     path('perfil/', views.perfil, name='perfil'),
     path('renda/', views.renda, name='renda'),
+
+    # API JSON (leitura) para atualizar o painel sem recarregar páginas
+    path('api/balance/', views.api_balance, name='api_balance'),
+    path('api/active-level/', views.api_active_level, name='api_active_level'),
+    path('api/team/', views.api_team, name='api_team'),
+    path('api/levels/', views.api_levels, name='api_levels'),
+    path('api/events/', views.event_stream, name='event_stream'),
     
     # URLs para alteração de senha
     path('change_password/', auth_views.PasswordChangeView.as_view(
@@ -3,15 +3,36 @@ from django.contrib.auth import login, authenticate, logout, update_session_auth
 from django.contrib.auth.forms import AuthenticationForm, PasswordChangeForm
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Sum
 from django.urls import reverse
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.http import condition, require_POST
+import asyncio
+import json
 import random
+from functools import wraps
 from datetime import date
 
+from . import events
+from .cache import SETTINGS_VERSION_KEY, get_versions
+from .etags import (
+    active_level_etag, balance_etag, is_anonymous_shell_request, levels_etag, page_etag, team_etag,
+)
 from .forms import RegisterForm, DepositForm, WithdrawalForm, BankDetailsForm
-from .models import PlatformSettings, CustomUser, Level, UserLevel, BankDetails, Deposit, Withdrawal, Task, PlatformBankDetails, Roulette, RouletteSettings
+from .models import PlatformSettings, CustomUser, Level, UserLevel, BankDetails, Deposit, Withdrawal, Task, PlatformBankDetails, Roulette, RouletteSettings, ArchivedUserTotals
+from .pagination import InvalidCursor, keyset_page
+from .ratelimit import rejected_counts
+from .referrals import pay_referral_commissions
+from .uploads import stage_deposit_proof
 
 # --- FUNÇÃO ATUALIZADA ---
 def home(request):
@@ -21,12 +42,13 @@ def home(request):
         return redirect('cadastro')
 # --- FIM DA FUNÇÃO ATUALIZADA ---
 
+@condition(etag_func=page_etag)
 def menu(request):
     user_level = None
     levels = Level.objects.all().order_by('deposit_value')
 
     if request.user.is_authenticated:
-        user_level = UserLevel.objects.filter(user=request.user, is_active=True).first()
+        user_level = request.user.active_level
 
     try:
         platform_settings = PlatformSettings.objects.first()
@@ -41,7 +63,40 @@ def menu(request):
     }
     return render(request, 'menu.html', context)
 
+def _render_anonymous_shell(template_name, form):
+    """
+    Página de login/cadastro para visitantes anónimos, igual para todos e
+    guardada na cache partilhada. O código de convite e o token CSRF são
+    preenchidos no navegador (static/js/shell.js).
+    """
+    settings_version, = get_versions(SETTINGS_VERSION_KEY)
+    cache_key = f'shell:{template_name}:{settings.RELEASE_VERSION}:{settings_version}'
+    content = cache.get(cache_key)
+    if content is None:
+        try:
+            whatsapp_link = PlatformSettings.objects.first().whatsapp_link
+        except (PlatformSettings.DoesNotExist, AttributeError):
+            whatsapp_link = '#'
+        content = render_to_string(template_name, {
+            'form': form,
+            'whatsapp_link': whatsapp_link,
+            'page_shell': True,
+        })
+        cache.set(cache_key, content, settings.ANONYMOUS_SHELL_CACHE_TIMEOUT)
+
+    response = HttpResponse(content)
+    patch_cache_control(response, public=True, max_age=settings.ANONYMOUS_SHELL_MAX_AGE)
+    return response
+
+@never_cache
+def csrf_token(request):
+    return JsonResponse({'csrfToken': get_token(request)})
+
+@condition(etag_func=page_etag)
 def cadastro(request):
+    if is_anonymous_shell_request(request):
+        return _render_anonymous_shell('cadastro.html', RegisterForm())
+
     invite_code_from_url = request.GET.get('invite', None)
 
     if request.method == 'POST':
@@ -62,7 +117,7 @@ def cadastro(request):
                     return render(request, 'cadastro.html', {'form': form})
             
             user.save()
-            login(request, user)
+            login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
             return redirect('menu')
         else:
             try:
@@ -84,7 +139,11 @@ def cadastro(request):
 
     return render(request, 'cadastro.html', {'form': form, 'whatsapp_link': whatsapp_link})
 
+@condition(etag_func=page_etag)
 def user_login(request):
+    if is_anonymous_shell_request(request):
+        return _render_anonymous_shell('login.html', AuthenticationForm())
+
     if request.method == 'POST':
         form = AuthenticationForm(request, data=request.POST)
         if form.is_valid():
@@ -101,6 +160,12 @@ def user_login(request):
 
     return render(request, 'login.html', {'form': form, 'whatsapp_link': whatsapp_link})
 
+@login_required
+def ratelimit_stats(request):
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'message': 'Você não tem permissão para realizar esta ação.'}, status=403)
+    return JsonResponse({'success': True, 'rejected': rejected_counts()})
+
 @login_required
 def user_logout(request):
     logout(request)
@@ -124,7 +189,11 @@ def deposito(request):
         if form.is_valid():
             deposit = form.save(commit=False)
             deposit.user = request.user
-            deposit.save()
+            if settings.DEPOSIT_PROOF_STAGING:
+                # Upload remoto em segundo plano (core/uploads.py).
+                stage_deposit_proof(deposit, form.cleaned_data['proof_of_payment'])
+            else:
+                deposit.save()
             
             # Não exibe mensagem aqui, mas sim no template
             # O template irá exibir uma tela de sucesso após a submissão
@@ -159,18 +228,23 @@ def approve_deposit(request, deposit_id):
     deposit = get_object_or_404(Deposit, id=deposit_id)
     if not deposit.is_approved:
         deposit.is_approved = True
-        deposit.save()
+        deposit.save(update_fields=['is_approved'])
         deposit.user.available_balance += deposit.amount
-        deposit.user.save()
+        deposit.user.save(update_fields=['available_balance'])
         messages.success(request, f'Depósito de {deposit.amount} $ aprovado para {deposit.user.phone_number}. Saldo atualizado.')
     
     return redirect('renda')
 
+def _withdrawal_page(user, cursor=None):
+    # Só as colunas mostradas no histórico, paginadas por (created_at, id).
+    withdrawals = Withdrawal.objects.filter(user=user).only('id', 'amount', 'status', 'created_at')
+    return keyset_page(withdrawals, 'created_at', cursor, settings.WITHDRAWAL_HISTORY_PAGE_SIZE)
+
 @login_required
 def saque(request):
     withdrawal_instruction = PlatformSettings.objects.first().withdrawal_instruction if PlatformSettings.objects.first() else 'Instruções de saque não disponíveis.'
     
-    withdrawal_records = Withdrawal.objects.filter(user=request.user).order_by('-created_at')
+    withdrawal_records, next_cursor = _withdrawal_page(request.user)
     
     has_bank_details = BankDetails.objects.filter(user=request.user).exists()
     
@@ -189,7 +263,7 @@ def saque(request):
             else:
                 withdrawal = Withdrawal.objects.create(user=request.user, amount=amount)
                 request.user.available_balance -= amount
-                request.user.save()
+                request.user.save(update_fields=['available_balance'])
                 messages.success(request, 'Saque solicitado com sucesso. Aguarde a aprovação.')
                 return redirect('saque')
     else:
@@ -198,17 +272,28 @@ def saque(request):
     context = {
         'withdrawal_instruction': withdrawal_instruction,
         'withdrawal_records': withdrawal_records,
+        'next_cursor': next_cursor,
         'form': form,
         'has_bank_details': has_bank_details
     }
     return render(request, 'saque.html', context)
 
+@login_required
+def withdrawal_history(request):
+    # "Carregar mais" do histórico de saques: devolve o HTML da página seguinte.
+    try:
+        withdrawal_records, next_cursor = _withdrawal_page(request.user, request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'success': False, 'message': 'Cursor inválido.'}, status=400)
+    html = render_to_string('partials/withdrawal_records.html', {'withdrawal_records': withdrawal_records})
+    return JsonResponse({'success': True, 'html': html, 'next_cursor': next_cursor})
+
 @login_required
 def tarefa(request):
     user = request.user
     
-    # Encontra o nível ativo do usuário
-    active_level = UserLevel.objects.filter(user=user, is_active=True).first()
+    # Nível ativo do usuário (CustomUser.active_level, carregado com o usuário)
+    active_level = user.active_level
     has_active_level = active_level is not None
     
     # Define o número de tarefas
@@ -217,7 +302,7 @@ def tarefa(request):
     
     if has_active_level:
         today = date.today()
-        tasks_completed_today = Task.objects.filter(user=user, completed_at__date=today).count()
+        tasks_completed_today = Task.objects.for_user(user).filter(completed_at__date=today).count()
     
     context = {
         'has_active_level': has_active_level,
@@ -231,29 +316,33 @@ def tarefa(request):
 @require_POST
 def process_task(request):
     user = request.user
-    active_level = UserLevel.objects.filter(user=user, is_active=True).first()
+    active_level = user.active_level
 
     if not active_level:
         return JsonResponse({'success': False, 'message': 'Você não tem um nível ativo para realizar tarefas.'})
 
     today = date.today()
-    tasks_completed_today = Task.objects.filter(user=user, completed_at__date=today).count()
+    tasks_completed_today = Task.objects.for_user(user).filter(completed_at__date=today).count()
     max_tasks = 1
 
     if tasks_completed_today >= max_tasks:
         return JsonResponse({'success': False, 'message': 'Você já concluiu todas as tarefas diárias.'})
 
-    earnings = active_level.level.daily_gain
+    earnings = active_level.daily_gain
     Task.objects.create(user=user, earnings=earnings)
     user.available_balance += earnings
-    user.save()
+    user.save(update_fields=['available_balance'])
 
     return JsonResponse({'success': True, 'daily_gain': earnings})
 
 @login_required
+@condition(etag_func=page_etag)
 def nivel(request):
     levels = Level.objects.all().order_by('deposit_value')
-    user_levels = UserLevel.objects.filter(user=request.user, is_active=True).values_list('level__id', flat=True)
+    # Sem nível ativo (CustomUser.active_level) não há compras ativas a consultar.
+    user_levels = []
+    if request.user.active_level_id is not None:
+        user_levels = list(UserLevel.objects.filter(user=request.user, is_active=True).values_list('level_id', flat=True))
     
     if request.method == 'POST':
         level_id = request.POST.get('level_id')
@@ -264,17 +353,19 @@ def nivel(request):
             return redirect('nivel')
         
         if request.user.available_balance >= level_to_buy.deposit_value:
-            request.user.available_balance -= level_to_buy.deposit_value
-            UserLevel.objects.create(user=request.user, level=level_to_buy, is_active=True)
-            request.user.level_active = True
-            request.user.save()
-            
-            invited_by_user = request.user.invited_by
-            if invited_by_user and UserLevel.objects.filter(user=invited_by_user, is_active=True).exists():
-                invited_by_user.subsidy_balance += 11
-                invited_by_user.available_balance += 11
-                invited_by_user.save()
-                messages.success(request, f'Parabéns! Você recebeu 11 $ de subsídio por convite de {request.user.phone_number}.')
+            with transaction.atomic():
+                request.user.available_balance -= level_to_buy.deposit_value
+                UserLevel.objects.create(user=request.user, level=level_to_buy, is_active=True)
+                # O sinal de UserLevel já atualizou a base de dados; o save() abaixo
+                # não pode repor o valor antigo que está em memória.
+                if request.user.active_level_id is None:
+                    request.user.active_level = level_to_buy
+                request.user.level_active = True
+                request.user.save(update_fields=['available_balance', 'active_level', 'level_active'])
+
+                # Comissões da rede de convites (core/referrals.py), na mesma transação.
+                if request.user.invited_by_id:
+                    pay_referral_commissions(request.user, level_to_buy)
 
             messages.success(request, f'Você comprou o nível {level_to_buy.name} com sucesso!')
         else:
@@ -288,60 +379,71 @@ def nivel(request):
     }
     return render(request, 'nivel.html', context)
 
+NON_INVESTED_TAB = 'nao-investido'
+
+def _team_counts(user):
+    """Contagens da equipa (convidados diretos) em consultas agregadas."""
+    team_members = CustomUser.objects.filter(invited_by=user)
+    team_count = team_members.count()
+    investors = team_members.filter(userlevel__is_active=True).distinct().count()
+    counts_by_level = dict(
+        UserLevel.objects.filter(user__invited_by=user, is_active=True)
+        .values_list('level_id')
+        .annotate(count=Count('user', distinct=True))
+    )
+    return team_count, investors, counts_by_level
+
+def _team_tab_members(user, tab):
+    """Membros de uma aba da equipa: sem nível ativo, ou com o nível `tab` (id) ativo."""
+    team_members = CustomUser.objects.filter(invited_by=user).only('id', 'phone_number', 'date_joined')
+    if tab == NON_INVESTED_TAB:
+        return team_members.exclude(Exists(UserLevel.objects.filter(user=OuterRef('pk'), is_active=True)))
+    return team_members.filter(Exists(UserLevel.objects.filter(user=OuterRef('pk'), level_id=int(tab), is_active=True)))
+
+def _team_page(user, tab, cursor=None):
+    return keyset_page(_team_tab_members(user, tab), 'date_joined', cursor, settings.TEAM_PAGE_SIZE)
+
 @login_required
 def equipa(request):
     user = request.user
 
-    # 1. Encontra todos os membros da equipe (convidados diretos)
-    team_members = CustomUser.objects.filter(invited_by=user).order_by('-date_joined')
-    team_count = team_members.count()
+    # Só as contagens e a primeira página da primeira aba; as outras abas
+    # carregam a pedido (equipa_membros).
+    team_count, total_investors, counts_by_level = _team_counts(user)
+    total_non_investors = team_count - total_investors
 
-    # 2. Obtém todos os Níveis disponíveis
-    all_levels = Level.objects.all().order_by('deposit_value')
+    levels_data = [{'name': 'Não Investido', 'tab': NON_INVESTED_TAB, 'count': total_non_investors}]
+    for level in Level.objects.all().order_by('deposit_value'):
+        levels_data.append({'name': level.name, 'tab': str(level.id), 'count': counts_by_level.get(level.id, 0)})
 
-    # 3. Contabilização por Nível de Investimento
-    levels_data = []
-    total_investors = 0
-    
-    # Dicionário para armazenar membros por nível (para exibição no template)
-    members_by_level = {} 
-    
-    # Preenche os dados para cada nível
-    for level in all_levels:
-        # Filtra membros da equipe que possuem este nível ATIVO
-        members_with_level = team_members.filter(userlevel__level=level, userlevel__is_active=True).distinct()
-        
-        levels_data.append({
-            'name': level.name,
-            'count': members_with_level.count(),
-            'members': members_with_level, 
-        })
-        members_by_level[level.name] = members_with_level
-        total_investors += members_with_level.count()
-
-    # 4. Contabilização de Não Investidores GERAL
-    # Membros que NÃO têm NENHUM UserLevel ativo
-    non_invested_members = team_members.exclude(userlevel__is_active=True)
-    total_non_investors = non_invested_members.count()
-    
-    # Adiciona a contagem de não investidos na estrutura levels_data para a primeira aba
-    levels_data.insert(0, {
-        'name': 'Não Investido',
-        'count': total_non_investors,
-        'members': non_invested_members,
-    })
+    first_tab = levels_data[0]
+    first_tab['members'], first_tab['next_cursor'] = _team_page(user, first_tab['tab'])
 
     context = {
-        'team_members': team_members, # Membros totais
         'team_count': team_count, # Contagem total de membros
         'invite_link': request.build_absolute_uri(reverse('cadastro')) + f'?invite={user.invite_code}',
-        'levels_data': levels_data, # Dados detalhados por nível (para as abas)
+        'levels_data': levels_data, # Abas por nível (só a primeira com membros)
         'total_investors': total_investors, # Contagem de investidores
         'total_non_investors': total_non_investors, # Contagem de não investidores
         'subsidy_balance': user.subsidy_balance, # Saldo de Subsídios
     }
     return render(request, 'equipa.html', context)
 
+@login_required
+def equipa_membros(request):
+    # Uma página de membros de uma aba da equipa, em HTML pronto a inserir.
+    tab = request.GET.get('tab', '')
+    if tab != NON_INVESTED_TAB and not tab.isdigit():
+        return JsonResponse({'success': False, 'message': 'Aba inválida.'}, status=400)
+    try:
+        members, next_cursor = _team_page(request.user, tab, request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'success': False, 'message': 'Cursor inválido.'}, status=400)
+    html = render_to_string('partials/team_members.html', {
+        'members': members, 'not_invested': tab == NON_INVESTED_TAB,
+    })
+    return JsonResponse({'success': True, 'html': html, 'next_cursor': next_cursor})
+
 @login_required
 def roleta(request):
     user = request.user
@@ -361,7 +463,7 @@ def spin_roulette(request):
         return JsonResponse({'success': False, 'message': 'Você não tem giros disponíveis para a roleta.'})
 
     user.roulette_spins -= 1
-    user.save()
+    user.save(update_fields=['roulette_spins'])
     
     try:
         roulette_settings = RouletteSettings.objects.first()
@@ -387,11 +489,12 @@ def spin_roulette(request):
 
     user.subsidy_balance += prize
     user.available_balance += prize
-    user.save()
+    user.save(update_fields=['subsidy_balance', 'available_balance'])
 
-    return JsonResponse({'success': True, 'prize': prize, 'message': f'Parabéns! Você ganhou {prize} $.'})
+    return JsonResponse({'success': True, 'prize': prize, 'roulette_spins': user.roulette_spins, 'message': f'Parabéns! Você ganhou {prize} $.'})
 
 @login_required
+@condition(etag_func=page_etag)
 def sobre(request):
     try:
         platform_settings = PlatformSettings.objects.first()
@@ -404,7 +507,6 @@ def sobre(request):
 @login_required
 def perfil(request):
     bank_details, created = BankDetails.objects.get_or_create(user=request.user)
-    user_levels = UserLevel.objects.filter(user=request.user, is_active=True)
 
     if request.method == 'POST':
         form = BankDetailsForm(request.POST, instance=bank_details)
@@ -433,25 +535,32 @@ def perfil(request):
     context = {
         'form': form,
         'password_form': password_form,
-        'user_levels': user_levels,
     }
     return render(request, 'perfil.html', context)
 
+def _archived_task_earnings(user):
+    # Tarefas antigas saem da tabela Task (manage.py archive_history) e ficam somadas aqui.
+    return ArchivedUserTotals.objects.filter(user=user).values_list('tasks_earnings', flat=True).first() or 0
+
 @login_required
 def renda(request):
     user = request.user
     
-    active_level = UserLevel.objects.filter(user=user, is_active=True).first()
+    active_level = user.active_level
 
     approved_deposit_total = Deposit.objects.filter(user=user, is_approved=True).aggregate(Sum('amount'))['amount__sum'] or 0
     
     today = date.today()
-    daily_income = Task.objects.filter(user=user, completed_at__date=today).aggregate(Sum('earnings'))['earnings__sum'] or 0
+    daily_income = Task.objects.for_user(user).filter(completed_at__date=today).aggregate(Sum('earnings'))['earnings__sum'] or 0
 
     # A linha abaixo foi alterada para corrigir o status para 'Aprovado'
     total_withdrawals = Withdrawal.objects.filter(user=user, status='Aprovado').aggregate(Sum('amount'))['amount__sum'] or 0
 
-    total_income = (Task.objects.filter(user=user).aggregate(Sum('earnings'))['earnings__sum'] or 0) + user.subsidy_balance
+    total_income = (
+        (Task.objects.for_user(user).aggregate(Sum('earnings'))['earnings__sum'] or 0)
+        + _archived_task_earnings(user)
+        + user.subsidy_balance
+    )
     
     context = {
         'user': user,
@@ -462,4 +571,117 @@ def renda(request):
         'total_income': total_income,
     }
     return render(request, 'renda.html', context)
-    
\ No newline at end of file
+
+# --- API JSON (leitura) ---
+# Endpoints compactos para o cliente atualizar saldos sem recarregar páginas.
+# Enviam ETag e Cache-Control; um poll sem alterações recebe 304.
+
+def api_login_required(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'success': False, 'message': 'Autenticação necessária.'}, status=401)
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+def _level_data(level):
+    return {
+        'id': level.id,
+        'name': level.name,
+        'deposit_value': level.deposit_value,
+        'daily_gain': level.daily_gain,
+        'monthly_gain': level.monthly_gain,
+        'cycle_days': level.cycle_days,
+    }
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=balance_etag)
+@api_login_required
+def api_balance(request):
+    user = request.user
+    today = date.today()
+    task_totals = Task.objects.for_user(user).aggregate(
+        total=Sum('earnings'),
+        today=Sum('earnings', filter=Q(completed_at__date=today)),
+    )
+    return JsonResponse({
+        'available_balance': user.available_balance,
+        'subsidy_balance': user.subsidy_balance,
+        'roulette_spins': user.roulette_spins,
+        'daily_income': task_totals['today'] or 0,
+        'total_income': (task_totals['total'] or 0) + _archived_task_earnings(user) + user.subsidy_balance,
+        'approved_deposit_total': Deposit.objects.filter(user=user, is_approved=True).aggregate(Sum('amount'))['amount__sum'] or 0,
+        'total_withdrawals': Withdrawal.objects.filter(user=user, status='Aprovado').aggregate(Sum('amount'))['amount__sum'] or 0,
+    })
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=active_level_etag)
+@api_login_required
+def api_active_level(request):
+    active_level = UserLevel.objects.filter(user=request.user, is_active=True).select_related('level').first()
+    if active_level is None:
+        return JsonResponse({'active_level': None})
+    return JsonResponse({
+        'active_level': {
+            **_level_data(active_level.level),
+            'purchase_date': active_level.purchase_date,
+        },
+    })
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=team_etag)
+@api_login_required
+def api_team(request):
+    team_count, investors, counts_by_level = _team_counts(request.user)
+    return JsonResponse({
+        'team_count': team_count,
+        'total_investors': investors,
+        'total_non_investors': team_count - investors,
+        'levels': [
+            {'name': name, 'count': counts_by_level.get(level_id, 0)}
+            for level_id, name in Level.objects.order_by('deposit_value').values_list('id', 'name')
+        ],
+    })
+
+@cache_control(public=True, max_age=60)
+@condition(etag_func=levels_etag)
+def api_levels(request):
+    levels = Level.objects.all().order_by('deposit_value')
+    return JsonResponse({'levels': [_level_data(level) for level in levels]})
+
+# --- EVENTOS EM DIRETO (SERVER-SENT EVENTS) ---
+# Uma ligação por página aberta recebe saldo, giros e depósitos aprovados
+# (core/events.py) em vez de recarregar páginas. Só serve sob ASGI
+# (GUNICORN_WORKER_CLASS=uvicorn): num worker WSGI prenderia uma thread.
+
+def _sse(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n'
+
+async def event_stream(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'success': False, 'message': 'Autenticação necessária.'}, status=401)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'success': False, 'message': 'Eventos em direto indisponíveis neste servidor.'}, status=501)
+
+    async def stream():
+        queue = events.subscribe(user.pk)
+        try:
+            # O estado atual primeiro: cobre o que se perdeu entre ligações.
+            yield 'retry: 5000\n\n' + _sse('balance', events.balance_state(user))
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), settings.EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comentário SSE: mantém a ligação viva através de proxies.
+                    yield ': keepalive\n\n'
+                    continue
+                yield _sse(message['event'], message['data'])
+        finally:
+            events.unsubscribe(user.pk, queue)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Nginx e afins não devem acumular a resposta.
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,23 @@
+from django.template import engines
+from django.template.exceptions import TemplateDoesNotExist
+
+from .cache import LEVELS_VERSION_KEY, SETTINGS_VERSION_KEY, get_versions
+
+# Templates compilados no arranque de cada worker, para que o primeiro
+# pedido não pague a leitura e compilação.
+WARM_TEMPLATES = (
+    'base.html', 'menu.html', 'cadastro.html', 'login.html', 'deposito.html', 'saque.html',
+    'tarefa.html', 'nivel.html', 'equipa.html', 'roleta.html', 'sobre.html', 'perfil.html',
+    'renda.html',
+)
+
+
+def warm_caches():
+    """Pré-carrega templates e versões de cache num worker acabado de arrancar."""
+    engine = engines['django']
+    for name in WARM_TEMPLATES:
+        try:
+            engine.get_template(name)
+        except TemplateDoesNotExist:
+            pass
+    get_versions(SETTINGS_VERSION_KEY, LEVELS_VERSION_KEY)
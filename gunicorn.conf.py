@@ -0,0 +1,97 @@
+"""
+Configuração do gunicorn, lida a partir de variáveis de ambiente.
+
+    GUNICORN_WORKER_CLASS   sync | gthread | uvicorn   (padrão: uvicorn)
+    WEB_CONCURRENCY         número de workers          (padrão: 2 x CPUs + 1, máx. 5)
+    GUNICORN_THREADS        threads por worker gthread (padrão: 4)
+    GUNICORN_TIMEOUT        segundos                   (padrão: 30)
+    GUNICORN_PRELOAD        carrega a app no master    (padrão: 1)
+    GUNICORN_MAX_REQUESTS   recicla o worker após N pedidos (padrão: 1000, 0 desliga)
+
+Benchmark das opções: benchmarks/gunicorn_workers.py.
+"""
+import multiprocessing
+import os
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    # Threads libertam o worker enquanto espera por I/O (ex.: uploads para o Cloudinary).
+    'gthread': 'gthread',
+    # Serve a aplicação ASGI: api/events/ (server-sent events) só funciona com este
+    # worker; com sync/gthread responde 501.
+    # Do pacote "uvicorn-worker" (uvicorn.workers está obsoleto).
+    'uvicorn': 'uvicorn_worker.UvicornWorker',
+}
+
+worker_kind = os.environ.get('GUNICORN_WORKER_CLASS', 'uvicorn')
+if worker_kind not in WORKER_CLASSES:
+    raise RuntimeError(f'GUNICORN_WORKER_CLASS inválido: {worker_kind!r} (use {", ".join(WORKER_CLASSES)})')
+
+worker_class = WORKER_CLASSES[worker_kind]
+if worker_kind == 'uvicorn':
+    # Sob ASGI cada view síncrona corre numa thread do executor do pedido: as
+    # conexões persistentes não seriam reutilizadas e acumulavam-se até ao
+    # limite da base de dados. Use DB_POOL para reutilizar conexões.
+    os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+wsgi_app = 'saudi_aramco.asgi:application' if worker_kind == 'uvicorn' else 'saudi_aramco.wsgi:application'
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+# Em contentores o número de CPUs visível costuma ser o do host; limitamos o
+# padrão para não esgotar a memória da instância.
+workers = env_int('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 5))
+threads = env_int('GUNICORN_THREADS', 4) if worker_kind == 'gthread' else 1
+
+if worker_kind == 'uvicorn' and workers > 1:
+    # O barramento 'memory' só chega às ligações SSE do worker que publicou o
+    # evento: com vários workers a maioria dos eventos perdia-se.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'saudi_aramco.settings')
+    from django.conf import settings
+
+    if settings.EVENT_BUS == 'memory':
+        raise RuntimeError(
+            f"EVENT_BUS='memory' não funciona com {workers} workers ASGI: "
+            "use EVENT_BUS=postgres ou WEB_CONCURRENCY=1"
+        )
+
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+
+# Carrega o Django uma vez no master; os workers partilham a memória (copy-on-write)
+# e arrancam mais depressa.
+preload_app = env_bool('GUNICORN_PRELOAD', True)
+
+# Recicla os workers periodicamente para limitar o crescimento de memória;
+# o jitter evita que todos reiniciem ao mesmo tempo.
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # Com preload_app, conexões abertas no master não podem ser partilhadas
+    # entre processos: cada worker abre as suas.
+    if server.cfg.preload_app:
+        from django.db import connections
+        connections.close_all()
+
+
+def post_worker_init(worker):
+    # Corre depois de a aplicação estar carregada no worker (com ou sem preload).
+    from core.warmup import warm_caches
+    try:
+        warm_caches()
+    except Exception:
+        worker.log.exception('Falha ao aquecer as caches do worker %s', worker.pid)
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'saudi_aramco.settings')
+# Sem conexões persistentes sob ASGI: cada pedido síncrono usa outra thread e
+# as conexões abertas nela nunca seriam reutilizadas (ver DB_CONN_MAX_AGE).
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
@@ -10,10 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from decimal import Decimal
 from pathlib import Path
 import os
+import tempfile
 import dj_database_url
-from decouple import config
+from decouple import Csv, config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -44,20 +47,26 @@ INSTALLED_APPS = [
     # WhiteNoise para servir arquivos estáticos de forma eficiente
     'whitenoise.runserver_nostatic',
     
-    # === NOVOS APPS CLOUDINARY ===
-    'cloudinary',
-    'cloudinary_storage',
-    # ============================
+    # Os apps 'cloudinary' e 'cloudinary_storage' não são instalados: só
+    # registariam template tags e comandos que não usamos, e obrigariam a
+    # importar o Cloudinary (e requests/urllib3) em cada arranque. O
+    # MediaCloudinaryStorage é importado apenas no primeiro acesso ao
+    # default_storage (ver STORAGES e benchmarks/startup.py).
     
     'core',
-    # CLOUDINARY REMOVIDO
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     # WhiteNoise deve vir logo abaixo do SecurityMiddleware
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Comprime o HTML gerado pelas views (gzip ou Brotli)
+    'core.middleware.HTMLCompressionMiddleware',
+    # Leituras no primário logo após uma escrita (só com réplica configurada)
+    'core.middleware.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    # Limites de pedidos por IP/usuário (ver RATE_LIMITS)
+    'core.middleware.RateLimitMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -87,12 +96,140 @@ WSGI_APPLICATION = 'saudi_aramco.wsgi.application'
 
 
 # Database
-DATABASES = {
-    'default': dj_database_url.config(
-        default=config('DATABASE_URL', default=f'sqlite:///{BASE_DIR}/db.sqlite3')
+# Conexões persistentes: cada worker reutiliza a conexão durante
+# DB_CONN_MAX_AGE segundos em vez de abrir uma nova (TCP/TLS + autenticação)
+# a cada pedido. As health checks descartam conexões que caíram entretanto.
+# Só em WSGI: sob ASGI (saudi_aramco/asgi.py, worker uvicorn) o padrão passa a
+# 0, porque cada pedido corre noutra thread; aí use DB_POOL.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+
+# Pool de conexões do psycopg 3 (opcional, só PostgreSQL). Requer
+# "psycopg[pool]" instalado; com o pool ativo o CONN_MAX_AGE tem de ser 0.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=int)
+
+
+def database_config(url):
+    database = dj_database_url.parse(
+        url, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=DB_CONN_HEALTH_CHECKS,
     )
+    if DB_POOL and database['ENGINE'] == 'django.db.backends.postgresql':
+        database['CONN_MAX_AGE'] = 0
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+        }
+    return database
+
+
+DATABASES = {
+    'default': database_config(config('DATABASE_URL', default=f'sqlite:///{BASE_DIR}/db.sqlite3')),
+}
+
+# Réplica de leitura opcional. As leituras vão para a réplica e as escritas
+# para o primário; depois de escrever, o navegador fica no primário durante
+# REPLICA_STICKY_SECONDS (ver core/routers.py e ReplicaPinningMiddleware).
+DATABASE_REPLICAS = []
+REPLICA_DATABASE_URL = config('REPLICA_DATABASE_URL', default='')
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = database_config(REPLICA_DATABASE_URL)
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append('replica')
+
+# Sharding opcional de Task e Roulette por hash do usuário (core/sharding.py):
+# SHARD_DATABASE_URLS="postgres://...,postgres://..." cria shard_0, shard_1, ...
+DATABASE_SHARDS = []
+for shard_index, shard_url in enumerate(config('SHARD_DATABASE_URLS', default='', cast=Csv())):
+    DATABASES[f'shard_{shard_index}'] = database_config(shard_url)
+    DATABASE_SHARDS.append(f'shard_{shard_index}')
+
+DATABASE_ROUTERS = ['core.routers.ShardRouter', 'core.routers.PrimaryReplicaRouter']
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=15, cast=int)
+REPLICA_PIN_COOKIE_NAME = 'primary_pin'
+
+
+# Cache
+# Partilhada entre os workers do mesmo servidor: guarda as versões de
+# configurações/níveis usadas nos ETags (ver core/cache.py).
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=os.path.join(tempfile.gettempdir(), 'saudi_aramco_cache')),
+    }
 }
 
+# Identifica o deploy atual; entra nos ETags das páginas para que um novo
+# deploy (templates diferentes) nunca devolva 304 com HTML antigo.
+RELEASE_VERSION = config('RENDER_GIT_COMMIT', default='dev')
+
+# Páginas de login/cadastro para anónimos: tempo na cache do servidor e
+# max-age enviado a navegadores/CDN.
+ANONYMOUS_SHELL_CACHE_TIMEOUT = config('ANONYMOUS_SHELL_CACHE_TIMEOUT', default=3600, cast=int)
+ANONYMOUS_SHELL_MAX_AGE = config('ANONYMOUS_SHELL_MAX_AGE', default=300, cast=int)
+
+# Limites de pedidos (balde de fichas por IP e por usuário, guardado na base
+# de dados), por nome de URL. Aplicam-se apenas a pedidos POST; ver core/ratelimit.py.
+RATE_LIMIT_ENABLED = config('RATE_LIMIT_ENABLED', default=True, cast=bool)
+# Número de proxies de confiança à frente da aplicação (0 = usar REMOTE_ADDR e
+# ignorar o X-Forwarded-For, que o cliente pode forjar). No Render há um proxy:
+# defina RATE_LIMIT_PROXY_COUNT=1 no ambiente do serviço.
+RATE_LIMIT_PROXY_COUNT = config('RATE_LIMIT_PROXY_COUNT', default=0, cast=int)
+RATE_LIMITS = {
+    'login': {'ip': config('RATE_LIMIT_LOGIN_IP', default='10/m')},
+    'cadastro': {'ip': config('RATE_LIMIT_CADASTRO_IP', default='5/m')},
+    'process_task': {
+        'ip': config('RATE_LIMIT_TASK_IP', default='60/m'),
+        'user': config('RATE_LIMIT_TASK_USER', default='5/m'),
+        'json': True,
+    },
+    'spin_roulette': {
+        'ip': config('RATE_LIMIT_ROULETTE_IP', default='120/m'),
+        'user': config('RATE_LIMIT_ROULETTE_USER', default='20/m'),
+        'json': True,
+    },
+}
+
+# Fila de jobs em segundo plano (core/jobs.py, manage.py run_workers).
+# Sem SKIP LOCKED (SQLite) ou com JOBS_ALWAYS_SYNC os jobs correm logo após o commit.
+JOBS_ALWAYS_SYNC = config('JOBS_ALWAYS_SYNC', default=False, cast=bool)
+JOBS_MAX_ATTEMPTS = config('JOBS_MAX_ATTEMPTS', default=5, cast=int)
+JOBS_LOCK_TIMEOUT = config('JOBS_LOCK_TIMEOUT', default=300, cast=int)
+JOBS_RETRY_BASE_DELAY = config('JOBS_RETRY_BASE_DELAY', default=30, cast=int)
+JOBS_RETRY_MAX_DELAY = config('JOBS_RETRY_MAX_DELAY', default=3600, cast=int)
+
+# Subsídio fixo pago a quem convidou, quando o convidado compra um nível.
+REFERRAL_SUBSIDY = Decimal(config('REFERRAL_SUBSIDY', default='11'))
+# Comissões da rede de convites, em % do valor do nível comprado, por nível
+# da rede a partir do convidante direto. Ex.: "10,5,2" paga três níveis.
+REFERRAL_COMMISSION_RATES = config('REFERRAL_COMMISSION_RATES', default='', cast=Csv(cast=Decimal))
+
+# Saques por página no histórico da página de saque ("Carregar mais").
+WITHDRAWAL_HISTORY_PAGE_SIZE = config('WITHDRAWAL_HISTORY_PAGE_SIZE', default=20, cast=int)
+
+# Membros por página em cada aba da página de equipa.
+TEAM_PAGE_SIZE = config('TEAM_PAGE_SIZE', default=50, cast=int)
+
+# Eventos em direto (api/events/, core/events.py). 'postgres' (LISTEN/NOTIFY)
+# chega a todos os workers e é o padrão com PostgreSQL; 'memory' só entrega
+# eventos dentro do mesmo processo e serve apenas um único worker (o
+# gunicorn.conf.py recusa arrancar vários workers ASGI com 'memory').
+EVENT_BUS = config(
+    'EVENT_BUS',
+    default='postgres' if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql' else 'memory',
+)
+EVENTS_KEEPALIVE_SECONDS = config('EVENTS_KEEPALIVE_SECONDS', default=15, cast=int)
+
+# Arquivo de Task/Roulette antigos (manage.py archive_history / read_archive).
+ARCHIVE_ROOT = config('ARCHIVE_ROOT', default=str(BASE_DIR / 'archive'))
+ARCHIVE_RETENTION_DAYS = config('ARCHIVE_RETENTION_DAYS', default=90, cast=int)
+
+# Respostas HTML menores que isto (em bytes) não são comprimidas.
+HTML_COMPRESSION_MIN_SIZE = config('HTML_COMPRESSION_MIN_SIZE', default=1024, cast=int)
+
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -127,6 +264,9 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
+# O CSS/JS de cada página vive em static/css/pages/ e static/js/pages/
+# (ver o comando extract_inline_assets). O WhiteNoise gera nomes com hash,
+# versões .gz/.br e serve-os com cache de longa duração (immutable).
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 
@@ -161,6 +301,38 @@ else:
     MEDIA_ROOT = BASE_DIR / 'media'
     MEDIA_URL = '/media/'
 
+# Desde o Django 5.1 as definições STATICFILES_STORAGE e DEFAULT_FILE_STORAGE
+# só são lidas através de STORAGES.
+STORAGES = {
+    'default': {'BACKEND': DEFAULT_FILE_STORAGE},
+    'staticfiles': {'BACKEND': STATICFILES_STORAGE},
+    # Disco onde os comprovativos esperam pela transferência para o
+    # armazenamento 'default' (DEPOSIT_PROOF_STAGING, ver core/uploads.py).
+    'staging': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': config('STAGING_ROOT', default=str(BASE_DIR / 'staging'))},
+    },
+}
+
+# Com True, o comprovativo de depósito é gravado no STAGING_ROOT e o depósito
+# fica registado de imediato; um job envia-o depois para o armazenamento
+# 'default' (Cloudinary em produção), sem bloquear o worker do gunicorn.
+DEPOSIT_PROOF_STAGING = config('DEPOSIT_PROOF_STAGING', default=False, cast=bool)
+
+# Com a fila em PostgreSQL o job corre noutro processo (manage.py run_workers,
+# muitas vezes outra instância): o disco local da web não lhe é visível, por
+# isso STAGING_ROOT tem de apontar para um volume partilhado pelos dois.
+if (
+    DEPOSIT_PROOF_STAGING
+    and not config('STAGING_ROOT', default='')
+    and not JOBS_ALWAYS_SYNC
+    and DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql'
+):
+    raise ImproperlyConfigured(
+        'DEPOSIT_PROOF_STAGING=True precisa de STAGING_ROOT num disco partilhado com '
+        'manage.py run_workers (ou JOBS_ALWAYS_SYNC=True para transferir no processo web).'
+    )
+
 # ======================================================================
 # FIM DA CONFIGURAÇÃO DE ARMAZENAMENTO
 # ======================================================================
@@ -172,6 +344,14 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # U$ o modelo de usuário personalizado
 AUTH_USER_MODEL = 'core.CustomUser'
 
+# Carrega o nível ativo junto com o usuário de cada pedido (core/backends.py).
+# O ModelBackend fica na lista porque as sessões abertas antes guardam o seu
+# caminho; sem ele, esses usuários seriam desligados.
+AUTHENTICATION_BACKENDS = [
+    'core.backends.UserWithLevelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 LOGIN_URL = 'login'
 
 # Configuração de segurança adicional para produção
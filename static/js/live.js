@@ -0,0 +1,37 @@
+// Atualizações em direto (api/events/): saldo, giros e depósitos aprovados
+// chegam por server-sent events e atualizam os elementos [data-live="campo"].
+// Cada evento é também reemitido no document como "live:<evento>".
+document.addEventListener("DOMContentLoaded", function () {
+    const script = document.querySelector("script[data-events-url]");
+    if (!script || !window.EventSource) {
+        return;
+    }
+
+    function show(field, value) {
+        document.querySelectorAll('[data-live="' + field + '"]').forEach(function (element) {
+            element.textContent = value;
+        });
+    }
+
+    function reloadBalance() {
+        fetch(script.dataset.balanceUrl, { credentials: "same-origin" })
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                Object.keys(data).forEach(function (field) { show(field, data[field]); });
+            });
+    }
+
+    const source = new EventSource(script.dataset.eventsUrl);
+    ["balance", "deposit", "commission"].forEach(function (name) {
+        source.addEventListener(name, function (event) {
+            const data = JSON.parse(event.data);
+            if (name === "balance") {
+                Object.keys(data).forEach(function (field) { show(field, data[field]); });
+            } else if (name === "commission") {
+                // A comissão é creditada por UPDATE direto: o evento só traz o valor.
+                reloadBalance();
+            }
+            document.dispatchEvent(new CustomEvent("live:" + name, { detail: data }));
+        });
+    });
+});
@@ -0,0 +1,69 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Lógica do botão de alternar senha
+    const setupPasswordToggle = (toggleId, inputId) => {
+        const toggle = document.querySelector(`#${toggleId}`);
+        // Encontrar o input pelo nome, pois o ID pode ser dinâmico (se o input existir)
+        const input = document.querySelector(`input[name="${inputId}"]`);
+        
+        if (toggle && input) {
+            toggle.addEventListener('click', function (e) {
+                const type = input.getAttribute('type') === 'password' ? 'text' : 'password';
+                input.setAttribute('type', type);
+                this.classList.toggle('fa-eye');
+                this.classList.toggle('fa-eye-slash');
+            });
+        }
+    };
+
+    // Usamos os nomes dos campos para garantir que o script encontre os elementos, 
+    // já que seus IDs são gerados pelo Django
+    setupPasswordToggle('togglePassword', 'password');
+    setupPasswordToggle('togglePasswordConfirm', 'confirm_password');
+
+    // Código para criar as partículas de energia/óleo
+    const numParticulas = 30;
+    const body = document.body;
+
+    // Define o keyframe do movimento das partículas no JavaScript, já que CSS não suporta var() no keyframe
+    const styleSheet = document.createElement('style');
+    document.head.appendChild(styleSheet);
+    
+    for (let i = 0; i < numParticulas; i++) {
+        const particula = document.createElement('div');
+        particula.classList.add('energia-particula');
+        
+        const size = Math.random() * 8 + 3;
+        particula.style.width = `${size}px`;
+        particula.style.height = `${size}px`;
+        particula.style.backgroundColor = i % 2 === 0 ? 'var(--cor-destaque-1)' : 'var(--cor-destaque-2)';
+
+        const delay = Math.random() * 10;
+        particula.style.animationDelay = `${delay}s`;
+        
+        // Posições aleatórias iniciais
+        const startX = Math.random() * 100;
+        const startY = Math.random() * 100;
+        
+        // Posições aleatórias finais
+        const endX = Math.random() * 100;
+        const endY = Math.random() * 100;
+
+        // Cria o keyframe dinâmico para cada partícula
+        const keyframesName = `moveParticula-${i}`;
+        const keyframes = `
+            @keyframes ${keyframesName} {
+                0% { transform: translate(${startX}vw, ${startY}vh); }
+                100% { transform: translate(${endX}vw, ${endY}vh); }
+            }
+        `;
+        styleSheet.sheet.insertRule(keyframes, styleSheet.sheet.cssRules.length);
+
+        particula.style.animationName = `${keyframesName}, fadeParticula`;
+        particula.style.animationDuration = `15s, 5s`;
+        particula.style.animationIterationCount = `infinite, infinite`;
+        particula.style.animationTimingFunction = `linear, alternate`;
+        particula.style.animationDelay = `${delay}s, ${Math.random() * 5}s`;
+
+        body.appendChild(particula);
+    }
+});
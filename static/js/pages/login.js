@@ -0,0 +1,45 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Lógica do botão de alternar senha
+    const setupPasswordToggle = (toggleId, inputId) => {
+        const toggle = document.querySelector(`#${toggleId}`);
+        const input = document.querySelector(`#${inputId}`);
+        
+        if (toggle && input) {
+            toggle.addEventListener('click', function (e) {
+                const type = input.getAttribute('type') === 'password' ? 'text' : 'password';
+                input.setAttribute('type', type);
+                this.classList.toggle('fa-eye');
+                this.classList.toggle('fa-eye-slash');
+            });
+        }
+    };
+
+    // Para o login, o campo de senha é 'password'
+    const passwordInput = document.querySelector('input[name="password"]');
+
+    if(passwordInput) setupPasswordToggle('togglePassword', passwordInput.id);
+
+    // Código para criar as partículas de energia/óleo
+    const numParticulas = 30;
+    const body = document.body;
+
+    for (let i = 0; i < numParticulas; i++) {
+        const particula = document.createElement('div');
+        particula.classList.add('energia-particula');
+        
+        const size = Math.random() * 8 + 3;
+        particula.style.width = `${size}px`;
+        particula.style.height = `${size}px`;
+        particula.style.backgroundColor = i % 2 === 0 ? 'var(--cor-destaque-1)' : 'var(--cor-destaque-2)';
+
+        const delay = Math.random() * 10;
+        particula.style.animationDelay = `${delay}s`;
+
+        particula.style.setProperty('--rand-x', Math.random() * 2 - 0.5);
+        particula.style.setProperty('--rand-y', Math.random() * 2 - 0.5);
+        particula.style.setProperty('--rand-x-end', Math.random() * 2 - 0.5);
+        particula.style.setProperty('--rand-y-end', Math.random() * 2 - 0.5);
+
+        body.appendChild(particula);
+    }
+});
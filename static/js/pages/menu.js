@@ -0,0 +1,32 @@
+document.addEventListener('DOMContentLoaded', () => {
+    // Lógica do Slider
+    const images = document.querySelectorAll('.image-slider img');
+    let currentImage = 0;
+
+    if (images.length > 1) {
+        setInterval(() => {
+            images[currentImage].classList.remove('active');
+            currentImage = (currentImage + 1) % images.length;
+            images[currentImage].classList.add('active');
+        }, 3000);
+    }
+
+    // Lógica do Pop-up de Boas-Vindas
+    const popup = document.getElementById('welcomePopup');
+    const closeButton = document.getElementById('closePopup');
+
+    // Exibe o pop-up a cada carregamento da página.
+    popup.style.display = 'flex'; 
+
+    // Adiciona evento para fechar
+    closeButton.addEventListener('click', () => {
+        popup.style.display = 'none';
+    });
+
+    // Opcional: fechar ao clicar fora do pop-up
+    window.addEventListener('click', (event) => {
+        if (event.target === popup) {
+            popup.style.display = 'none';
+        }
+    });
+});
@@ -0,0 +1,70 @@
+function openTab(evt, tabName) {
+    var i, tabContent, tabButtons;
+    
+    // 1. Oculta todos os conteúdos de aba E remove a linha divisória (profile-container border)
+    tabContent = document.getElementsByClassName("tab-content");
+    for (i = 0; i < tabContent.length; i++) {
+        tabContent[i].style.display = "none";
+        document.querySelector('.profile-container').style.borderTop = 'none'; // Esconde a linha
+    }
+    
+    // 2. Remove o estilo 'active' de todos os botões verticais
+    tabButtons = document.getElementsByClassName("tab-button");
+    for (i = 0; i < tabButtons.length; i++) {
+        tabButtons[i].classList.remove("active");
+    }
+
+    // 3. Exibe o conteúdo da aba clicada
+    const targetTab = document.getElementById(tabName);
+    if (targetTab.style.display === "block") {
+        // Se já estiver aberto, esconde e remove o active do botão (toggle)
+        targetTab.style.display = "none";
+        evt.currentTarget.classList.remove("active");
+        document.querySelector('.profile-container').style.borderTop = 'none';
+        localStorage.removeItem('activeTab');
+    } else {
+        // Caso contrário, mostra o conteúdo e ativa o botão
+        targetTab.style.display = "block";
+        evt.currentTarget.classList.add("active");
+        document.querySelector('.profile-container').style.borderTop = '1px solid #1a3250'; // Mostra a linha
+        localStorage.setItem('activeTab', tabName);
+    }
+}
+
+document.addEventListener("DOMContentLoaded", function() {
+    const urlParams = new URLSearchParams(window.location.search);
+    let activeTab = urlParams.get('tab') || localStorage.getItem('activeTab');
+
+    // Se houver erros de formulário, força a abertura da aba de dados bancários
+    const hasFormErrors = document.querySelector('.tab-content .errorlist');
+    if (hasFormErrors) {
+        activeTab = 'bank-tab';
+    }
+    
+    // Se houver uma aba ativa para carregar
+    if (activeTab) {
+         // 1. Garante que todos os conteúdos estejam ocultos
+        const allTabContents = document.getElementsByClassName('tab-content');
+        for (let i = 0; i < allTabContents.length; i++) {
+            allTabContents[i].style.display = 'none';
+        }
+        // 2. Garante que todos os botões estejam inativos
+        const allTabButtons = document.getElementsByClassName("tab-button");
+        for (let i = 0; i < allTabButtons.length; i++) {
+            allTabButtons[i].classList.remove('active');
+        }
+
+        // 3. Ativa o botão e mostra a aba
+        const tabToOpen = document.getElementById(activeTab);
+        const activeTabButton = document.querySelector(`.tab-button[onclick*="'${activeTab}'"]`);
+        
+        if (tabToOpen && activeTabButton) {
+            tabToOpen.style.display = 'block';
+            activeTabButton.classList.add('active');
+            document.querySelector('.profile-container').style.borderTop = '1px solid #1a3250';
+        } else {
+            // Se não houver aba para abrir, garante que a linha divisória não apareça
+            document.querySelector('.profile-container').style.borderTop = 'none';
+        }
+    }
+});
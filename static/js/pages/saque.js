@@ -0,0 +1,59 @@
+// Função JavaScript para controlar a troca de abas
+function openTab(evt, tabName) {
+    var i, tabcontent, tablinks;
+
+    // 1. Esconde todos os conteúdos das abas
+    tabcontent = document.getElementsByClassName("tab-pane");
+    for (i = 0; i < tabcontent.length; i++) {
+        tabcontent[i].style.display = "none";
+    }
+
+    // 2. Remove a classe 'active' de todos os botões de aba
+    tablinks = document.getElementsByClassName("tab-button");
+    for (i = 0; i < tablinks.length; i++) {
+        tablinks[i].className = tablinks[i].className.replace(" active", "");
+    }
+
+    // 3. Mostra a aba atual e adiciona a classe 'active' ao botão clicado
+    document.getElementById(tabName).style.display = "block";
+    evt.currentTarget.className += " active";
+}
+
+// Inicializa a página abrindo a primeira aba ('informacoes')
+document.addEventListener("DOMContentLoaded", function() {
+    // Assegura que pelo menos um botão de aba existe antes de tentar clicar
+    const firstTabButton = document.querySelector(".tab-button");
+    if (firstTabButton) {
+        firstTabButton.click();
+    }
+});
+
+// Histórico de saques: "Carregar mais" pede a página seguinte ao servidor
+document.addEventListener("DOMContentLoaded", function() {
+    const loadMore = document.getElementById("withdrawal-load-more");
+    const historyList = document.getElementById("withdrawal-history");
+    if (!loadMore || !historyList) {
+        return;
+    }
+
+    loadMore.addEventListener("click", function() {
+        loadMore.disabled = true;
+        const url = loadMore.dataset.url + "?" + new URLSearchParams({ cursor: loadMore.dataset.cursor });
+        fetch(url, { credentials: "same-origin" })
+            .then(function(response) { return response.json(); })
+            .then(function(data) {
+                if (!data.success) {
+                    return;
+                }
+                historyList.insertAdjacentHTML("beforeend", data.html);
+                if (data.next_cursor) {
+                    loadMore.dataset.cursor = data.next_cursor;
+                } else {
+                    loadMore.remove();
+                }
+            })
+            .finally(function() {
+                loadMore.disabled = false;
+            });
+    });
+});
@@ -0,0 +1,20 @@
+// Completa as páginas anónimas servidas a partir da cache partilhada:
+// obtém o token CSRF do endpoint JSON e preenche o código de convite da URL.
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('form[data-csrf-url]').forEach(function (form) {
+        fetch(form.dataset.csrfUrl, { credentials: 'same-origin' })
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                const input = form.querySelector('input[name="csrfmiddlewaretoken"]');
+                if (input) {
+                    input.value = data.csrfToken;
+                }
+            });
+    });
+
+    const inviteCode = new URLSearchParams(window.location.search).get('invite');
+    const inviteInput = document.querySelector('input[name="invited_by_code"]');
+    if (inviteCode && inviteInput && !inviteInput.value) {
+        inviteInput.value = inviteCode;
+    }
+});